@@ -1,18 +1,95 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+import asyncio
+import gc
+import hmac
 import os
-import requests # Import requests library for HTTP calls
-from reading_Excel import read_accounts_from_excel, excel_to_json
-from dics_of_ExcelCells import reading_first_sheet
-import traceback
 import datetime
-import pandas as pd # Import pandas for get_directorate_name
+import logging
 from dotenv import load_dotenv
-from excel_names_demo import excel_to_json, get_column_names
+from excel_pipeline import (
+    MONTHS_SHEET_MAPPING, ROW_LAYOUTS, InvalidWorkbookError, process_workbook,
+    process_sheets, workbook_sheets, EXTRACTOR_VERSION
+)
+from worker_pool import WorkerPool, JobTimeoutError, run_while_connected
+from nextjs_forwarder import NextJSForwarder, ForwardError
+from result_cache import ResultCache, cache_key
+from upload_stream import receive_upload, UploadTooLargeError, InvalidUploadError, MissingUploadError
+from excel_readers import use_reader, select_fastest
+import arrow_export
+import extraction_store
+import final_report
+import metrics
+import profiling
+import wire_format
+from log_setup import Capped, setup_logging
 
 load_dotenv()  # تحميل متغيرات البيئة من ملف .env إذا كان موجودًا
+setup_logging()
+logger = logging.getLogger("excel_api")
+
+# The static hierarchy and extraction plans built at import live for the whole process.
+# Keep them out of the cyclic GC so pre-forked server workers keep sharing their pages.
+gc.freeze()
+
+# Number of warm worker processes that parse workbooks (0 parses in a thread of the API process)
+EXCEL_WORKERS = int(os.getenv("EXCEL_WORKERS", os.cpu_count() or 1))
+# Seconds one workbook may take before its worker is killed
+EXCEL_JOB_TIMEOUT = float(os.getenv("EXCEL_JOB_TIMEOUT", "120"))
+
+worker_pool = WorkerPool(size=EXCEL_WORKERS, timeout=EXCEL_JOB_TIMEOUT)
+
+# Reader backend for the workbooks: openpyxl, xlrd, calamine or auto (fastest installed for each format)
+EXCEL_READER = os.getenv("EXCEL_READER", "auto")
+# With auto: a template workbook to benchmark the installed readers on at startup
+EXCEL_READER_BENCHMARK = os.getenv("EXCEL_READER_BENCHMARK", "")
+
+# URL for the Next.js API endpoint to receive processed data
+NEXTJS_API_URL = os.getenv("NEXTJS_API_URL", "http://localhost:3000/api/data/process") # Default for local development
 
-app = FastAPI()
+# Pooled keep-alive connections to Next.js and how many POSTs may be in flight
+NEXTJS_MAX_CONNECTIONS = int(os.getenv("NEXTJS_MAX_CONNECTIONS", "10"))
+NEXTJS_CONCURRENCY = int(os.getenv("NEXTJS_CONCURRENCY", str(NEXTJS_MAX_CONNECTIONS)))
+# Micro-batching: coalesce payloads arriving within this window into one POST (0 disables)
+NEXTJS_BATCH_WINDOW_MS = float(os.getenv("NEXTJS_BATCH_WINDOW_MS", "0"))
+NEXTJS_BATCH_MAX = int(os.getenv("NEXTJS_BATCH_MAX", "50"))
+NEXTJS_TIMEOUT = float(os.getenv("NEXTJS_TIMEOUT", "30"))
+# Payload layout sent to Next.js: "full" (names and string values) or "compact" (see wire_format)
+NEXTJS_PAYLOAD_FORMAT = os.getenv("NEXTJS_PAYLOAD_FORMAT", "full")
+# Gzip the bodies POSTed to Next.js
+NEXTJS_GZIP = os.getenv("NEXTJS_GZIP", "false").lower() in ("1", "true", "yes", "on")
+
+nextjs_forwarder = NextJSForwarder(
+    NEXTJS_API_URL,
+    max_connections=NEXTJS_MAX_CONNECTIONS,
+    concurrency=NEXTJS_CONCURRENCY,
+    batch_window=NEXTJS_BATCH_WINDOW_MS / 1000,
+    batch_max=NEXTJS_BATCH_MAX,
+    timeout=NEXTJS_TIMEOUT,
+    gzip_body=NEXTJS_GZIP
+)
+
+@asynccontextmanager
+async def lifespan(app):
+    # Chosen before the workers start so they inherit it
+    if EXCEL_READER == "auto" and EXCEL_READER_BENCHMARK:
+        logger.info("Benchmarking Excel readers on %s", EXCEL_READER_BENCHMARK)
+        try:
+            logger.info("Using Excel reader %s", select_fastest(EXCEL_READER_BENCHMARK))
+        except Exception as e:
+            logger.warning("Excel reader benchmark failed, using the default order: %s", e)
+            use_reader("auto")
+    else:
+        use_reader(EXCEL_READER)
+    worker_pool.start()
+    await nextjs_forwarder.start()
+    yield
+    await nextjs_forwarder.close()
+    worker_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -23,133 +100,189 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create temporary upload directory
-UPLOAD_DIR = "temp_uploads"
-os.makedirs(UPLOAD_DIR, exist_ok=True)
+# Request counts, error causes and latencies of the processing endpoints
+app.add_middleware(metrics.MetricsMiddleware, paths={"/process-excel/", "/process-workbook/"})
 
-# URL for the Next.js API endpoint to receive processed data
-NEXTJS_API_URL = os.getenv("NEXTJS_API_URL", "http://localhost:3000/api/data/process") # Default for local development
+# Parsed results of recent uploads, keyed by file content; the disk tier is shared by all uvicorn workers
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "128"))
+RESULT_CACHE_TTL = float(os.getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "result_cache")  # empty disables the disk tier
+result_cache = ResultCache(max_entries=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, directory=RESULT_CACHE_DIR or None)
 
-# Sheet mapping dictionary
-MONTHS_SHEET_MAPPING = {
-    "1": {
-        1: 2,
-        2: 3
-    },
-    "2": {
-        1: 5,
-        2: 6
-    },
-    "3": {
-        1: 8,
-        2: 9
-    },
-    "4": {
-        1: 11,
-        2: 12
-    },
-    "5": {
-        1: 14,
-        2: 15
-    },
-    "6": {
-        1: 17,
-        2: 18
-    },
-    "7": {
-        1: 20,
-        2: 21
-    },
-    "8": {
-        1: 23,
-        2: 24
-    },
-    "9": {
-        1: 26,
-        2: 27
-    },
-    "10": {
-        1: 29,
-        2: 30
-    },
-    "11": {
-        1: 32,
-        2: 33
-    },
-    "12": {
-        1: 35,
-        2: 36
-    }
-}
+metrics.REGISTRY.add(metrics.CollectedCounter(
+    "excel_api_cache_lookups_total", "Result cache lookups by outcome (memory_hit, disk_hit, shared, miss)",
+    lambda: {(outcome,): count for outcome, count in result_cache.stats.items()}, ("outcome",)))
+metrics.REGISTRY.add(metrics.Gauge(
+    "excel_api_worker_queue_depth", "Jobs waiting for a free worker process",
+    lambda: {(): worker_pool.queue_depth}))
+metrics.REGISTRY.add(metrics.Gauge(
+    "excel_api_workers_busy", "Worker processes running a job",
+    lambda: {(): worker_pool.busy}))
+
+# Optional local Parquet dataset of every extracted sheet (needs pyarrow); empty disables it
+EXTRACTION_STORE_DIR = os.getenv("EXTRACTION_STORE_DIR", "")
+if EXTRACTION_STORE_DIR and not extraction_store.available():
+    logger.warning("EXTRACTION_STORE_DIR is set but pyarrow is not installed; extractions are not stored")
+store = extraction_store.ExtractionStore(EXTRACTION_STORE_DIR) if EXTRACTION_STORE_DIR and extraction_store.available() else None
+
+# Uploads larger than this are rejected while streaming; up to UPLOAD_SPOOL_BYTES stay in memory, the rest is spooled to disk
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(1024 * 1024)))
+
+# Token for the /admin endpoints and the X-Profile header; empty disables both
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Where profile reports are stored (empty: only returned to X-Profile requests) and how many rows they keep
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_TOP = int(os.getenv("PROFILE_TOP", "25"))
+# /process-excel/ runs armed through /admin/profile that are still to be profiled
+_profile_budget = {"remaining": 0}
 
-# Helper function to get directorate name from Excel file
-def get_directorate_name(file_path):
+async def _receive_upload(request):
+    """Stream the multipart body in, rejecting oversized or non-Excel files before reading them fully"""
     try:
-        # First, validate that the file exists and is readable
-        if not os.path.exists(file_path):
-            print(f"Error: File does not exist: {file_path}")
-            return None
-            
-        # Check file size
-        file_size = os.path.getsize(file_path)
-        if file_size == 0:
-            print(f"Error: File is empty: {file_path}")
-            return None
-            
-        # Try to read the Excel file with better error handling
-        try:
-            # Read the first sheet of the Excel file
-            df = pd.read_excel(file_path, sheet_name=0, header=None, engine='openpyxl')
-            
-            # Check if dataframe is empty
-            if df.empty:
-                print(f"Error: Excel file is empty or has no data: {file_path}")
-                return None
-                
-            # Assuming directorate name is in cell (1, 2) based on 10.xlsx
-            # Adjust row and column for 0-based indexing
-            if len(df) > 1 and len(df.columns) > 2:
-                directorate = df.iloc[1, 2] # Row 2, Column 3 (C2)
-                if pd.notna(directorate) and str(directorate).strip():
-                    return str(directorate).replace('مديرية:', '').strip()
-                else:
-                    print(f"Warning: Directorate cell is empty or NaN")
-                    return "مديرية غير محددة"
-            else:
-                print(f"Error: Excel file doesn't have enough rows/columns: {file_path}")
-                return None
-                
-        except Exception as excel_error:
-            print(f"Error reading Excel file with openpyxl: {excel_error}")
-            
-            # Try alternative approach with xlrd for older Excel files
+        with metrics.stage("upload"):
+            upload = await receive_upload(request, max_size=MAX_UPLOAD_BYTES, spool_size=UPLOAD_SPOOL_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except MissingUploadError:
+        # Answered like the File(...) parameter FastAPI validated before uploads were streamed
+        metrics.set_error_cause(request, "invalid_upload")
+        raise RequestValidationError([
+            {"type": "missing", "loc": ("body", "file"), "msg": "Field required", "input": None}
+        ])
+    except InvalidUploadError as e:
+        metrics.set_error_cause(request, "invalid_upload")
+        raise HTTPException(status_code=400, detail=str(e))
+    metrics.UPLOAD_BYTES.inc(upload.size, endpoint=request.url.path)
+    return upload
+
+def _form_value(upload, name, default, parse=str):
+    value = upload.fields.get(name)
+    if value is None or value == "":
+        return default
+    try:
+        return parse(value)
+    except ValueError:
+        upload.close()
+        error_type, msg = _FORM_ERRORS[parse]
+        raise RequestValidationError([{"type": error_type, "loc": ("body", name), "msg": msg, "input": value}])
+
+def _form_bool(value):
+    if value.lower() in ("1", "true", "yes", "on"):
+        return True
+    if value.lower() in ("0", "false", "no", "off"):
+        return False
+    raise ValueError(value)
+
+# Validation error (type, msg) per form value parser, as FastAPI reports them for Form() parameters
+_FORM_ERRORS = {
+    int: ("int_parsing", "Input should be a valid integer, unable to parse string as an integer"),
+    _form_bool: ("bool_parsing", "Input should be a valid boolean, unable to interpret input"),
+}
+
+def _form_body(**fields):
+    """
+    openapi_extra documenting a multipart form of a file part plus fields,
+    {name: JSON schema}; the endpoints stream the body themselves, so FastAPI
+    cannot infer it from their parameters.
+    """
+    return {"requestBody": {"required": True, "content": {"multipart/form-data": {"schema": {
+        "type": "object",
+        "properties": {"file": {"type": "string", "format": "binary"}, **fields},
+        "required": ["file"],
+    }}}}}
+
+_ROW_LAYOUT_FIELD = {"type": "string", "enum": list(ROW_LAYOUTS), "default": "rows"}
+_INCLUDE_PAYLOAD_FIELD = {"type": "boolean", "default": False}
+
+async def _parse_upload(file, job, *args):
+    """Run job(upload source, *args) in the worker pool"""
+    return await worker_pool.run(job, file.source(), *args)
+
+def _hand_off(file):
+    """
+    hand_off for result_cache.get_or_compute: the shared parse, which may
+    outlive the request that started it, closes the upload (and its spool
+    file) once it is over, even when cancelled before it ran.
+    """
+    def hand_off():
+        file.handed_off = True
+        return file.close
+    return hand_off
+
+def _row_layout(upload):
+    row_layout = _form_value(upload, "row_layout", "rows")
+    if row_layout not in ROW_LAYOUTS:
+        upload.close()
+        raise HTTPException(status_code=400, detail=f"Invalid row_layout. Must be one of: {', '.join(ROW_LAYOUTS)}")
+    return row_layout
+
+def _outbound(payload):
+    """A payload in the layout configured for Next.js"""
+    return wire_format.compact_payload(payload) if NEXTJS_PAYLOAD_FORMAT == "compact" else payload
+
+def _echoed(request, payload):
+    """A payload echoed back to the client: compact when it sent X-Wire-Format: compact"""
+    if request.headers.get("x-wire-format", "").lower() == "compact":
+        return wire_format.compact_payload(payload)
+    return payload
+
+def _wire_response(request, content):
+    """content as JSON or MessagePack and gzipped, as the client's Accept headers ask"""
+    body, headers = wire_format.encode(content, request.headers.get("accept"), request.headers.get("accept-encoding"))
+    return Response(body, headers=headers)
+
+async def _store_payloads(payloads, upload_id):
+    """Append the payloads to the extraction store; a failure is only logged, the request still succeeds"""
+    if store is None:
+        return
+    loop = asyncio.get_running_loop()
+    with metrics.stage("store"):
+        for payload in payloads:
             try:
-                df = pd.read_excel(file_path, sheet_name=0, header=None, engine='xlrd')
-                if len(df) > 1 and len(df.columns) > 2:
-                    directorate = df.iloc[1, 2]
-                    if pd.notna(directorate) and str(directorate).strip():
-                        return str(directorate).replace('مديرية:', '').strip()
-            except Exception as xlrd_error:
-                print(f"Error reading Excel file with xlrd: {xlrd_error}")
-                
-            return "مديرية غير محددة"
-            
-    except Exception as e:
-        print(f"Error extracting directorate name: {e}")
-        return "مديرية غير محددة"
-
-@app.post("/process-excel/")
-async def process_excel(
-    file: UploadFile = File(...),
-    sheet_number: int = Form(1),
-    month: str = Form(None)
-):
+                await loop.run_in_executor(None, store.append_payload, payload, upload_id)
+            except Exception:
+                logger.exception("Could not store %s month %s sheet %s in the extraction store",
+                                 payload["file_name"], payload["month"], payload["sheet_number_processed"])
+
+def _is_admin(request):
+    token = request.headers.get("x-admin-token", "")
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token.encode(), ADMIN_TOKEN.encode())
+
+def _profile_mode(request):
+    """
+    None, "header" (an admin sent X-Profile: the report goes back in the
+    response) or "armed" (an /admin/profile run: the report is only stored)
+    """
+    if not ADMIN_TOKEN:
+        return None
+    if request.headers.get("x-profile") and _is_admin(request):
+        return "header"
+    if _profile_budget["remaining"] > 0:
+        _profile_budget["remaining"] -= 1
+        return "armed"
+    return None
+
+@app.post("/process-excel/", openapi_extra=_form_body(
+    sheet_number={"type": "integer", "default": 1},
+    month={"type": "string"},
+    include_payload=_INCLUDE_PAYLOAD_FIELD,
+    row_layout=_ROW_LAYOUT_FIELD,
+))
+async def process_excel(request: Request):
+    # Form fields: file, sheet_number (default 1), month, include_payload
+    # (default false: the payload sent to Next.js is only echoed back as data_sent when set)
+    # and row_layout ("rows" by default, "columnar" for bulk-insert ready sheet 1 rows)
+    file = await _receive_upload(request)
+    sheet_number = _form_value(file, "sheet_number", 1, int)
+    month = _form_value(file, "month", None)
+    include_payload = _form_value(file, "include_payload", False, _form_bool)
+    row_layout = _row_layout(file)
     try:
-        print(f"[DEBUG] Received month: {month} (type: {type(month)}) sheet_number: {sheet_number} (type: {type(sheet_number)})")
-        print(f"[DEBUG] Available month keys: {list(MONTHS_SHEET_MAPPING.keys())}")
-        print(f"[DEBUG] Month in mapping: {month in MONTHS_SHEET_MAPPING}")
-        print(f"[DEBUG] File name: {file.filename}")
-        print(f"[DEBUG] File content type: {file.content_type}")
+        logger.debug("Received /process-excel/ upload", extra={
+            "month": month, "sheet_number": sheet_number,
+            "file_name": file.filename, "content_type": file.content_type
+        })
         
         # Validate file extension
         if not file.filename.endswith((".xlsx", ".xls")):
@@ -160,16 +293,14 @@ async def process_excel(
 
         # Validate month and sheet number
         if not month or month not in MONTHS_SHEET_MAPPING:
-            print(f"[ERROR] Invalid month received: {month}")
-            print(f"[ERROR] Month type: {type(month)}")
-            print(f"[ERROR] Available months: {list(MONTHS_SHEET_MAPPING.keys())}")
+            logger.warning("Invalid month received: %r", month)
             raise HTTPException(
                 status_code=400,
                 detail="Invalid month. Must be between 1 and 12"
             )
 
         if sheet_number not in [1, 2]:
-            print(f"[ERROR] Invalid sheet_number received: {sheet_number}")
+            logger.warning("Invalid sheet_number received: %r", sheet_number)
             raise HTTPException(
                 status_code=400,
                 detail="Invalid sheet number. Must be 1 or 2"
@@ -178,82 +309,73 @@ async def process_excel(
         # Get the actual sheet index from the mapping
         actual_sheet_index = MONTHS_SHEET_MAPPING[month][sheet_number]
 
-        # Save file temporarily
-        file_path = os.path.join(UPLOAD_DIR, file.filename)
-        
-        # Read file content first to validate
-        file_content = await file.read()
-        
         # Check if file is empty
-        if len(file_content) == 0:
+        if file.size == 0:
             raise HTTPException(
                 status_code=400,
                 detail="Uploaded file is empty"
             )
-            
-        # Save file to disk
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
-            
-        print(f"[DEBUG] File saved to: {file_path}")
-        print(f"[DEBUG] File size: {len(file_content)} bytes")
-
-        # Validate Excel file integrity before processing
+        logger.debug("File size: %d bytes", file.size)
+
+        async def parse():
+            # Small uploads go to the worker as bytes, spooled ones by their unique temp path
+            return await _parse_upload(file, process_workbook, sheet_number, actual_sheet_index, row_layout)
+
+        # Parse the workbook in a worker process so the event loop stays free;
+        # the job is killed on timeout or when the client disconnects.
+        # Re-uploads of the same bytes are served from the result cache and
+        # identical concurrent uploads share one parse.
+        key = cache_key(file.sha256, EXTRACTOR_VERSION, month, sheet_number, row_layout)
+        profile_mode = _profile_mode(request)
+        if profile_mode:
+            # A profiled run bypasses the cache so the parse really happens, under cProfile and tracemalloc
+            work = _parse_upload(file, profiling.profiled, PROFILE_TOP, process_workbook, sheet_number, actual_sheet_index, row_layout)
+        else:
+            work = result_cache.get_or_compute(key, parse, _hand_off(file))
         try:
-            import pandas as pd
-            # Try to read the file to check if it's valid
-            test_df = pd.read_excel(file_path, sheet_name=0, header=None, engine='openpyxl')
-            print(f"[DEBUG] File validation successful. Shape: {test_df.shape}")
-        except Exception as validation_error:
-            print(f"[ERROR] File validation failed: {validation_error}")
-            # Clean up the invalid file
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            result = await run_while_connected(request, work)
+        except InvalidWorkbookError as validation_error:
+            metrics.set_error_cause(request, "invalid_workbook")
             raise HTTPException(
                 status_code=400,
                 detail=f"Invalid Excel file. The file appears to be corrupted or not a valid Excel file. Error: {str(validation_error)}"
             )
+        except JobTimeoutError as timeout_error:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Processing the Excel file took too long: {str(timeout_error)}"
+            )
+
+        profile_report = None
+        if profile_mode:
+            result, profile_report = result
+            profile_report["file_name"] = file.filename
+            if PROFILE_DIR:
+                profile_report["stored_as"] = profiling.save_report(PROFILE_DIR, profile_report, file.sha256[:12])
+            logger.info("Profiled /process-excel/ run", extra={
+                "wall_seconds": round(profile_report["wall_seconds"], 3),
+                "stored_as": profile_report.get("stored_as")
+            })
 
-        # Extract directorate name and year from the Excel file
-        directorate_name = get_directorate_name(file_path)
+        processed_data = result["processed_data"]
+        office_col = result["office_name"]
+        directorate_col = result["directorate_col"]
         current_year = datetime.datetime.now().year # Assuming current year for now
-        
-        processed_data = None
-        office_col = None
-        directorate_col = None
-        if sheet_number == 1:
-            result = reading_first_sheet(
-                 excel_file_path=file_path,
-                 sheet_num=actual_sheet_index
-            )
-            processed_data = result
-            # Debug: Print processed_data keys and sample of hierarchical_rows
-            if isinstance(processed_data, dict):
-                print('processed_data keys:', list(processed_data.keys()))
-                if 'hierarchical_rows' in processed_data:
-                    print('hierarchical_rows sample:', processed_data['hierarchical_rows'][:3])
-                else:
-                    print('NO hierarchical_rows in processed_data!')
-        else: # sheet_number == 2
-            processed_data = read_accounts_from_excel(
-                file_path=file_path,
-                sheet_name=actual_sheet_index
-            )
-        # استخراج اسم العمود للمكتب والمديرية من الورقة الثانية (Sheet 2)
-        office_col, directorate_col = get_column_names(file_path)
+
         # Validate processed data
         if processed_data is None:
+            metrics.set_error_cause(request, "extraction_failed")
             raise HTTPException(
                 status_code=500,
                 detail="Failed to process Excel file. Please check if the file format is correct."
             )
-        # Debug print for hierarchical_rows
+        # Debug dump of hierarchical_rows, capped to a few rows
         if processed_data and isinstance(processed_data, dict) and "hierarchical_rows" in processed_data:
-            print("Hierarchical rows to be sent:", processed_data["hierarchical_rows"])
+            logger.debug("Hierarchical rows to be sent: %s", Capped(processed_data["hierarchical_rows"]))
             if not processed_data["hierarchical_rows"]:
-                print("Warning: hierarchical_rows is present but empty!")
-        else:
-            print("No hierarchical_rows found in processed_data!")
+                logger.warning("hierarchical_rows is present but empty")
+        elif sheet_number == 1 and row_layout == "rows":
+            logger.warning("No hierarchical_rows found in processed_data")
         # Prepare data to send to Next.js API
         payload = {
             "file_name": file.filename,
@@ -264,41 +386,289 @@ async def process_excel(
             "sheet_number_processed": sheet_number,
             "processed_data": processed_data
         }
-        # Send data to Next.js API
-        response = requests.post(NEXTJS_API_URL, json=payload)
-        response.raise_for_status() # Raise an exception for HTTP errors (4xx or 5xx)
-        return {
+        # Send data to Next.js API over the shared connection pool (may be batched)
+        with metrics.stage("nextjs_post"):
+            await nextjs_forwarder.send(_outbound(payload))
+        await _store_payloads([payload], file.sha256)
+        if arrow_export.wants_arrow(request.headers.get("accept")):
+            # The extracted rows as an Arrow IPC stream; the other response fields ride along as schema metadata
+            metadata = {
+                "file_name": file.filename, "month": month, "sheet_number": str(sheet_number),
+                "actual_sheet_index": str(actual_sheet_index),
+                "office_name": office_col or "", "directorate_name": directorate_col or ""
+            }
+            table = arrow_export.sheet_table(month, sheet_number, processed_data, metadata)
+            return Response(arrow_export.to_ipc_stream(table), media_type=arrow_export.ARROW_STREAM_TYPE)
+        response = {
             "status": "success",
             "message": "File processed and data sent to Next.js API successfully",
             "sheet_number": sheet_number,
             "month": month,
             "actual_sheet_index": actual_sheet_index,
             "office_name": office_col,
+            "directorate_name": directorate_col
+        }
+        if include_payload:
+            response["data_sent"] = _echoed(request, payload)
+        if profile_mode == "header":
+            response["profile"] = profile_report
+        return _wire_response(request, response)
+
+    except HTTPException:
+        raise
+    except ForwardError as e:
+        metrics.set_error_cause(request, "nextjs")
+        logger.error("Failed to send data to Next.js API: %s", e)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to send data to Next.js API: {str(e)}"
+        )
+    except Exception as e:
+        logger.exception("Exception occurred in /process-excel endpoint")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing file: {str(e)}"
+        )
+    finally:
+        # Unless a parse took the upload over, release it (and its spool file) here
+        if not file.handed_off:
+            file.close()
+
+@app.post("/process-workbook/", openapi_extra=_form_body(
+    months={"type": "string"},
+    forward={"type": "boolean", "default": True},
+    include_payload=_INCLUDE_PAYLOAD_FIELD,
+    row_layout=_ROW_LAYOUT_FIELD,
+))
+async def process_workbook_endpoint(request: Request):
+    """
+    Extract every mapped sheet (both sheets of each month) from one upload.
+    Form fields: file, months (optional comma separated list, all 12 months
+    by default), forward (default true), include_payload (default false:
+    the payloads are only returned as batch when set) and row_layout (as for
+    /process-excel/).
+    The sheets are split across the worker pool; each worker loads the workbook
+    once for its share. The results are forwarded to Next.js as one batch
+    (forward=false only returns them).
+    """
+    file = await _receive_upload(request)
+    months = _form_value(file, "months", None)
+    forward = _form_value(file, "forward", True, _form_bool)
+    include_payload = _form_value(file, "include_payload", False, _form_bool)
+    row_layout = _row_layout(file)
+    try:
+        # Validate file extension
+        if not file.filename.endswith((".xlsx", ".xls")):
+            raise HTTPException(
+                status_code=400,
+                detail="File must be an Excel file (.xlsx or .xls)"
+            )
+
+        if months:
+            month_list = [m.strip() for m in months.split(",") if m.strip()]
+            invalid = [m for m in month_list if m not in MONTHS_SHEET_MAPPING]
+            if invalid or not month_list:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"Invalid month(s): {', '.join(invalid)}. Must be between 1 and 12"
+                )
+        else:
+            month_list = None
+        sheets = workbook_sheets(month_list)
+
+        if file.size == 0:
+            raise HTTPException(
+                status_code=400,
+                detail="Uploaded file is empty"
+            )
+
+        logger.debug("Extracting %d sheets from %s", len(sheets), file.filename)
+
+        # Round-robin the sheets over the workers; only the first chunk reads the column names
+        chunk_count = max(1, min(worker_pool.size, len(sheets)))
+        chunks = [sheets[i::chunk_count] for i in range(chunk_count)]
+
+        async def parse():
+            # Every chunk reads the same bytes (or spool file)
+            source = file.source()
+            return await asyncio.gather(*[
+                worker_pool.run(process_sheets, source, chunk, i == 0, None, row_layout)
+                for i, chunk in enumerate(chunks)
+            ])
+
+        month_key = ",".join(month_list or MONTHS_SHEET_MAPPING)
+        key = cache_key(file.sha256, EXTRACTOR_VERSION, "workbook", month_key, row_layout)
+        try:
+            chunk_results = await run_while_connected(request, result_cache.get_or_compute(key, parse, _hand_off(file)))
+        except InvalidWorkbookError as validation_error:
+            metrics.set_error_cause(request, "invalid_workbook")
+            raise HTTPException(
+                status_code=400,
+                detail=f"Invalid Excel file. The file appears to be corrupted or not a valid Excel file. Error: {str(validation_error)}"
+            )
+        except JobTimeoutError as timeout_error:
+            raise HTTPException(
+                status_code=504,
+                detail=f"Processing the Excel file took too long: {str(timeout_error)}"
+            )
+
+        office_col = chunk_results[0]["office_name"]
+        directorate_col = chunk_results[0]["directorate_col"]
+        extracted = {
+            (sheet["month"], sheet["sheet_number"]): sheet
+            for chunk in chunk_results
+            for sheet in chunk["sheets"]
+        }
+        current_year = str(datetime.datetime.now().year) # Assuming current year for now
+
+        # One payload per sheet in the same shape /process-excel/ sends, in workbook order
+        payloads = []
+        sheet_status = []
+        for month, sheet_number, actual_sheet_index in sheets:
+            processed_data = extracted[(month, sheet_number)]["processed_data"]
+            status = {"month": month, "sheet_number": sheet_number, "actual_sheet_index": actual_sheet_index}
+            if processed_data is None:
+                status["status"] = "failed"
+                status["error"] = "Failed to process sheet"
+            else:
+                status["status"] = "processed"
+                payloads.append({
+                    "file_name": file.filename,
+                    "month": month,
+                    "year": current_year,
+                    "office_name": office_col,
+                    "directorate_name": directorate_col,
+                    "sheet_number_processed": sheet_number,
+                    "processed_data": processed_data
+                })
+            sheet_status.append(status)
+
+        if not payloads:
+            metrics.set_error_cause(request, "extraction_failed")
+            raise HTTPException(
+                status_code=500,
+                detail="Failed to process Excel file. Please check if the file format is correct."
+            )
+
+        if forward:
+            # Send every sheet to Next.js in a single request
+            with metrics.stage("nextjs_post"):
+                results = await nextjs_forwarder.send_batch([_outbound(payload) for payload in payloads])
+            processed = [status for status in sheet_status if status["status"] == "processed"]
+            for status, result in zip(processed, results):
+                if isinstance(result, dict) and result.get("error"):
+                    status["status"] = "failed"
+                    status["error"] = result["error"]
+                else:
+                    status["status"] = "sent"
+        await _store_payloads(payloads, file.sha256)
+
+        response = {
+            "status": "success",
+            "message": "Workbook processed and data sent to Next.js API" if forward else "Workbook processed",
+            "file_name": file.filename,
+            "office_name": office_col,
             "directorate_name": directorate_col,
-            "data_sent": payload # Optionally return the payload sent
+            "sheets": sheet_status
         }
+        if include_payload:
+            response["batch"] = [_echoed(request, payload) for payload in payloads]
+        return _wire_response(request, response)
 
-    except requests.exceptions.RequestException as e:
-        print(f"[ERROR] Failed to send data to Next.js API: {e}")
+    except HTTPException:
+        raise
+    except ForwardError as e:
+        metrics.set_error_cause(request, "nextjs")
+        logger.error("Failed to send data to Next.js API: %s", e)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to send data to Next.js API: {str(e)}"
         )
     except Exception as e:
-        print("[EXCEPTION] Exception occurred in /process-excel endpoint:")
-        traceback.print_exc()
+        logger.exception("Exception occurred in /process-workbook endpoint")
         raise HTTPException(
             status_code=500,
             detail=f"Error processing file: {str(e)}"
         )
     finally:
-        # Clean up temporary file
-        if 'file_path' in locals() and os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-                print(f"[DEBUG] Temporary file removed: {file_path}")
-            except Exception as cleanup_error:
-                print(f"[WARNING] Failed to remove temporary file: {cleanup_error}")
+        # Unless a parse took the upload over, release it (and its spool file) here
+        if not file.handed_off:
+            file.close()
+
+@app.post("/admin/profile")
+def arm_profiling(request: Request, count: int = 1):
+    """Profile the next count /process-excel/ requests; their reports are stored in PROFILE_DIR"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if not PROFILE_DIR:
+        raise HTTPException(status_code=409, detail="PROFILE_DIR is not set, armed profiles could not be stored")
+    _profile_budget["remaining"] = max(0, count)
+    return {"status": "armed", "remaining": _profile_budget["remaining"]}
+
+@app.get("/admin/profiles")
+def list_profiles(request: Request):
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return {"profiles": profiling.list_reports(PROFILE_DIR), "remaining": _profile_budget["remaining"]}
+
+@app.get("/admin/profiles/{name}")
+def get_profile(request: Request, name: str):
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if name not in profiling.list_reports(PROFILE_DIR):
+        raise HTTPException(status_code=404, detail="No such profile")
+    with open(os.path.join(PROFILE_DIR, name), "rb") as f:
+        return Response(f.read(), media_type="application/json")
+
+@app.get("/admin/store/partitions")
+def list_store_partitions(request: Request, kind: str = None, year: str = None, month: str = None, directorate: str = None):
+    """The extraction store index: which (kind, year, month, directorate) partitions exist, their files and rows"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if store is None:
+        raise HTTPException(status_code=409, detail="The extraction store is not enabled (EXTRACTION_STORE_DIR)")
+    return {"partitions": store.partitions(kind, year, month, directorate)}
+
+@app.post("/admin/store/compact")
+def compact_store(request: Request, min_files: int = 2):
+    """Merge the part files of every partition that has at least min_files"""
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if store is None:
+        raise HTTPException(status_code=409, detail="The extraction store is not enabled (EXTRACTION_STORE_DIR)")
+    return {"compacted": store.compact(min_files)}
+
+@app.get("/admin/store/report")
+def get_store_report(request: Request, year: str = None, level: str = "chapters"):
+    """
+    Consolidated final report of one year (the current one by default) from the extraction store:
+    level totals per directorate and month with year-to-date values, grand totals and account categories
+    """
+    if not _is_admin(request):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    if store is None:
+        raise HTTPException(status_code=409, detail="The extraction store is not enabled (EXTRACTION_STORE_DIR)")
+    if level not in final_report.LEVELS:
+        raise HTTPException(status_code=400, detail=f"Invalid level. Must be one of: {', '.join(final_report.LEVELS)}")
+    year = year or str(datetime.datetime.now().year)
+    with metrics.stage("report"):
+        report = final_report.ConsolidatedReport.from_store(store, year)
+        return _wire_response(request, {"year": year, **report.summary(level)})
+
+@app.get("/wire/names")
+def get_wire_names(request: Request):
+    """The name dictionary compact payloads refer to; cache it by names_version (also the ETag)"""
+    etag = f'"{wire_format.NAMES_VERSION}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response = _wire_response(request, wire_format.name_dictionary())
+    response.headers["ETag"] = etag
+    return response
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text format. Every uvicorn worker process keeps its own counters."""
+    return Response(metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
 
 # Health check endpoint
 @app.get("/")
@@ -0,0 +1,138 @@
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional, Arrow output is then never negotiated
+    pa = pq = None
+
+from reading_Excel import ACCOUNT_TABLE
+from wire_format import parse_accept
+
+ARROW_STREAM_TYPE = "application/vnd.apache.arrow.stream"
+
+# Extracted sheets as Arrow tables: a sheet 1 result has one row per hierarchical
+# row (the non-zero types with their chapter/section/item), a sheet 2 result one
+# row per account. Without pyarrow wants_arrow() is always False and the API keeps
+# answering in JSON.
+
+_ACCOUNT_IDS = {(main_category, sub_category): account_id for main_category, sub_category, account_id in ACCOUNT_TABLE}
+
+# Columns naming the workbook of each row in batch tables
+_SOURCE_FIELDS = (("file_name", "string"), ("directorate_name", "string"))
+_HIERARCHY_FIELDS = (
+    ("month", "string"), ("chapter_id", "string"), ("section_id", "string"), ("item_id", "string"),
+    ("type_id", "string"), ("name", "string"), ("value", "float64"),
+)
+_ACCOUNT_FIELDS = (
+    ("month", "string"), ("account_id", "int32"), ("main_category", "string"), ("sub_category", "string"),
+    ("debit", "float64"), ("credit", "float64"),
+)
+
+
+def available():
+    return pa is not None
+
+
+def wants_arrow(accept):
+    return available() and parse_accept(accept).get(ARROW_STREAM_TYPE, 0) > 0
+
+
+def _schema(fields, metadata=None):
+    return pa.schema([(name, getattr(pa, type_name)()) for name, type_name in fields], metadata=metadata)
+
+
+def _hierarchy_columns(month, processed_data):
+    columns = processed_data.get("hierarchical_columns")
+    if columns is not None:
+        facts = columns["facts"]
+        paths = zip(facts["chapter_id"], facts["section_id"], facts["item_id"], facts["type_id"])
+        names = {row["type_id"]: row["name"] for row in columns["types"]}
+        rows = [(*path, names.get(path[3], path[3]), value) for path, value in zip(paths, facts["value"])]
+    else:
+        rows = [
+            (row["chapter_id"], row["section_id"], row["item_id"], row["type_id"], row["name"], float(row["value"]))
+            for row in processed_data.get("hierarchical_rows", [])
+        ]
+    return [[month] * len(rows)] + [list(column) for column in zip(*rows)] if rows else [[] for _ in _HIERARCHY_FIELDS]
+
+
+def _account_columns(month, processed_data):
+    rows = [
+        (_ACCOUNT_IDS[(main_category, sub_category)], main_category, sub_category, entry["debit"], entry["credit"])
+        for main_category, sub_categories in processed_data.items()
+        for sub_category, entry in sub_categories.items()
+    ]
+    return [[month] * len(rows)] + [list(column) for column in zip(*rows)] if rows else [[] for _ in _ACCOUNT_FIELDS]
+
+
+def sheet_table(month, sheet_number, processed_data, metadata=None):
+    """
+    One extracted sheet as a pyarrow Table.
+    metadata: str key/values stored in the schema (file, office and directorate names).
+    """
+    fields = _HIERARCHY_FIELDS if sheet_number == 1 else _ACCOUNT_FIELDS
+    to_columns = _hierarchy_columns if sheet_number == 1 else _account_columns
+    schema = _schema(fields, metadata)
+    return pa.Table.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(to_columns(month, processed_data or {}), schema)],
+        schema=schema
+    )
+
+
+def to_ipc_stream(table):
+    """The table in the Arrow IPC streaming format"""
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_parquet(workbooks, directory):
+    """
+    workbooks: (file_name, process_sheets result) pairs.
+    Writes every extracted sheet 1 to hierarchy.parquet and every sheet 2 to
+    accounts.parquet in directory, with file_name and directorate_name columns.
+    Returns the paths written.
+    """
+    tables = {1: [], 2: []}
+    for file_name, result in workbooks:
+        for sheet in result["sheets"]:
+            if sheet["processed_data"] is None:
+                continue
+            table = sheet_table(sheet["month"], sheet["sheet_number"], sheet["processed_data"])
+            source = [[file_name] * table.num_rows, [result["directorate_col"]] * table.num_rows]
+            for i, ((name, _), column) in enumerate(zip(_SOURCE_FIELDS, source)):
+                table = table.add_column(i, name, pa.array(column, type=pa.string()))
+            tables[sheet["sheet_number"]].append(table)
+
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for sheet_number, file_name, fields in ((1, "hierarchy.parquet", _HIERARCHY_FIELDS),
+                                            (2, "accounts.parquet", _ACCOUNT_FIELDS)):
+        schema = _schema(_SOURCE_FIELDS + fields)
+        table = pa.concat_tables(tables[sheet_number]) if tables[sheet_number] else schema.empty_table()
+        path = os.path.join(directory, file_name)
+        pq.write_table(table, path, compression="zstd")
+        paths.append(path)
+    return paths
+
+
+def main(directory, paths):
+    """
+    Batch mode: extract every mapped sheet of each workbook and write
+    hierarchy.parquet and accounts.parquet into directory.
+        python arrow_export.py out_dir workbook.xlsx [workbook.xlsx ...]
+    """
+    from excel_pipeline import process_sheets, workbook_sheets
+
+    if not available():
+        sys.exit("pyarrow is not installed")
+    workbooks = [(os.path.basename(path), process_sheets(path, workbook_sheets())) for path in paths]
+    for path in write_parquet(workbooks, directory):
+        print(f"{path}: {pq.read_metadata(path).num_rows} rows")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], sys.argv[2:])
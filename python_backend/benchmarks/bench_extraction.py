@@ -0,0 +1,116 @@
+"""
+Per-sheet extraction cost before and after the compiled extraction plans.
+
+"before" is the old scalar walk over ROW_COL_TO_TYPE / financial_accounts
+with df.iat / df.iloc; "after" is one gather over TYPE_PLAN / ACCOUNT_PLAN
+followed by one vectorized coercion. Both run on the same in-memory sheet so
+only the extraction step is measured; the "stream" rows add reading the sheet
+from an .xlsx held in memory.
+
+Run from python_backend:  python benchmarks/bench_extraction.py
+"""
+import io
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import Workbook
+
+from dic_of_accounts import financial_accounts
+from reading_Excel import (
+    ROW_COL_TO_TYPE, TYPE_PLAN, ACCOUNT_PLAN,
+    _type_values_from_block, _account_values_from_block
+)
+from cell_extractor import read_block
+
+
+def build_workbook(seed=0):
+    """Workbook with a type-values sheet (index 0) and an accounts sheet (index 1)"""
+    rnd = random.Random(seed)
+    wb = Workbook()
+    types_ws = wb.active
+    types_ws["A1"] = "header"
+    for (row, col) in ROW_COL_TO_TYPE:
+        types_ws.cell(row=row + 1, column=col, value=rnd.randint(1, 100000))
+    accounts_ws = wb.create_sheet()
+    for sub_categories in financial_accounts.values():
+        for accounts in sub_categories.values():
+            for col, row in (accounts['debit'], accounts['credit']):
+                accounts_ws.cell(row=row, column=col, value=rnd.uniform(0, 50000))
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def legacy_type_values(df):
+    type_values = {}
+    for (row, col), type_id in ROW_COL_TO_TYPE.items():
+        row_idx = row - 1
+        col_idx = col - 1
+        if row_idx < len(df) and col_idx < len(df.columns):
+            value = df.iat[row_idx, col_idx]
+            if value and str(value).strip():
+                type_values[type_id] = value
+    return type_values
+
+
+def legacy_accounts(df):
+    result_dict = {}
+    for main_category, sub_categories in financial_accounts.items():
+        result_dict[main_category] = {}
+        for sub_category, accounts in sub_categories.items():
+            debit_col, debit_row = accounts['debit']
+            credit_col, credit_row = accounts['credit']
+            try:
+                debit_value = df.iloc[debit_row - 1, debit_col - 1]
+                credit_value = df.iloc[credit_row - 1, credit_col - 1]
+                result_dict[main_category][sub_category] = {
+                    'debit': float(debit_value) if pd.notna(debit_value) and str(debit_value).strip() else 0.0,
+                    'credit': float(credit_value) if pd.notna(credit_value) and str(credit_value).strip() else 0.0
+                }
+            except (IndexError, ValueError):
+                result_dict[main_category][sub_category] = {'debit': 0.0, 'credit': 0.0}
+    return result_dict
+
+
+def best_of(func, number):
+    return min(timeit.repeat(func, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    content = build_workbook()
+    types_df = pd.read_excel(io.BytesIO(content), sheet_name=0, dtype=str, keep_default_na=False).fillna('')
+    accounts_df = pd.read_excel(io.BytesIO(content), sheet_name=1, header=None)
+    types_block = TYPE_PLAN.block_from_frame(types_df, header_rows=1)
+    accounts_block = ACCOUNT_PLAN.block_from_frame(accounts_df)
+
+    assert legacy_type_values(types_df) == _type_values_from_block(types_block)
+
+    rows = [
+        ("types: df.iat walk", best_of(lambda: legacy_type_values(types_df), 200)),
+        ("types: plan gather", best_of(lambda: _type_values_from_block(types_block), 200)),
+        ("accounts: df.iloc walk", best_of(lambda: legacy_accounts(accounts_df), 200)),
+        ("accounts: plan gather", best_of(lambda: _account_values_from_block(accounts_block), 200)),
+    ]
+    rows += [
+        ("types: read_excel + walk", best_of(lambda: legacy_type_values(
+            pd.read_excel(io.BytesIO(content), sheet_name=0, dtype=str, keep_default_na=False).fillna('')), 10)),
+        ("types: stream + gather", best_of(lambda: _type_values_from_block(
+            read_block(io.BytesIO(content), 0, TYPE_PLAN)[0]), 10)),
+        ("accounts: read_excel + walk", best_of(lambda: legacy_accounts(
+            pd.read_excel(io.BytesIO(content), sheet_name=1, header=None)), 10)),
+        ("accounts: stream + gather", best_of(lambda: _account_values_from_block(
+            read_block(io.BytesIO(content), 1, ACCOUNT_PLAN)[0]), 10)),
+    ]
+
+    print(f"{'stage':<32}{'per sheet (us)':>16}")
+    for name, micros in rows:
+        print(f"{name:<32}{micros:>16,.1f}")
+
+
+if __name__ == "__main__":
+    main()
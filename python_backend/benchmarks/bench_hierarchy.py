@@ -0,0 +1,67 @@
+"""
+Roll-up cost of the type -> item -> section -> chapter tree per sheet.
+
+"dicts" is HierarchicalDictionaries.update_values + print_structure on a
+fresh tree per sheet (what reading_first_sheet used to do), "dicts overlay"
+the same on a value overlay of the import-time template; "arrays" is
+HierarchyArrays.structures over a batch of sheets, and "arrays totals" only
+the batched roll-up without building the output dicts.
+
+Run from python_backend:  python benchmarks/bench_hierarchy.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dics_of_ExcelCells import HIERARCHY_TEMPLATE, build_hierarchy
+from hierarchy_arrays import HierarchyArrays
+from reading_Excel import ROW_COL_TO_TYPE
+
+
+def sheet_values(count, seed=0):
+    rnd = random.Random(seed)
+    type_ids = list(ROW_COL_TO_TYPE.values())
+    return [
+        {type_id: str(rnd.randint(1, 100000)) for type_id in type_ids if rnd.random() < 0.7}
+        for _ in range(count)
+    ]
+
+
+def per_sheet(label, seconds, sheets):
+    print(f"{label:<16}{seconds / sheets * 1e6:10.1f} us/sheet {sheets / seconds:12.0f} sheets/s")
+
+
+def main(sheets=2000):
+    batch = sheet_values(sheets)
+    engine = HierarchyArrays.from_dictionaries(build_hierarchy())
+
+    dict_sheets = batch[:200]
+    start = time.perf_counter()
+    for values in dict_sheets:
+        dict_system = build_hierarchy()
+        dict_system.update_values(values, 'types')
+        dict_system.print_structure()
+    per_sheet("dicts", time.perf_counter() - start, len(dict_sheets))
+
+    start = time.perf_counter()
+    for values in dict_sheets:
+        dict_system = HIERARCHY_TEMPLATE.overlay()
+        dict_system.update_values(values, 'types')
+        dict_system.print_structure()
+    per_sheet("dicts overlay", time.perf_counter() - start, len(dict_sheets))
+
+    start = time.perf_counter()
+    engine.structures(batch)
+    per_sheet("arrays", time.perf_counter() - start, sheets)
+
+    values, valid, _ = engine.parse_type_values(batch)
+    start = time.perf_counter()
+    engine.roll_up(values, valid)
+    per_sheet("arrays totals", time.perf_counter() - start, sheets)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Whole-workbook extraction time per Excel reader backend.
+
+Runs excel_readers.benchmark_readers on a template workbook: every mapped
+sheet is extracted with each installed reader (openpyxl, xlrd, calamine),
+and readers whose values differ from the standard one are reported and
+left out. This is the same benchmark EXCEL_READER=auto runs at startup
+when EXCEL_READER_BENCHMARK names a template.
+
+Run from python_backend:  python benchmarks/bench_readers.py path/to/template.xlsx
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from excel_readers import benchmark_readers
+
+
+def main(path, repeat=5):
+    timings = benchmark_readers(path, repeat)
+    print(f"{'reader':<12}{'per workbook (ms)':>20}")
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1]):
+        print(f"{name:<12}{seconds * 1000:>20,.1f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1])
@@ -0,0 +1,88 @@
+"""
+Consolidated final report over a full year of every directorate.
+
+Builds one sheet 1 and one sheet 2 payload per directorate and month
+(random values for ~70% of the types and every account), then times
+ConsolidatedReport from the payloads, from Arrow tables already in memory,
+and from an ExtractionStore holding them (one part file per sheet, then
+compacted to one file per partition), plus the JSON summary.
+
+Run from python_backend (needs pyarrow):
+    python benchmarks/bench_report.py [--directorates 30] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dic_of_accounts import financial_accounts
+from extraction_store import ExtractionStore
+from final_report import MONTHS, ConsolidatedReport
+from reading_Excel import ROW_COL_TO_TYPE
+
+
+def payloads(directorates, year="2025", seed=0):
+    rnd = random.Random(seed)
+    type_ids = list(ROW_COL_TO_TYPE.values())
+    built = []
+    for d in range(directorates):
+        for month in MONTHS:
+            common = {"file_name": f"d{d}-{month}.xlsx", "month": month, "year": year,
+                      "office_name": "مكتب المالية", "directorate_name": f"مديرية {d}"}
+            types = [{"id": type_id, "name": "", "value": str(rnd.randint(1, 100000))}
+                     for type_id in type_ids if rnd.random() < 0.7]
+            accounts = {
+                main_category: {sub_category: {"debit": rnd.uniform(0, 1e6), "credit": rnd.uniform(0, 1e6)}
+                                for sub_category in sub_categories}
+                for main_category, sub_categories in financial_accounts.items()
+            }
+            built.append({**common, "sheet_number_processed": 1, "processed_data": {"types": types}})
+            built.append({**common, "sheet_number_processed": 2, "processed_data": accounts})
+    return built
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--directorates", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    sheets = payloads(args.directorates)
+    with tempfile.TemporaryDirectory() as directory:
+        store = ExtractionStore(directory)
+        for i, payload in enumerate(sheets):
+            store.append_payload(payload, f"upload-{i}")
+        types, accounts = store.read("types", year="2025"), store.read("accounts", year="2025")
+        print(f"{args.directorates} directorates x 12 months: {len(sheets)} sheets, "
+              f"{types.num_rows} type rows, {accounts.num_rows} account rows")
+
+        report = ConsolidatedReport.from_tables(types, accounts)
+        results = [
+            ("from_payloads", best_of(args.repeat, lambda: ConsolidatedReport.from_payloads(sheets))),
+            ("from_tables", best_of(args.repeat, lambda: ConsolidatedReport.from_tables(types, accounts))),
+            ("from_store parts", best_of(args.repeat, lambda: ConsolidatedReport.from_store(store, "2025"))),
+        ]
+        store.compact()
+        results += [
+            ("from_store compacted", best_of(args.repeat, lambda: ConsolidatedReport.from_store(store, "2025"))),
+            ("summary chapters", best_of(args.repeat, lambda: report.summary("chapters"))),
+        ]
+    for label, seconds in results:
+        print(f"{label:<22}{seconds * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
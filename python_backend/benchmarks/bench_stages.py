@@ -0,0 +1,162 @@
+"""
+Per-stage timings on synthetic template workbooks, checked against stored baselines.
+
+Every stage runs on the upload bytes like a request does (so the read
+stages include loading the workbook), on month 1 of each scenario:
+excel_to_json, read_accounts_from_excel and reading_first_sheet on the
+sheets they read, propagate_values and print_structure on the type values
+of that sheet.
+
+Baselines live in benchmarks/baselines.json together with the machine,
+Python version and reader they were taken with, and the workbook shape and
+repeat count of each scenario. They are machine-dependent: re-save them on
+the machine that runs the comparison, with the same EXCEL_READER (the read
+stages use the configured reader). Saving on another machine, Python or
+reader replaces the stored timings instead of merging with them. A stage
+slower than its baseline by more than the tolerance is a regression and
+the script exits 1.
+
+Run from python_backend:
+    python benchmarks/bench_stages.py             compare against the baselines
+    python benchmarks/bench_stages.py --save      store the current timings as baselines
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dics_of_ExcelCells import HIERARCHY_TEMPLATE, reading_first_sheet
+from excel_pipeline import MONTHS_SHEET_MAPPING
+from excel_readers import reader_for
+from reading_Excel import excel_to_json, extract_type_values, read_accounts_from_excel
+from synthetic_workbook import generate_workbook
+
+BASELINES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines.json")
+
+# generate_workbook arguments per scenario
+SCENARIOS = {
+    "template": {},
+    "wide_range": {"rows": 1500, "cols": 40},
+    "many_sheets": {"extra_sheets": 60},
+}
+
+TYPES_SHEET = MONTHS_SHEET_MAPPING["1"][1]
+ACCOUNTS_SHEET = MONTHS_SHEET_MAPPING["1"][2]
+
+
+def _unpropagated_tree(type_values):
+    """A template overlay holding the type values with the totals not yet rolled up"""
+    tree = HIERARCHY_TEMPLATE.overlay()
+    for type_id, value in type_values.items():
+        if type_id in tree.types:
+            tree.types[type_id]["value"] = value
+    return tree
+
+
+def stages(content):
+    """{stage: callable} for one workbook"""
+    type_values = extract_type_values(content, TYPES_SHEET)
+    rolled_up = _unpropagated_tree(type_values)
+    rolled_up.propagate_values()
+    return {
+        "excel_to_json": lambda: excel_to_json(content, TYPES_SHEET),
+        "read_accounts_from_excel": lambda: read_accounts_from_excel(content, ACCOUNTS_SHEET),
+        "reading_first_sheet": lambda: reading_first_sheet(content, TYPES_SHEET),
+        "propagate_values": _unpropagated_tree(type_values).propagate_values,
+        "print_structure": rolled_up.print_structure,
+    }
+
+
+def best_of(func, repeat):
+    """Best seconds per call over repeat rounds of an auto-sized loop"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=repeat, number=number)) / number
+
+
+def run(scenarios, repeat):
+    timings = {}
+    for scenario in scenarios:
+        content = generate_workbook(**SCENARIOS[scenario])
+        timings[scenario] = {name: best_of(func, repeat) for name, func in stages(content).items()}
+    return timings
+
+
+def load_baselines(path=BASELINES_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def environment():
+    """What the timings depend on besides the code"""
+    return {"machine": platform.platform(), "python": platform.python_version(), "reader": reader_for("xlsx").name}
+
+
+def save_baselines(timings, repeat, path=BASELINES_PATH):
+    stored = load_baselines(path)
+    current = environment()
+    # Timings of another environment are not comparable and are dropped
+    same_environment = all(stored.get(key) == value for key, value in current.items())
+    baselines = stored.get("timings", {}) if same_environment else {}
+    scenarios = stored.get("scenarios", {}) if same_environment else {}
+    for scenario, stage_timings in timings.items():
+        baselines.setdefault(scenario, {}).update(stage_timings)
+        scenarios[scenario] = {"workbook": SCENARIOS[scenario], "repeat": repeat}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({**current, "scenarios": scenarios, "timings": baselines}, f, indent=2)
+        f.write("\n")
+
+
+def compare(timings, baselines, tolerance):
+    """Print current vs baseline per stage; returns the regressed (scenario, stage) pairs"""
+    regressions = []
+    print(f"{'scenario':<14}{'stage':<28}{'now (ms)':>12}{'baseline (ms)':>16}{'ratio':>8}")
+    for scenario, stage_timings in timings.items():
+        for name, seconds in stage_timings.items():
+            baseline = baselines.get(scenario, {}).get(name)
+            if baseline is None:
+                print(f"{scenario:<14}{name:<28}{seconds * 1000:>12,.3f}{'-':>16}{'-':>8}")
+                continue
+            ratio = seconds / baseline
+            flag = ""
+            if ratio > 1 + tolerance:
+                regressions.append((scenario, name))
+                flag = "  REGRESSION"
+            print(f"{scenario:<14}{name:<28}{seconds * 1000:>12,.3f}{baseline * 1000:>16,.3f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", action="store_true", help="store the timings as the new baselines")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these scenarios")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, 0.25 = 25%%")
+    args = parser.parse_args()
+
+    baselines = load_baselines()
+    for key, value in environment().items():
+        if baselines.get(key, value) != value:
+            print(f"Note: baselines were taken with {key} {baselines[key]}, this run uses {value}")
+    for scenario in args.scenario or SCENARIOS:
+        stored = baselines.get("scenarios", {}).get(scenario)
+        if stored is not None and stored["workbook"] != SCENARIOS[scenario]:
+            print(f"Note: the {scenario} baselines were taken on a {stored['workbook']} workbook")
+    timings = run(args.scenario or list(SCENARIOS), args.repeat)
+    regressions = compare(timings, baselines.get("timings", {}), args.tolerance)
+    if args.save:
+        save_baselines(timings, args.repeat)
+        print(f"Baselines saved to {BASELINES_PATH}")
+    elif regressions:
+        print(f"{len(regressions)} stage(s) slower than baseline by more than {args.tolerance:.0%}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+End-to-end load test of /process-excel/.
+
+Starts the API (uvicorn) with its result cache off and NEXTJS_API_URL
+pointing at a local nextjs_stub.py, then drives /process-excel/ with
+synthetic template workbooks (a pool of distinct ones, cycling over every
+month and sheet) at each concurrency level. For every level it reports
+throughput, latency percentiles, errors, what the stub received, and the
+peak memory of the API process and its worker processes (read from /proc,
+so Linux only). The level after which more concurrency stops adding
+throughput is reported as the saturation point. The API logs only
+CRITICAL records unless LOG_LEVEL is set.
+
+Run from python_backend (needs uvicorn):
+    python benchmarks/loadtest.py --concurrency 1,2,4,8,16 --requests 100 \\
+        --workers 4 --latency-ms 50 --failure-rate 0.01
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from excel_pipeline import workbook_sheets
+from synthetic_workbook import generate_workbook
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STUB_SCRIPT = os.path.join(BACKEND_DIR, "benchmarks", "nextjs_stub.py")
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+# Throughput gain below which a higher concurrency level no longer counts as scaling
+SATURATION_GAIN = 0.10
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _start(args, env=None):
+    return subprocess.Popen(args, cwd=BACKEND_DIR, env={**os.environ, **(env or {})})
+
+
+def _wait_ready(url, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before it was ready")
+        try:
+            if httpx.get(url, timeout=1).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} was not ready after {timeout} s")
+
+
+def _stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def _descendants(pid):
+    """pids of every process below pid, from the parent pids in /proc"""
+    parents = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after its closing parenthesis
+                parents.setdefault(int(f.read().rsplit(")", 1)[1].split()[1]), []).append(int(entry))
+        except (OSError, IndexError, ValueError):
+            continue
+    found, stack = [], [pid]
+    while stack:
+        children = parents.get(stack.pop(), [])
+        found.extend(children)
+        stack.extend(children)
+    return found
+
+
+def _rss_bytes(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+def _role(pid):
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            cmdline = f.read().replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return None
+    if "resource_tracker" in cmdline:
+        return None
+    return "worker" if "multiprocessing" in cmdline else "api"
+
+
+class MemorySampler:
+    """Peak RSS of the API process and each worker process while running"""
+
+    def __init__(self, pid, interval=0.2):
+        self.pid = pid
+        self.interval = interval
+        self.peaks = {}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if os.path.isdir("/proc"):
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for pid in [self.pid] + _descendants(self.pid):
+                role = "api" if pid == self.pid else _role(pid)
+                rss = _rss_bytes(pid)
+                if role and rss:
+                    self.peaks[pid] = (role, max(rss, self.peaks.get(pid, (role, 0))[1]))
+            self._stop.wait(self.interval)
+
+    def summary(self):
+        api = [rss for role, rss in self.peaks.values() if role == "api"]
+        workers = [rss for role, rss in self.peaks.values() if role == "worker"]
+        return {
+            "api_rss_bytes": max(api) if api else None,
+            "worker_count": len(workers),
+            "worker_rss_max_bytes": max(workers) if workers else None,
+            "worker_rss_mean_bytes": sum(workers) / len(workers) if workers else None,
+        }
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    return sorted_values[max(0, math.ceil(q * len(sorted_values)) - 1)]
+
+
+async def drive(api_url, workbooks, requests, concurrency, timeout):
+    """Send requests uploads with concurrency in flight; returns (elapsed seconds, [(latency, outcome)])"""
+    sheets = workbook_sheets()
+    results = []
+    next_index = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        async def user():
+            for i in next_index:
+                month, sheet_number, _ = sheets[i % len(sheets)]
+                files = {"file": (f"synthetic-{i % len(workbooks)}.xlsx", workbooks[i % len(workbooks)], XLSX_MIME)}
+                data = {"month": month, "sheet_number": str(sheet_number)}
+                start = time.perf_counter()
+                try:
+                    response = await client.post(f"{api_url}/process-excel/", files=files, data=data)
+                    outcome = response.status_code
+                except httpx.HTTPError as e:
+                    outcome = type(e).__name__
+                results.append((time.perf_counter() - start, outcome))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(user() for _ in range(concurrency)))
+        return time.perf_counter() - start, results
+
+
+def run_level(api_url, stub_url, api_pid, workbooks, requests, concurrency, timeout):
+    httpx.post(f"{stub_url}/stats/reset")
+    sampler = MemorySampler(api_pid)
+    with sampler:
+        elapsed, results = asyncio.run(drive(api_url, workbooks, requests, concurrency, timeout))
+    latencies = sorted(latency for latency, outcome in results if outcome == 200)
+    errors = {}
+    for _, outcome in results:
+        if outcome != 200:
+            errors[str(outcome)] = errors.get(str(outcome), 0) + 1
+    return {
+        "concurrency": concurrency,
+        "requests": len(results),
+        "ok": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "p50_seconds": percentile(latencies, 0.50),
+        "p90_seconds": percentile(latencies, 0.90),
+        "p99_seconds": percentile(latencies, 0.99),
+        "max_seconds": latencies[-1] if latencies else None,
+        "stub": httpx.get(f"{stub_url}/stats").json(),
+        **sampler.summary(),
+    }
+
+
+def saturation_level(levels):
+    """The first level whose successor adds less than SATURATION_GAIN throughput, or None"""
+    for current, following in zip(levels, levels[1:]):
+        if following["throughput_rps"] < current["throughput_rps"] * (1 + SATURATION_GAIN):
+            return current
+    return None
+
+
+def _ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:,.0f}"
+
+
+def _mb(size):
+    return "-" if size is None else f"{size / 2**20:,.0f}"
+
+
+def report(levels):
+    print(f"{'conc':>5}{'ok':>6}{'err':>5}{'req/s':>9}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"
+          f"{'api MB':>8}{'wkr MB':>8}{'wkrs':>6}  errors")
+    for level in levels:
+        print(f"{level['concurrency']:>5}{level['ok']:>6}{level['requests'] - level['ok']:>5}"
+              f"{level['throughput_rps']:>9.2f}{_ms(level['p50_seconds']):>9}{_ms(level['p90_seconds']):>9}"
+              f"{_ms(level['p99_seconds']):>9}{_ms(level['max_seconds']):>9}"
+              f"{_mb(level['api_rss_bytes']):>8}{_mb(level['worker_rss_max_bytes']):>8}{level['worker_count']:>6}"
+              f"  {level['errors'] or ''}")
+    saturated = saturation_level(levels)
+    if saturated:
+        print(f"Throughput saturates at concurrency {saturated['concurrency']} "
+              f"({saturated['throughput_rps']:.2f} req/s, p99 {_ms(saturated['p99_seconds'])} ms)")
+    else:
+        print("Throughput was still rising at the highest concurrency level")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", default="1,2,4,8,16", help="comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=100, help="requests per level")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="EXCEL_WORKERS of the API")
+    parser.add_argument("--workbooks", type=int, default=8, help="distinct synthetic workbooks to upload")
+    parser.add_argument("--rows", type=int, default=0, help="inflate the workbooks' used range to this many rows")
+    parser.add_argument("--cols", type=int, default=0, help="... and this many columns")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Next.js stub delay per saved payload")
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of Next.js saves that fail")
+    parser.add_argument("--timeout", type=float, default=300.0, help="client timeout per request, seconds")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    workbooks = [generate_workbook(args.rows, args.cols, seed=seed) for seed in range(args.workbooks)]
+    stub_port, api_port = _free_port(), _free_port()
+    stub_url, api_url = f"http://127.0.0.1:{stub_port}", f"http://127.0.0.1:{api_port}"
+
+    stub = _start([sys.executable, STUB_SCRIPT, "--port", str(stub_port), "--latency-ms", str(args.latency_ms),
+                   "--jitter-ms", str(args.jitter_ms), "--failure-rate", str(args.failure_rate)])
+    api = None
+    try:
+        _wait_ready(f"{stub_url}/stats", stub)
+        api = _start(
+            [sys.executable, "-m", "uvicorn", "Api_for_excels:app", "--host", "127.0.0.1",
+             "--port", str(api_port), "--log-level", "warning"],
+            env={
+                "NEXTJS_API_URL": f"{stub_url}/api/data/process",
+                "EXCEL_WORKERS": str(args.workers),
+                # Every upload must really be parsed
+                "RESULT_CACHE_SIZE": "0",
+                "RESULT_CACHE_DIR": "",
+                # Injected Next.js failures would log a traceback each; they are counted in the report
+                "LOG_LEVEL": os.environ.get("LOG_LEVEL", "CRITICAL"),
+            },
+        )
+        _wait_ready(f"{api_url}/", api)
+        # Warm the worker processes up before measuring
+        asyncio.run(drive(api_url, workbooks, args.workers, args.workers, args.timeout))
+
+        levels = []
+        for concurrency in (int(level) for level in args.concurrency.split(",")):
+            levels.append(run_level(api_url, stub_url, api.pid, workbooks, args.requests, concurrency, args.timeout))
+    finally:
+        for process in (api, stub):
+            if process is not None:
+                _stop(process)
+
+    report(levels)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"settings": vars(args), "levels": levels}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Local stand-in for the Next.js ingest endpoint (NEXTJS_API_URL) for load tests.
+
+Answers like src/app/api/data/process/route.ts, single payloads and
+{"batch": [...]} alike, after a configurable latency per saved payload
+(the real route saves batch items one after the other), and fails a
+configurable share of the saves: a 500 for a single payload, an error
+result for a batch item. Gzipped bodies (NEXTJS_GZIP) are accepted.
+GET /stats returns what it received.
+
+Run from python_backend:
+    python benchmarks/nextjs_stub.py [--port 3000] [--latency-ms 50] [--jitter-ms 10] [--failure-rate 0.01]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import sys
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+PROCESS_PATH = "/api/data/process"
+
+
+def create_app(latency_ms=0.0, jitter_ms=0.0, failure_rate=0.0, seed=None):
+    app = FastAPI()
+    rnd = random.Random(seed)
+    stats = Counter()
+
+    async def save(payload):
+        """One simulated save; False when a failure is injected"""
+        delay = latency_ms + rnd.uniform(-jitter_ms, jitter_ms)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        stats["payloads"] += 1
+        stats["payload_bytes"] += len(str(payload))
+        if rnd.random() < failure_rate:
+            stats["failed"] += 1
+            return False
+        return True
+
+    @app.post(PROCESS_PATH)
+    async def process(request: Request):
+        raw = await request.body()
+        if request.headers.get("content-encoding") == "gzip":
+            raw = gzip.decompress(raw)
+        body = json.loads(raw)
+        stats["requests"] += 1
+        if isinstance(body, dict) and isinstance(body.get("batch"), list):
+            stats["batches"] += 1
+            results = []
+            for data in body["batch"]:
+                if await save(data):
+                    results.append({"message": "Data processed and saved successfully"})
+                else:
+                    results.append({"error": "Failed to process data"})
+            return {"results": results}
+        if not await save(body):
+            return JSONResponse({"error": "Failed to process data"}, status_code=500)
+        return {"message": "Data processed and saved successfully"}
+
+    @app.get("/stats")
+    async def get_stats():
+        return dict(stats)
+
+    @app.post("/stats/reset")
+    async def reset_stats():
+        stats.clear()
+        return {}
+
+    return app
+
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay per saved payload")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="uniform +/- variation of the delay")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="share of saves that fail, 0..1")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+    app = create_app(args.latency_ms, args.jitter_ms, args.failure_rate, args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
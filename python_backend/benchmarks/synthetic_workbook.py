@@ -0,0 +1,125 @@
+"""
+Synthetic workbooks laid out like the monthly template.
+
+Sheet 0 carries the directorate name in C2, each month of
+MONTHS_SHEET_MAPPING gets its sheet pair: the type sheet with values at the
+ROW_COL_TO_TYPE cells (and the office / directorate header in A1:H1), the
+accounts sheet with debit/credit values at the financial_accounts cells.
+rows / cols inflate the used range of every sheet with filler cells outside
+the mapped ones, extra_sheets appends unmapped sheets after the template's.
+
+Run from python_backend:
+    python benchmarks/synthetic_workbook.py out.xlsx [rows] [cols] [extra_sheets]
+"""
+import io
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openpyxl import Workbook
+
+from dic_of_accounts import financial_accounts
+from dics_of_ExcelCells import TYPE_DATA
+from excel_pipeline import MONTHS_SHEET_MAPPING
+from reading_Excel import TYPE_CELL_COORDINATES
+
+# Sheet index -> "types" / "accounts" for every mapped sheet
+SHEET_KINDS = {
+    actual_sheet_index: "types" if sheet_number == 1 else "accounts"
+    for sheets in MONTHS_SHEET_MAPPING.values()
+    for sheet_number, actual_sheet_index in sheets.items()
+}
+TEMPLATE_SHEET_COUNT = max(SHEET_KINDS) + 1
+
+# financial_accounts stores (col, row)
+ACCOUNT_CELLS = [
+    (row, col)
+    for sub_categories in financial_accounts.values()
+    for accounts in sub_categories.values()
+    for col, row in (accounts['debit'], accounts['credit'])
+]
+
+
+def _amount(rnd, blank_ratio):
+    """An amount as the template holds them: mostly whole numbers, some with fils, some left blank"""
+    draw = rnd.random()
+    if draw < blank_ratio:
+        return None
+    if draw < blank_ratio + (1 - blank_ratio) * 0.8:
+        return rnd.randint(1, 500000)
+    return round(rnd.uniform(1, 50000), 2)
+
+
+def _type_sheet_cells(rnd, directorate):
+    cells = {(1, 1): "مكتب المالية", (1, 8): directorate}
+    for (row, col), type_id in TYPE_CELL_COORDINATES.items():
+        cells[(row, 2)] = TYPE_DATA.get(type_id, type_id)
+        value = _amount(rnd, blank_ratio=0.3)
+        if value is not None:
+            cells[(row, col)] = value
+    return cells
+
+
+def _account_sheet_cells(rnd):
+    cells = {}
+    for cell in ACCOUNT_CELLS:
+        value = _amount(rnd, blank_ratio=0.2)
+        if value is not None:
+            cells[cell] = value
+    return cells
+
+
+def _inflate(cells, rnd, rows, cols):
+    """Filler numbers on every row up to rows and every column up to cols, beside the mapped cells"""
+    if not cells:
+        cells[(1, 1)] = "ملاحظات"
+    used_rows = max(row for row, _ in cells)
+    used_cols = max(col for _, col in cells)
+    for row in range(1, max(rows, used_rows) + 1):
+        first_col = 1 if row > used_rows else used_cols + 1
+        for col in range(first_col, cols + 1):
+            cells[(row, col)] = rnd.randint(0, 1000)
+
+
+def generate_workbook(rows=0, cols=0, extra_sheets=0, directorate="المكلا", seed=0):
+    """
+    The .xlsx bytes of a template-shaped workbook.
+    rows / cols: inflate every sheet's used range to at least this many rows / columns.
+    extra_sheets: unmapped sheets added after the template's.
+    """
+    rnd = random.Random(seed)
+    wb = Workbook(write_only=True)
+    for index in range(TEMPLATE_SHEET_COUNT + extra_sheets):
+        kind = SHEET_KINDS.get(index)
+        if index == 0:
+            cells = {(1, 1): "التقرير المالي الشهري", (2, 3): f"مديرية: {directorate}"}
+        elif kind == "types":
+            cells = _type_sheet_cells(rnd, f"مديرية {directorate}")
+        elif kind == "accounts":
+            cells = _account_sheet_cells(rnd)
+        else:
+            cells = {}
+        if rows or cols:
+            _inflate(cells, rnd, rows, cols)
+
+        ws = wb.create_sheet(f"Sheet{index + 1}")
+        width = max((col for _, col in cells), default=0)
+        for row in range(1, max((row for row, _ in cells), default=0) + 1):
+            ws.append([cells.get((row, col)) for col in range(1, width + 1)])
+
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+def main(path, rows=0, cols=0, extra_sheets=0):
+    content = generate_workbook(rows, cols, extra_sheets)
+    with open(path, "wb") as f:
+        f.write(content)
+    print(f"{path}: {len(content):,} bytes, {TEMPLATE_SHEET_COUNT + extra_sheets} sheets")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1], *(int(arg) for arg in sys.argv[2:5]))
@@ -0,0 +1,146 @@
+import numpy as np
+import pandas as pd
+
+from workbook_session import WorkbookSession
+
+# Strings pandas treats as missing by default (keep_default_na=True)
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan',
+    '1.#IND', '1.#QNAN', '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a',
+    'nan', 'null'
+}
+
+
+def stream_cells(session, sheet_name, coordinates):
+    """
+    Stream a sheet of an open WorkbookSession and pick only the requested cells.
+
+    coordinates: iterable of 1-based (row, col) pairs.
+    Returns {(row, col): value} converted like pandas would. Rows are read in
+    order up to the last requested one, so the cost depends on the mapped
+    region, not on the sheet's used range.
+    """
+    wanted = {}
+    for row, col in coordinates:
+        wanted.setdefault(row, []).append(col)
+    if not wanted:
+        return {}
+
+    last_row = max(wanted)
+    last_col = max(max(cols) for cols in wanted.values())
+    reader = session.reader
+    found = {}
+    for row_idx, row in enumerate(reader.rows(session.book, sheet_name, last_row, last_col), start=1):
+        cols = wanted.get(row_idx)
+        if not cols:
+            continue
+        for col in cols:
+            if col <= len(row):
+                found[(row_idx, col)] = reader.convert(row[col - 1])
+    return found
+
+
+class ExtractionPlan:
+    """
+    Compiled form of a cell map: flat 0-based row/col index arrays plus the id
+    of every cell, so all values of a sheet come out of one fancy-index gather.
+    coordinates are 1-based (row, col) pairs, ids the matching identifiers.
+    """
+
+    def __init__(self, coordinates, ids):
+        coords = np.asarray(list(coordinates), dtype=np.intp).reshape(-1, 2)
+        self.rows = coords[:, 0] - 1
+        self.cols = coords[:, 1] - 1
+        self.ids = np.asarray(list(ids), dtype=object)
+        self.shape = (int(self.rows.max()) + 1, int(self.cols.max()) + 1)
+        # Needed 0-based columns per 0-based row, used while streaming
+        self.row_columns = {}
+        for row, col in zip(self.rows.tolist(), self.cols.tolist()):
+            self.row_columns.setdefault(row, []).append(col)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def gather(self, block):
+        """Pick every planned cell out of a (rows, cols) block"""
+        return block[self.rows, self.cols]
+
+    def block_from_frame(self, df, header_rows=0):
+        """
+        Object block of self.shape built from a DataFrame; cells outside it stay
+        empty. header_rows is the number of sheet rows the frame used as header.
+        """
+        block = np.full(self.shape, "", dtype=object)
+        values = df.to_numpy(dtype=object)[:self.shape[0] - header_rows, :self.shape[1]]
+        block[header_rows:header_rows + values.shape[0], :values.shape[1]] = values
+        return block
+
+
+def stream_block(session, sheet_name, plan):
+    """
+    Stream a sheet of an open WorkbookSession into an object block holding
+    only the planned cells (converted like pandas would); everything else stays "".
+    Returns (block, has_data) where has_data tells whether any streamed row held a value.
+    """
+    block = np.full(plan.shape, "", dtype=object)
+    has_data = False
+    row_columns = plan.row_columns
+    reader = session.reader
+    convert, is_blank = reader.convert, reader.is_blank
+    for row_idx, row in enumerate(reader.rows(session.book, sheet_name, plan.shape[0], plan.shape[1])):
+        if not has_data:
+            has_data = not all(is_blank(cell) for cell in row)
+        cols = row_columns.get(row_idx)
+        if not cols:
+            continue
+        for col in cols:
+            if col < len(row):
+                block[row_idx, col] = convert(row[col])
+    return block, has_data
+
+
+def read_block(source, sheet_name, plan):
+    """stream_block for a path, bytes, a file-like object or a WorkbookSession"""
+    if isinstance(source, WorkbookSession):
+        return stream_block(source, sheet_name, plan)
+    with WorkbookSession(source) as session:
+        return stream_block(session, sheet_name, plan)
+
+
+def to_text(values):
+    """Vectorized text conversion of gathered values: None becomes "", everything else str()"""
+    values = np.asarray(values, dtype=object)
+    return np.where(np.equal(values, None), "", values).astype(str)
+
+
+def to_numbers(values):
+    """
+    Vectorized numeric coercion of gathered values.
+    Returns (numbers, invalid): blank and NA-like cells give 0.0, text that is
+    not a number gives 0.0 and is flagged in the invalid mask.
+    """
+    values = np.asarray(values, dtype=object)
+    blank = pd.isna(values) | np.equal(values, "")
+    try:
+        # Fast path: every non-blank cell already holds a number
+        numbers = np.where(blank, 0.0, values).astype(np.float64)
+        invalid = np.zeros(len(values), dtype=bool)
+    except (TypeError, ValueError):
+        series = pd.Series(values, dtype=object)
+        blank |= (series.isin(NA_STRINGS) | series.astype(str).str.strip().eq("")).to_numpy()
+        numbers = pd.to_numeric(series.where(~blank, 0), errors='coerce').to_numpy(dtype=np.float64, copy=True)
+        invalid = np.isnan(numbers) & ~blank
+    # NaN can only come from NA-like text ("nan") or missing cells here
+    numbers[np.isnan(numbers)] = 0.0
+    return numbers, invalid
+
+
+def read_cells(source, sheet_name, coordinates):
+    """
+    Read the given 1-based (row, col) coordinates from a sheet without building
+    a DataFrame. source may be a path, bytes, a file-like object or a WorkbookSession.
+    """
+    if isinstance(source, WorkbookSession):
+        return stream_cells(source, sheet_name, coordinates)
+    with WorkbookSession(source) as session:
+        return stream_cells(session, sheet_name, coordinates)
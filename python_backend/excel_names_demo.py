@@ -1,15 +1,17 @@
-import pandas as pd
-import json
+import logging
+from workbook_session import read_sheet
+from cell_extractor import read_cells
+
+logger = logging.getLogger(__name__)
 
 def get_excel_cell_value(file_path, sheet_name, cell_row, cell_col):
     """
     ترجع قيمة الخلية المطلوبة من ملف الإكسل (وليس اسم العمود)
     """
     try:
-        df = pd.read_excel(
+        df = read_sheet(
             file_path,
-            engine='openpyxl',
-            sheet_name=sheet_name,
+            sheet_name,
             keep_default_na=False,
             dtype=str
         ).fillna('')
@@ -18,16 +20,15 @@ def get_excel_cell_value(file_path, sheet_name, cell_row, cell_col):
         else:
             return ""
     except Exception as e:
-        print(f"❌ خطأ: {str(e)}")
+        logger.error("❌ خطأ: %s", e)
         return ""
 
 def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321,
                  cell_row=None, cell_col=None):
     try:
-        df = pd.read_excel(
+        df = read_sheet(
             file_path,
-            engine='openpyxl',
-            sheet_name=sheet_name,
+            sheet_name,
             keep_default_na=False,
             dtype=str
         ).fillna('')
@@ -38,22 +39,32 @@ def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321,
             try:
                 cell_value = df.iat[cell_row, cell_col]
                 col_name = df.columns[cell_col]
-                print(f"اسم العمود: '{col_name}'")
+                logger.debug("اسم العمود: '%s'", col_name)
             except IndexError:
-                print(f"❌ خطأ: المؤشر خارج النطاق")
+                logger.error("❌ خطأ: المؤشر خارج النطاق")
         return cell_value, col_name
     except Exception as e:
-        print(f"❌ خطأ: {str(e)}")
+        logger.error("❌ خطأ: %s", e)
         return None, None 
 
+def _header_names(values):
+    """Column names pandas gives a header row: blanks become 'Unnamed: i' and duplicates get '.n'"""
+    names = []
+    counts = {}
+    for i, value in enumerate(values):
+        name = f"Unnamed: {i}" if value is None or value == "" else value
+        cur_count = counts.get(name, 0)
+        while cur_count > 0:
+            counts[name] = cur_count + 1
+            name = f"{name}.{cur_count}"
+            cur_count = counts.get(name, 0)
+        counts[name] = cur_count + 1
+        names.append(name)
+    return names
+
 def get_column_names(file_path):
-    df = pd.read_excel(
-        file_path,
-        engine='openpyxl',
-        sheet_name=2,  # الورقة الثانية (Sheet 2) لأن الترقيم يبدأ من 0
-        keep_default_na=False,
-        dtype=str
-    )
-    office_col_name = df.columns[0]   # اسم العمود الأول
-    directorate_col_name = df.columns[7]  # اسم العمود الثامن
-    return office_col_name, directorate_col_name 
\ No newline at end of file
+    # Only the header row (A1:H1) is needed, so stream it instead of reading the whole sheet.
+    # file_path can also be an open WorkbookSession, so sheet 2 is not re-read from disk
+    cells = read_cells(file_path, 2, [(1, col) for col in range(1, 9)])
+    header = _header_names([cells.get((1, col), "") for col in range(1, 9)])
+    return header[0], header[7]
@@ -0,0 +1,259 @@
+import logging
+import os
+import pandas as pd
+
+from cell_extractor import NA_STRINGS, read_cells
+from reading_Excel import read_accounts_from_excel
+from dics_of_ExcelCells import reading_first_sheet
+from excel_names_demo import get_column_names
+from excel_readers import reader_for
+from hierarchy_arrays import COLUMNAR_STRUCTURE_KEYS, STRUCTURE_KEYS
+from log_setup import Capped
+from metrics import stage
+from preflight import InvalidWorkbookError, validate_workbook
+from workbook_session import WorkbookSession, as_file, is_path
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever a change alters what the extractors return, so cached results of older code are not reused
+EXTRACTOR_VERSION = "2"
+
+# Lists of a sheet 1 result per row layout: hierarchical_rows, or the same rows
+# as dimension sets plus a columnar fact block for bulk inserts
+ROW_LAYOUTS = {"rows": STRUCTURE_KEYS, "columnar": COLUMNAR_STRUCTURE_KEYS}
+
+# Sheet mapping dictionary
+MONTHS_SHEET_MAPPING = {
+    "1": {
+        1: 2,
+        2: 3
+    },
+    "2": {
+        1: 5,
+        2: 6
+    },
+    "3": {
+        1: 8,
+        2: 9
+    },
+    "4": {
+        1: 11,
+        2: 12
+    },
+    "5": {
+        1: 14,
+        2: 15
+    },
+    "6": {
+        1: 17,
+        2: 18
+    },
+    "7": {
+        1: 20,
+        2: 21
+    },
+    "8": {
+        1: 23,
+        2: 24
+    },
+    "9": {
+        1: 26,
+        2: 27
+    },
+    "10": {
+        1: 29,
+        2: 30
+    },
+    "11": {
+        1: 32,
+        2: 33
+    },
+    "12": {
+        1: 35,
+        2: 36
+    }
+}
+
+
+# Sheet 0 cell holding the directorate name (C2), 1-based (row, col)
+DIRECTORATE_CELL = (2, 3)
+
+# Helper function to get directorate name from Excel file
+def get_directorate_name(file_path):
+    try:
+        if isinstance(file_path, WorkbookSession):
+            return _directorate_from_session(file_path)
+
+        if is_path(file_path):
+            # First, validate that the file exists and is readable
+            if not os.path.exists(file_path):
+                logger.error("File does not exist: %s", file_path)
+                return None
+
+            # Check file size
+            file_size = os.path.getsize(file_path)
+            if file_size == 0:
+                logger.error("File is empty: %s", file_path)
+                return None
+
+        # Open the workbook with the engine matching the file's format
+        try:
+            with WorkbookSession(file_path) as session:
+                return _directorate_from_session(session)
+        except Exception as excel_error:
+            logger.error("Error reading Excel file: %s", excel_error)
+            return "مديرية غير محددة"
+
+    except Exception as e:
+        logger.error("Error extracting directorate name: %s", e)
+        return "مديرية غير محددة"
+
+def _directorate_from_session(session):
+    """
+    Only C2 is streamed. When it holds no text name, sheet 0 is parsed as a
+    frame as before, so an empty or too small sheet still gives None, a blank
+    cell "مديرية غير محددة" and a number the frame's formatting of it.
+    """
+    directorate = read_cells(session, 0, [DIRECTORATE_CELL]).get(DIRECTORATE_CELL)
+    if isinstance(directorate, str) and directorate not in NA_STRINGS and directorate.strip():
+        return str(directorate).replace('مديرية:', '').strip()
+    source = session.source
+    return _directorate_from_frame(session.read_sheet(0, header=None), source if is_path(source) else "uploaded workbook")
+
+def _directorate_from_frame(df, file_path):
+    # Check if dataframe is empty
+    if df.empty:
+        logger.error("Excel file is empty or has no data: %s", file_path)
+        return None
+
+    # Assuming directorate name is in cell (1, 2) based on 10.xlsx
+    # Adjust row and column for 0-based indexing
+    if len(df) > 1 and len(df.columns) > 2:
+        directorate = df.iloc[1, 2] # Row 2, Column 3 (C2)
+        if pd.notna(directorate) and str(directorate).strip():
+            return str(directorate).replace('مديرية:', '').strip()
+        else:
+            logger.warning("Directorate cell is empty or NaN")
+            return "مديرية غير محددة"
+    else:
+        logger.error("Excel file doesn't have enough rows/columns: %s", file_path)
+        return None
+
+def _open_session(source, sheet_indexes=(), reader=None):
+    # Pre-flight: tell the format from the file signature and check from the
+    # workbook directory that the required sheets exist, so corrupt or
+    # incomplete files are rejected before any sheet is parsed.
+    # The workbook is then loaded once with the configured reader for its format
+    # and every later step reads from this session.
+    try:
+        with stage("validation"):
+            info = validate_workbook(source, sheet_indexes)
+            session = WorkbookSession(as_file(source), reader=reader_for(info.format, reader))
+        logger.debug("File validation successful", extra={
+            "format": info.format, "sheets": len(info.sheet_names), "reader": session.reader.name
+        })
+    except Exception as validation_error:
+        logger.warning("File validation failed: %s", validation_error)
+        raise InvalidWorkbookError(str(validation_error))
+    return session
+
+def _extract_sheet(session, sheet_number, actual_sheet_index, row_layout="rows"):
+    if sheet_number == 1:
+        processed_data = reading_first_sheet(
+             excel_file_path=session,
+             sheet_num=actual_sheet_index,
+             include=ROW_LAYOUTS[row_layout]
+        )
+        # Debug: processed_data keys and a sample of hierarchical_rows
+        if isinstance(processed_data, dict) and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("processed_data keys: %s", list(processed_data.keys()))
+            if 'hierarchical_rows' in processed_data:
+                logger.debug("hierarchical_rows sample: %s", Capped(processed_data['hierarchical_rows']))
+            else:
+                logger.debug("No hierarchical_rows in processed_data")
+        return processed_data
+    # sheet_number == 2
+    with stage("sheet_extraction"):
+        return read_accounts_from_excel(
+            file_path=session,
+            sheet_name=actual_sheet_index
+        )
+
+def process_workbook(source, sheet_number, actual_sheet_index, row_layout="rows"):
+    """
+    Parse one uploaded workbook and extract the requested sheet.
+    source is the upload itself (bytes or a file-like object) or a path.
+    row_layout: a ROW_LAYOUTS key, the layout of a sheet 1 result.
+    This is the CPU-bound part of /process-excel/; it runs inside a worker
+    process and only returns plain, picklable data.
+    """
+    # Sheet 0 holds the directorate name, sheet 2 the column names
+    session = _open_session(source, (0, 2, actual_sheet_index))
+    try:
+        # Extract directorate name from the Excel file
+        with stage("directorate"):
+            directorate_name = get_directorate_name(session)
+        processed_data = _extract_sheet(session, sheet_number, actual_sheet_index, row_layout)
+        # استخراج اسم العمود للمكتب والمديرية من الورقة الثانية (Sheet 2)
+        with stage("column_names"):
+            office_col, directorate_col = get_column_names(session)
+    finally:
+        session.close()
+
+    return {
+        "directorate_name": directorate_name,
+        "processed_data": processed_data,
+        "office_name": office_col,
+        "directorate_col": directorate_col
+    }
+
+def workbook_sheets(months=None):
+    """(month, sheet_number, actual_sheet_index) for every mapped sheet of the given months (all by default)"""
+    months = list(MONTHS_SHEET_MAPPING) if months is None else months
+    return [
+        (month, sheet_number, actual_sheet_index)
+        for month in months
+        for sheet_number, actual_sheet_index in MONTHS_SHEET_MAPPING[month].items()
+    ]
+
+def process_sheets(source, sheets, with_names=True, reader=None, row_layout="rows"):
+    """
+    Extract several mapped sheets from one load of the workbook (bytes, file-like object or path).
+    sheets: list of (month, sheet_number, actual_sheet_index).
+    reader: Excel reader name, the configured one by default.
+    row_layout: a ROW_LAYOUTS key, the layout of sheet 1 results.
+    A sheet that is missing or fails to extract gets processed_data None instead of failing the others.
+    """
+    session = _open_session(source, (2,) if with_names else (), reader)
+    try:
+        sheet_count = len(session.sheet_names)
+        results = []
+        for month, sheet_number, actual_sheet_index in sheets:
+            if actual_sheet_index >= sheet_count:
+                # Known missing from the workbook directory; nothing to parse
+                logger.warning("Month %s sheet %s is missing (sheet index %s)", month, sheet_number, actual_sheet_index)
+                processed_data = None
+            else:
+                try:
+                    processed_data = _extract_sheet(session, sheet_number, actual_sheet_index, row_layout)
+                except Exception as e:
+                    logger.error("Failed to extract month %s sheet %s: %s", month, sheet_number, e)
+                    processed_data = None
+            results.append({
+                "month": month,
+                "sheet_number": sheet_number,
+                "actual_sheet_index": actual_sheet_index,
+                "processed_data": processed_data
+            })
+        names = (None, None)
+        if with_names:
+            with stage("column_names"):
+                names = get_column_names(session)
+    finally:
+        session.close()
+
+    return {
+        "office_name": names[0],
+        "directorate_col": names[1],
+        "sheets": results
+    }
@@ -0,0 +1,230 @@
+import datetime
+import importlib.util
+import logging
+import os
+import time
+
+from openpyxl.cell.cell import TYPE_ERROR, TYPE_NUMERIC
+
+logger = logging.getLogger(__name__)
+
+# Environment variable holding the configured reader: a reader name or "auto".
+# Spawned worker processes inherit it, so a choice made at startup reaches them.
+READER_ENV = "EXCEL_READER"
+
+# Readers tried by "auto" for each format, fastest first
+AUTO_ORDER = {
+    "xlsx": ("calamine", "openpyxl"),
+    "xls": ("calamine", "xlrd"),
+}
+
+
+class ExcelReader:
+    """
+    One backend for streaming the top-left region of a sheet.
+
+    A reader works on the book pandas opened with its engine (so a
+    WorkbookSession loads the file once for frames and streaming alike).
+    rows() yields backend cells row by row, convert() turns a cell into the
+    value pandas would give it, with "" for empty cells and None for errors,
+    and is_blank() tells empty cells apart without converting them.
+    """
+
+    name = None
+    # pandas engine of the same library
+    engine = None
+    module = None
+    formats = ()
+
+    def available(self):
+        return importlib.util.find_spec(self.module) is not None
+
+    def rows(self, book, sheet_name, max_row, max_col):
+        raise NotImplementedError
+
+    def convert(self, cell):
+        return cell
+
+    def is_blank(self, cell):
+        return cell == ""
+
+
+class OpenpyxlReader(ExcelReader):
+    """Read-only openpyxl: parses rows lazily and stops after max_row"""
+
+    name = "openpyxl"
+    engine = "openpyxl"
+    module = "openpyxl"
+    formats = ("xlsx",)
+
+    def rows(self, book, sheet_name, max_row, max_col):
+        worksheet = _by_position(book.worksheets, sheet_name) if isinstance(sheet_name, int) else book[sheet_name]
+        return worksheet.iter_rows(min_row=1, max_row=max_row, max_col=max_col)
+
+    def convert(self, cell):
+        return convert_cell(cell)
+
+    def is_blank(self, cell):
+        return cell.value is None
+
+
+class XlrdReader(ExcelReader):
+    """xlrd for legacy .xls; cells are converted as they are read"""
+
+    name = "xlrd"
+    engine = "xlrd"
+    module = "xlrd"
+    formats = ("xls",)
+
+    def rows(self, book, sheet_name, max_row, max_col):
+        import xlrd
+        from xlrd.xldate import xldate_as_datetime
+
+        if isinstance(sheet_name, int):
+            sheet = book.sheet_by_index(_check_index(sheet_name, book.nsheets))
+        else:
+            sheet = book.sheet_by_name(sheet_name)
+        for row_idx in range(min(max_row, sheet.nrows)):
+            row = []
+            for cell in sheet.row_slice(row_idx, 0, min(max_col, sheet.ncols)):
+                value = cell.value
+                if cell.ctype == xlrd.XL_CELL_NUMBER:
+                    value = int(value) if int(value) == value else value
+                elif cell.ctype == xlrd.XL_CELL_DATE:
+                    value = xldate_as_datetime(value, book.datemode)
+                elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                    value = bool(value)
+                elif cell.ctype == xlrd.XL_CELL_ERROR:
+                    value = None
+                row.append(value)
+            yield row
+
+
+class CalamineReader(ExcelReader):
+    """
+    python-calamine (Rust) for both formats. Error cells come back blank,
+    which the extractors treat like the None the other readers give.
+    """
+
+    name = "calamine"
+    engine = "calamine"
+    module = "python_calamine"
+    formats = ("xlsx", "xls")
+
+    def rows(self, book, sheet_name, max_row, max_col):
+        if isinstance(sheet_name, int):
+            sheet = book.get_sheet_by_index(_check_index(sheet_name, len(book.sheet_names)))
+        else:
+            sheet = book.get_sheet_by_name(sheet_name)
+        # skip_empty_area=False keeps row/column numbers anchored at A1
+        for row in sheet.to_python(skip_empty_area=False, nrows=max_row):
+            yield row[:max_col]
+
+    def convert(self, cell):
+        if isinstance(cell, float):
+            value = int(cell)
+            return value if value == cell else cell
+        if type(cell) is datetime.date:
+            # openpyxl and xlrd give datetimes for date cells too
+            return datetime.datetime(cell.year, cell.month, cell.day)
+        return cell
+
+
+def convert_cell(cell):
+    """Convert an openpyxl cell the same way pandas' openpyxl reader does"""
+    if cell is None or cell.value is None:
+        return ""
+    if cell.data_type == TYPE_ERROR:
+        return None
+    if cell.data_type == TYPE_NUMERIC:
+        value = int(cell.value)
+        if value == cell.value:
+            return value
+        return float(cell.value)
+    return cell.value
+
+
+READERS = {reader.name: reader for reader in (OpenpyxlReader(), XlrdReader(), CalamineReader())}
+
+
+def _by_position(worksheets, index):
+    return worksheets[_check_index(index, len(worksheets))]
+
+
+def _check_index(index, count):
+    if not 0 <= index < count:
+        raise ValueError(f"Worksheet index {index} is invalid, {count} worksheets found")
+    return index
+
+
+def available_readers(format):
+    """Installed readers able to read format ("xlsx" or "xls")"""
+    return [READERS[name] for name in AUTO_ORDER.get(format, ()) if READERS[name].available()]
+
+
+def reader_for(format, name=None):
+    """
+    The reader to use for a format (None when it could not be detected is
+    treated as .xlsx). name defaults to the EXCEL_READER setting; "auto", an
+    unknown name or a reader that cannot read the format (e.g. openpyxl for
+    .xls) falls back to the fastest available one.
+    """
+    format = format or "xlsx"
+    name = name or os.environ.get(READER_ENV, "auto")
+    reader = READERS.get(name)
+    if reader is not None and format in reader.formats and reader.available():
+        return reader
+    candidates = available_readers(format)
+    if not candidates:
+        raise ValueError(f"No Excel reader installed for .{format} files")
+    return candidates[0]
+
+
+def use_reader(name):
+    """Make name the configured reader for this process and the workers it spawns"""
+    if name != "auto" and name not in READERS:
+        raise ValueError(f"Unknown Excel reader {name}, expected one of {sorted(READERS)} or auto")
+    os.environ[READER_ENV] = name
+
+
+def benchmark_readers(source, repeat=3):
+    """
+    Time a full extraction of every mapped sheet of source (a template
+    workbook: path, bytes or file-like object) with each installed reader.
+    Readers whose extracted values differ from openpyxl's (xlrd's for .xls)
+    are left out.
+    Returns {reader name: best seconds}.
+    """
+    from excel_pipeline import process_sheets, workbook_sheets
+    from preflight import ENGINES, inspect_workbook
+
+    info = inspect_workbook(source)
+    sheets = [sheet for sheet in workbook_sheets() if sheet[2] < len(info.sheet_names)]
+    # The format's standard library runs first and is the reference for the others
+    readers = sorted(available_readers(info.format), key=lambda reader: reader.name != ENGINES[info.format])
+    timings = {}
+    reference = None
+    for reader in readers:
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = process_sheets(source, sheets, reader=reader.name)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        if reference is None:
+            reference = result
+        elif result != reference:
+            logger.warning("Excel reader %s extracts different values, not using it", reader.name)
+            continue
+        timings[reader.name] = best
+    return timings
+
+
+def select_fastest(source, repeat=3):
+    """Benchmark the readers on source and configure the fastest; returns its name"""
+    timings = benchmark_readers(source, repeat)
+    for name, seconds in sorted(timings.items(), key=lambda item: item[1]):
+        logger.info("Excel reader %s: %.1f ms per workbook", name, seconds * 1000)
+    fastest = min(timings, key=timings.get)
+    use_reader(fastest)
+    return fastest
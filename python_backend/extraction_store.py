@@ -0,0 +1,270 @@
+import datetime
+import json
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # optional, the store can then not be enabled
+    pa = pc = pq = None
+
+try:
+    import fcntl
+except ImportError:  # not POSIX: only the threads of one process are serialized
+    fcntl = None
+
+from reading_Excel import ACCOUNT_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Dataset of each sheet number
+KINDS = {1: "types", 2: "accounts"}
+INDEX_FILE = "_index.json"
+# Partition value for sheets whose directorate could not be read
+UNKNOWN_DIRECTORATE = "unknown"
+
+_ACCOUNT_IDS = {(main_category, sub_category): account_id for main_category, sub_category, account_id in ACCOUNT_TABLE}
+
+
+def available():
+    return pa is not None
+
+
+def _source_columns(rows, file_name, office_name, upload_id):
+    ingested_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+    return {
+        "file_name": pa.array([file_name] * rows, pa.string()),
+        "office_name": pa.array([office_name] * rows, pa.string()),
+        "upload_id": pa.array([upload_id] * rows, pa.string()),
+        "ingested_at": pa.array([ingested_at] * rows, pa.timestamp("s", tz="UTC")),
+    }
+
+
+def types_table(processed_data, file_name="", office_name="", upload_id=""):
+    """The non-zero type values of a sheet 1 result"""
+    types = (processed_data or {}).get("types", [])
+    return pa.table({
+        "type_id": pa.array([node["id"] for node in types], pa.string()),
+        "value": pa.array([float(node["value"]) for node in types], pa.float64()),
+        **_source_columns(len(types), file_name, office_name, upload_id),
+    })
+
+
+def accounts_table(processed_data, file_name="", office_name="", upload_id=""):
+    """Debit and credit of every account of a sheet 2 result"""
+    rows = [
+        (_ACCOUNT_IDS[(main_category, sub_category)], entry["debit"], entry["credit"])
+        for main_category, sub_categories in (processed_data or {}).items()
+        for sub_category, entry in sub_categories.items()
+    ]
+    return pa.table({
+        "account_id": pa.array([row[0] for row in rows], pa.int32()),
+        "debit": pa.array([row[1] for row in rows], pa.float64()),
+        "credit": pa.array([row[2] for row in rows], pa.float64()),
+        **_source_columns(len(rows), file_name, office_name, upload_id),
+    })
+
+
+_TABLES = {"types": types_table, "accounts": accounts_table}
+
+
+def _with_partition(table, entry):
+    """table with the year, month and directorate of its partition index entry as columns"""
+    for column in ("year", "month", "directorate"):
+        table = table.append_column(column, pa.array([entry.get(column)] * table.num_rows, pa.string()))
+    return table
+
+
+class ExtractionStore:
+    """
+    Local Parquet dataset of every extracted sheet, hive-partitioned as
+    <kind>/year=<y>/month=<m>/directorate=<d>/, kind being "types" (sheet 1
+    type values) or "accounts" (sheet 2 debit/credit).
+
+    Within a partition every source (the office, or the file name when the
+    office is unknown) keeps only its latest upload: a re-upload replaces
+    the previous version of the same sheet, and re-sending the current one
+    is a no-op. Each append writes one part file; parts that only hold
+    replaced uploads are deleted, and rows of replaced uploads left in a
+    compacted file are skipped by read() and dropped by the next compact().
+
+    _index.json lists every partition with its files (and the uploads in
+    each), its sources and their current upload, so readers choose files
+    without listing directories. The index is updated under a file lock, so
+    several API processes can share one store.
+    """
+
+    def __init__(self, directory):
+        if not available():
+            raise RuntimeError("The extraction store needs pyarrow")
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        with self._lock, open(os.path.join(self.directory, "_index.lock"), "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"partitions": {}}
+
+    def _write_index(self, index):
+        path = os.path.join(self.directory, INDEX_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+
+    def _write_part(self, key, table, prefix="part"):
+        name = f"{prefix}-{datetime.datetime.now():%Y%m%dT%H%M%S}-{uuid.uuid4().hex[:8]}.parquet"
+        path = os.path.join(self.directory, key, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        pq.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, path)
+        return name
+
+    @staticmethod
+    def partition_key(kind, year, month, directorate):
+        return f"{kind}/year={year}/month={month}/directorate={quote(directorate, safe='')}"
+
+    def append(self, sheet_number, processed_data, year, month, directorate,
+               file_name="", office_name="", upload_id=""):
+        """
+        Store one extracted sheet as the latest upload of its source.
+        Returns the rows written: 0 when the sheet has none or upload_id is
+        already the current upload of its source.
+        """
+        kind = KINDS[sheet_number]
+        directorate = directorate or UNKNOWN_DIRECTORATE
+        upload_id = upload_id or uuid.uuid4().hex
+        source = office_name or file_name
+        table = _TABLES[kind](processed_data, file_name, office_name or "", upload_id)
+        key = self.partition_key(kind, year, month, directorate)
+        with self._locked():
+            index = self._read_index()
+            entry = index["partitions"].setdefault(key, {
+                "kind": kind, "year": str(year), "month": str(month), "directorate": directorate,
+                "files": [], "sources": {}, "rows": 0
+            })
+            current = entry["sources"].get(source)
+            if current is not None and current["upload_id"] == upload_id:
+                return 0
+            if table.num_rows:
+                entry["files"].append({"name": self._write_part(key, table), "uploads": [upload_id]})
+            now = datetime.datetime.now().isoformat(timespec="seconds")
+            entry["sources"][source] = {
+                "upload_id": upload_id, "file_name": file_name, "rows": table.num_rows, "updated_at": now
+            }
+            entry["rows"] = sum(source_entry["rows"] for source_entry in entry["sources"].values())
+            entry["updated_at"] = now
+            replaced = self._drop_replaced(entry)
+            self._write_index(index)
+            # Deleted only once the index no longer lists them
+            for name in replaced:
+                os.remove(os.path.join(self.directory, key, name))
+        if current is not None:
+            logger.info("Upload %s replaced %s for %s in %s", upload_id[:12], current["upload_id"][:12], source, key)
+        return table.num_rows
+
+    @staticmethod
+    def _live_uploads(entry):
+        return {source_entry["upload_id"] for source_entry in entry["sources"].values()}
+
+    def _drop_replaced(self, entry):
+        """Unlist the files holding no current upload of the entry; returns their names"""
+        live = self._live_uploads(entry)
+        replaced = [part["name"] for part in entry["files"] if live.isdisjoint(part["uploads"])]
+        entry["files"] = [part for part in entry["files"] if not live.isdisjoint(part["uploads"])]
+        return replaced
+
+    def _read_part(self, entry, part, columns=None):
+        """One listed file of a partition, without the rows of replaced uploads"""
+        live = self._live_uploads(entry)
+        parquet = pq.ParquetFile(os.path.join(self.directory, entry["key"], part["name"]))
+        if live.issuperset(part["uploads"]):
+            return parquet.read(columns=columns)
+        read_columns = None if columns is None else list(dict.fromkeys([*columns, "upload_id"]))
+        table = parquet.read(columns=read_columns)
+        table = table.filter(pc.is_in(table.column("upload_id"), value_set=pa.array(sorted(live), pa.string())))
+        return table if columns is None else table.select(columns)
+
+    def append_payload(self, payload, upload_id=""):
+        """Store a payload built for Next.js (file, month, year, office, directorate and processed_data)"""
+        return self.append(
+            payload["sheet_number_processed"], payload["processed_data"], payload["year"], payload["month"],
+            payload["directorate_name"], payload["file_name"], payload["office_name"], upload_id
+        )
+
+    def _matching(self, kind, year, month, directorate):
+        filters = {"kind": kind, "year": year, "month": month, "directorate": directorate}
+        return [
+            {"key": key, **entry}
+            for key, entry in sorted(self._read_index()["partitions"].items())
+            if all(value is None or entry[name] == str(value) for name, value in filters.items())
+        ]
+
+    def partitions(self, kind=None, year=None, month=None, directorate=None):
+        """Index entries of the partitions matching every filter given"""
+        with self._locked():
+            return self._matching(kind, year, month, directorate)
+
+    def read(self, kind, year=None, month=None, directorate=None, columns=None):
+        """
+        The rows of the matching partitions of one kind, with year, month and
+        directorate columns. Only the files the index lists for them are read,
+        under the lock so a concurrent compaction cannot remove them meanwhile.
+        columns: the stored columns to read (all by default)
+        """
+        tables = []
+        with self._locked():
+            for entry in self._matching(kind, year, month, directorate):
+                for part in entry["files"]:
+                    tables.append(_with_partition(self._read_part(entry, part, columns), entry))
+        if not tables:
+            empty = _TABLES[kind](None)
+            return _with_partition(empty.select(columns) if columns is not None else empty, {})
+        return pa.concat_tables(tables)
+
+    def compact(self, min_files=2):
+        """
+        Merge the parts of every partition that has at least min_files into
+        one, leaving out the rows of replaced uploads; returns the keys compacted
+        """
+        compacted = []
+        with self._locked():
+            index = self._read_index()
+            for key, entry in index["partitions"].items():
+                if len(entry["files"]) < max(min_files, 2):
+                    continue
+                entry_with_key = {"key": key, **entry}
+                table = pa.concat_tables([self._read_part(entry_with_key, part) for part in entry["files"]])
+                names = [part["name"] for part in entry["files"]]
+                uploads = sorted(self._live_uploads(entry) & {upload for part in entry["files"] for upload in part["uploads"]})
+                entry["files"] = [{"name": self._write_part(key, table, prefix="compacted"), "uploads": uploads}]
+                entry["updated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+                # The merged file is in place before the index stops listing the parts
+                self._write_index(index)
+                for name in names:
+                    os.remove(os.path.join(self.directory, key, name))
+                compacted.append(key)
+        if compacted:
+            logger.info("Compacted %d extraction store partitions", len(compacted))
+        return compacted
@@ -0,0 +1,244 @@
+import sys
+import time
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # optional, reports are then only built from payloads
+    pa = pc = None
+
+from dics_of_ExcelCells import HIERARCHY_ARRAYS
+from reading_Excel import ACCOUNT_TABLE
+
+# Consolidated final reports: every extracted sheet of a year, across
+# directorates and months, rolled up in one vectorized pass. Sheet 1 type
+# values feed the chapter/section/item/type hierarchy, sheet 2 debit/credit
+# the financial_accounts accounts and their main categories.
+
+MONTHS = tuple(str(month) for month in range(1, 13))
+# Levels a report totals: the hierarchy, types first, then the financial_accounts
+# accounts and their main categories (these two as debit/credit pairs)
+LEVELS = ("types", "items", "sections", "chapters", "accounts", "categories")
+CATEGORIES = tuple(dict.fromkeys(main_category for main_category, _, _ in ACCOUNT_TABLE))
+
+_LEVEL_IDS = {"types": HIERARCHY_ARRAYS.type_ids, **{level.name: level.ids for level in HIERARCHY_ARRAYS.levels}}
+_LEVEL_NAMES = {level: [HIERARCHY_ARRAYS.names(level)[node_id] for node_id in ids] for level, ids in _LEVEL_IDS.items()}
+_TYPE_INDEX = {type_id: i for i, type_id in enumerate(HIERARCHY_ARRAYS.type_ids)}
+_MONTH_INDEX = {month: i for i, month in enumerate(MONTHS)}
+_ACCOUNT_INDEX = {
+    (main_category, sub_category): i for i, (main_category, sub_category, _) in enumerate(ACCOUNT_TABLE)
+}
+_ACCOUNT_IDS = [account_id for _, _, account_id in ACCOUNT_TABLE]
+_ACCOUNT_CATEGORY = np.array([CATEGORIES.index(main_category) for main_category, _, _ in ACCOUNT_TABLE], dtype=np.intp)
+
+
+class ConsolidatedReport:
+    """
+    Roll-ups of many extracted sheets of one year.
+
+    The facts are scattered into dense (directorates, months, types) and
+    (directorates, months, accounts, debit/credit) cubes with one np.add.at
+    each. HIERARCHY_ARRAYS then rolls every (directorate, month) row up to
+    items, sections and chapters as one batch, and one more np.add.at sums
+    the accounts into their main categories. Year-to-date figures are a
+    cumulative sum over the month axis, grand totals a sum over directorates.
+
+    Sheets of the same directorate and month from different offices add
+    up; of one office's sheet only the latest upload counts, so a corrected
+    re-upload replaces the earlier version instead of adding to it (the
+    ExtractionStore keeps only that version, from_payloads() the last one).
+    Sheet values are taken as the month's own figures.
+    """
+
+    def __init__(self, directorates, type_facts, account_facts):
+        """
+        directorates: names, the directorate axis of every cube
+        type_facts: (directorate, month, type) index arrays and a value array
+        account_facts: (directorate, month, account) index arrays, debit and credit arrays
+        """
+        self.directorates = list(directorates)
+        shape = (len(self.directorates), len(MONTHS))
+
+        types = np.zeros(shape + (len(_LEVEL_IDS["types"]),))
+        directorate, month, type_index, value = type_facts
+        np.add.at(types, (directorate, month, type_index), value)
+        rows = types.reshape(-1, types.shape[-1])
+        rolled = HIERARCHY_ARRAYS.roll_up(rows, np.ones(rows.shape, dtype=bool))
+        self._cubes = {"types": types}
+        for level, (totals, _) in rolled.items():
+            self._cubes[level] = totals.reshape(shape + (totals.shape[-1],))
+
+        accounts = np.zeros(shape + (len(ACCOUNT_TABLE), 2))
+        directorate, month, account, debit, credit = account_facts
+        np.add.at(accounts, (directorate, month, account), np.stack([debit, credit], axis=-1))
+        categories = np.zeros(shape + (len(CATEGORIES), 2))
+        np.add.at(categories, (slice(None), slice(None), _ACCOUNT_CATEGORY), accounts)
+        self._cubes["accounts"] = accounts
+        self._cubes["categories"] = categories
+
+    @classmethod
+    def from_payloads(cls, payloads):
+        """
+        From payloads as built for Next.js (directorate_name, month, office_name,
+        file_name, sheet_number_processed, processed_data), oldest first: of
+        several payloads for the same directorate, month, sheet and office
+        (or file name when the office is unknown) only the last one counts.
+        """
+        latest = {}
+        for payload in payloads:
+            source = payload.get("office_name") or payload.get("file_name")
+            latest[(payload["directorate_name"], str(payload["month"]), payload["sheet_number_processed"], source)] = payload
+        directorates = sorted({payload["directorate_name"] or "unknown" for payload in latest.values()})
+        directorate_index = {name: i for i, name in enumerate(directorates)}
+        type_facts, account_facts = ([], [], [], []), ([], [], [], [], [])
+        for payload in latest.values():
+            processed_data = payload["processed_data"]
+            month = _MONTH_INDEX.get(str(payload["month"]))
+            if not processed_data or month is None:
+                continue
+            directorate = directorate_index[payload["directorate_name"] or "unknown"]
+            if payload["sheet_number_processed"] == 1:
+                for node in processed_data.get("types", []):
+                    type_index = _TYPE_INDEX.get(node["id"])
+                    if type_index is not None:
+                        for column, value in zip(type_facts, (directorate, month, type_index, float(node["value"]))):
+                            column.append(value)
+            else:
+                for main_category, sub_categories in processed_data.items():
+                    for sub_category, entry in sub_categories.items():
+                        account = _ACCOUNT_INDEX[(main_category, sub_category)]
+                        for column, value in zip(account_facts, (directorate, month, account, entry["debit"], entry["credit"])):
+                            column.append(value)
+        return cls(directorates, _arrays(type_facts), _arrays(account_facts))
+
+    @classmethod
+    def from_tables(cls, types, accounts):
+        """
+        From Arrow tables shaped like ExtractionStore.read() output: types with
+        directorate, month, type_id and value, accounts with directorate,
+        month, account_id, debit and credit. Rows with an unknown month,
+        type or account are left out.
+        """
+        directorates = sorted(
+            set(pc.unique(types.column("directorate")).to_pylist())
+            | set(pc.unique(accounts.column("directorate")).to_pylist())
+        )
+        found, indices = _indexed(types, (("directorate", directorates), ("month", MONTHS), ("type_id", _LEVEL_IDS["types"])))
+        type_facts = (*indices, _column(types, "value")[found])
+        found, indices = _indexed(accounts, (("directorate", directorates), ("month", MONTHS), ("account_id", _ACCOUNT_IDS)))
+        account_facts = (*indices, _column(accounts, "debit")[found], _column(accounts, "credit")[found])
+        return cls(directorates, type_facts, account_facts)
+
+    @classmethod
+    def from_store(cls, store, year):
+        """Every sheet of year in an ExtractionStore; only that year's partitions and the columns used are read"""
+        return cls.from_tables(
+            store.read("types", year=year, columns=["type_id", "value"]),
+            store.read("accounts", year=year, columns=["account_id", "debit", "credit"]),
+        )
+
+    def ids(self, level):
+        return list(_LEVEL_IDS[level]) if level in _LEVEL_IDS else list(CATEGORIES if level == "categories" else _ACCOUNT_IDS)
+
+    def names(self, level):
+        if level in _LEVEL_NAMES:
+            return list(_LEVEL_NAMES[level])
+        return list(CATEGORIES) if level == "categories" else [sub_category for _, sub_category, _ in ACCOUNT_TABLE]
+
+    def totals(self, level="chapters"):
+        """(directorates, months, nodes) month figures; accounts and categories end in a (debit, credit) axis"""
+        return self._cubes[level]
+
+    def year_to_date(self, level="chapters"):
+        """totals() accumulated over the months: December holds the whole year"""
+        return np.cumsum(self._cubes[level], axis=1)
+
+    def by_directorate(self, level="chapters"):
+        """(directorates, nodes) totals of the whole year"""
+        return self._cubes[level].sum(axis=1)
+
+    def by_month(self, level="chapters"):
+        """(months, nodes) totals of every directorate"""
+        return self._cubes[level].sum(axis=0)
+
+    def grand_totals(self, level="chapters"):
+        """(nodes,) totals of every directorate over the whole year"""
+        return self._cubes[level].sum(axis=(0, 1))
+
+    def rows(self, level="chapters"):
+        """
+        The non-zero directorate x month x node figures as dicts, with their
+        year-to-date value (debit/credit pairs for accounts and categories).
+        """
+        totals, ytd = self._cubes[level], self.year_to_date(level)
+        nonzero = totals != 0
+        if totals.ndim == 4:
+            nonzero = nonzero.any(axis=-1)
+        ids, names = self.ids(level), self.names(level)
+        return [
+            {
+                "directorate": self.directorates[d], "month": MONTHS[m], "id": ids[n], "name": names[n],
+                "value": totals[d, m, n].tolist(), "year_to_date": ytd[d, m, n].tolist()
+            }
+            for d, m, n in zip(*(axis.tolist() for axis in np.nonzero(nonzero)))
+        ]
+
+    def summary(self, level="chapters"):
+        """JSON-ready report: level rows per directorate and month, grand totals of level and of the account categories"""
+        return {
+            "directorates": self.directorates,
+            "level": level,
+            "rows": self.rows(level),
+            "grand_totals": _named(self.ids(level), self.names(level), self.grand_totals(level)),
+            "categories": _named(self.ids("categories"), self.names("categories"), self.grand_totals("categories")),
+        }
+
+
+def _arrays(facts):
+    """Python fact columns as index arrays followed by float64 value arrays"""
+    return (*(np.asarray(column, dtype=np.intp) for column in facts[:3]),
+            *(np.asarray(column, dtype=np.float64) for column in facts[3:]))
+
+
+def _column(table, name):
+    return table.column(name).to_numpy().astype(np.float64, copy=False)
+
+
+def _indexed(table, columns):
+    """
+    Position of every row's value in each (column name, values) list.
+    Returns (mask of the rows found in every list, their index arrays).
+    """
+    indices = []
+    for name, values in columns:
+        column = table.column(name)
+        value_set = pa.array(values, column.type)
+        index = pc.index_in(column, value_set=value_set)
+        indices.append(index.fill_null(-1).to_numpy().astype(np.intp))
+    found = np.logical_and.reduce([index >= 0 for index in indices])
+    return found, [index[found] for index in indices]
+
+
+def _named(ids, names, values):
+    return [{"id": node_id, "name": name, "value": value} for node_id, name, value in zip(ids, names, values.tolist())]
+
+
+def main(directory, year, level="chapters"):
+    """
+    Print the grand totals of one year of an extraction store.
+        python final_report.py store_dir year [chapters|sections|items|types|categories]
+    """
+    from extraction_store import ExtractionStore
+
+    start = time.perf_counter()
+    report = ConsolidatedReport.from_store(ExtractionStore(directory), year)
+    seconds = time.perf_counter() - start
+    for row in _named(report.ids(level), report.names(level), report.grand_totals(level)):
+        print(f"{row['id']:>12}  {row['value']}  {row['name']}")
+    print(f"{len(report.directorates)} directorates, built in {seconds * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main(*sys.argv[1:4])
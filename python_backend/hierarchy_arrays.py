@@ -0,0 +1,222 @@
+import numpy as np
+
+# Lists returned by print_structure, in output order
+STRUCTURE_KEYS = ("chapters", "sections", "items", "types", "hierarchical_rows")
+
+# Opt-in output, only built when included: the hierarchical rows as
+# deduplicated dimension sets plus one columnar fact block (see hierarchical_columns)
+COLUMNAR_KEY = "hierarchical_columns"
+COLUMNAR_STRUCTURE_KEYS = ("chapters", "sections", "items", "types", COLUMNAR_KEY)
+
+# (level, id column, parent id column) of every dimension set, parents first
+DIMENSIONS = (
+    ("chapters", "chapter_id", None),
+    ("sections", "section_id", "chapter_id"),
+    ("items", "item_id", "section_id"),
+    ("types", "type_id", "item_id"),
+)
+
+
+def hierarchical_columns(paths, values, names):
+    """
+    Bulk-insert layout of hierarchical rows.
+    paths: (chapter_id, section_id, item_id, type_id) per row, values: its number,
+    names: {level: {id: name}}.
+    Returns every chapter/section/item/type the rows reference once, as
+    table rows ({"section_id", "name", "chapter_id"}, ...), and "facts":
+    parallel chapter_id/section_id/item_id/type_id/value arrays, one entry per row.
+    """
+    dimensions = {level: {} for level, _, _ in DIMENSIONS}
+    facts = {id_column: [] for _, id_column, _ in DIMENSIONS}
+    for path in paths:
+        row = dict(zip(facts, path))
+        for level, id_column, parent_column in DIMENSIONS:
+            node_id = row[id_column]
+            facts[id_column].append(node_id)
+            if node_id and node_id not in dimensions[level]:
+                dimension = {id_column: node_id, "name": names[level].get(node_id, node_id)}
+                if parent_column:
+                    dimension[parent_column] = row[parent_column]
+                dimensions[level][node_id] = dimension
+    facts["value"] = list(values)
+    return {**{level: list(rows.values()) for level, rows in dimensions.items()}, "facts": facts}
+
+class HierarchyArrays:
+    """
+    Array-backed engine for the chapter/section/item/type tree of
+    HierarchicalDictionaries.
+
+    The tree is compiled once into padded child-index tables (one row per
+    parent, children in link order) and type values are held as float64
+    vectors, so a roll-up is one segmented sum per level instead of a
+    float()/str() round trip per node. Several sheets roll up together as the
+    rows of one (sheets, types) matrix.
+
+    Output of structure() is identical to HierarchicalDictionaries.print_structure().
+    """
+
+    def __init__(self, chapters, sections, items, types):
+        """chapters/sections/items/types: the node dicts of a linked HierarchicalDictionaries"""
+        self.type_ids = list(types)
+        self.type_names = [node["name"] for node in types.values()]
+        self.levels = []
+        children = types
+        # Walk up: items sum types, sections sum items, chapters sum sections
+        for name, nodes, key in (("items", items, "type_ids"),
+                                 ("sections", sections, "item_ids"),
+                                 ("chapters", chapters, "section_ids")):
+            self.levels.append(_Level(name, nodes, key, children))
+            children = nodes
+        self._type_index = {type_id: i for i, type_id in enumerate(self.type_ids)}
+        self._names = {level.name: dict(zip(level.ids, level.names)) for level in self.levels}
+        self._names["types"] = dict(zip(self.type_ids, self.type_names))
+
+        # Reverse links for hierarchical_rows: the last parent listing a child wins
+        self.type_to_item = _reverse_links(items, "type_ids")
+        self.item_to_section = _reverse_links(sections, "item_ids")
+        self.section_to_chapter = _reverse_links(chapters, "section_ids")
+        self._type_paths = []
+        for type_id, name in zip(self.type_ids, self.type_names):
+            item_id = self.type_to_item.get(type_id, "")
+            section_id = self.item_to_section.get(item_id, "")
+            chapter_id = self.section_to_chapter.get(section_id, "")
+            self._type_paths.append((chapter_id, section_id, item_id, type_id, name))
+
+    @classmethod
+    def from_dictionaries(cls, dict_system):
+        return cls(dict_system.chapters, dict_system.sections, dict_system.items, dict_system.types)
+
+    def names(self, level):
+        """{id: name} of one level ("chapters", "sections", "items" or "types")"""
+        return self._names[level]
+
+    def parse_type_values(self, value_dicts):
+        """
+        Turn {type_id: str} dicts (one per sheet) into (values, valid, raw).
+        values is float64 (sheets, types); valid marks cells that hold a
+        number float() accepts; raw keeps the original strings for output.
+        """
+        raw = np.full((len(value_dicts), len(self.type_ids)), "", dtype=object)
+        values = np.zeros(raw.shape, dtype=np.float64)
+        valid = np.zeros(raw.shape, dtype=bool)
+        type_index = self._type_index
+        for sheet, value_dict in enumerate(value_dicts):
+            for type_id, value in value_dict.items():
+                col = type_index.get(type_id)
+                if col is None:
+                    continue
+                raw[sheet, col] = value
+                if value:
+                    try:
+                        values[sheet, col] = float(value)
+                        valid[sheet, col] = True
+                    except (TypeError, ValueError):
+                        pass
+        return values, valid, raw
+
+    def roll_up(self, values, valid):
+        """
+        Sum every level for every sheet.
+        Returns {level_name: (totals, counted)}; counted marks nodes whose total
+        is a float (at least one child contributed), the others print as "0".
+        """
+        totals = {}
+        for level in self.levels:
+            values, counted = level.sum(values, valid)
+            totals[level.name] = (values, counted)
+            # Above the types every linked child has a value string ("0" at least) and counts
+            valid = np.ones_like(counted)
+        return totals
+
+    def structures(self, value_dicts, include=None):
+        """
+        print_structure() output for each {type_id: value} dict, rolled up as one batch.
+        include: the result lists to build (all by default)
+        """
+        include = STRUCTURE_KEYS if include is None else include
+        values, valid, raw = self.parse_type_values(value_dicts)
+        totals = self.roll_up(values, valid)
+        return [self._structure(sheet, values, valid, raw, totals, include) for sheet in range(len(value_dicts))]
+
+    def structure(self, value_dict, include=None):
+        return self.structures([value_dict], include)[0]
+
+    def _structure(self, sheet, values, valid, raw, totals, include):
+        result = {key: [] for key in STRUCTURE_KEYS if key in include}
+        type_rows = np.flatnonzero(valid[sheet] & (values[sheet] != 0)).tolist()
+        raw_values = raw[sheet].tolist()
+        if "hierarchical_rows" in result:
+            hierarchical_rows = result["hierarchical_rows"]
+            for col in type_rows:
+                chapter_id, section_id, item_id, type_id, name = self._type_paths[col]
+                hierarchical_rows.append({
+                    "chapter_id": chapter_id,
+                    "section_id": section_id,
+                    "item_id": item_id,
+                    "type_id": type_id,
+                    "name": name,
+                    "value": raw_values[col]
+                })
+        for level in reversed(self.levels):
+            if level.name not in result:
+                continue
+            level_values, counted = totals[level.name]
+            level_values = level_values[sheet]
+            rows = np.flatnonzero(counted[sheet] & (level_values != 0))
+            ids, names = level.ids, level.names
+            result[level.name] = [
+                {"id": ids[i], "name": names[i], "value": str(value)}
+                for i, value in zip(rows.tolist(), level_values[rows].tolist())
+            ]
+        if "types" in result:
+            type_ids, type_names = self.type_ids, self.type_names
+            result["types"] = [
+                {"id": type_ids[col], "name": type_names[col], "value": raw_values[col]}
+                for col in type_rows
+            ]
+        if COLUMNAR_KEY in include:
+            result[COLUMNAR_KEY] = hierarchical_columns(
+                [self._type_paths[col][:4] for col in type_rows], values[sheet, type_rows].tolist(), self._names
+            )
+        return result
+
+
+class _Level:
+    """One parent level: a (parents, max_children) table of child positions"""
+
+    def __init__(self, name, nodes, child_key, children):
+        self.name = name
+        self.ids = list(nodes)
+        self.names = [node["name"] for node in nodes.values()]
+        child_index = {child_id: i for i, child_id in enumerate(children)}
+        # Children missing from the level below are skipped, as in calculate_*_value
+        linked = [
+            [child_index[child_id] for child_id in node.get(child_key, []) if child_id in child_index]
+            for node in nodes.values()
+        ]
+        width = max((len(row) for row in linked), default=0)
+        # Padding points at an extra always-zero, never-counted column
+        self.table = np.full((len(linked), width), len(children), dtype=np.intp)
+        for i, row in enumerate(linked):
+            self.table[i, :len(row)] = row
+
+    def sum(self, values, valid):
+        """Segmented sum of (sheets, children) into (sheets, parents), children added in link order"""
+        sheets = values.shape[0]
+        padded_values = np.concatenate([np.where(valid, values, 0.0), np.zeros((sheets, 1))], axis=1)
+        padded_valid = np.concatenate([valid, np.zeros((sheets, 1), dtype=bool)], axis=1)
+        totals = np.zeros((sheets, self.table.shape[0]), dtype=np.float64)
+        counted = np.zeros(totals.shape, dtype=bool)
+        # Column by column keeps the left-to-right addition order of the scalar code
+        for k in range(self.table.shape[1]):
+            totals += padded_values[:, self.table[:, k]]
+            counted |= padded_valid[:, self.table[:, k]]
+        return totals, counted
+
+
+def _reverse_links(parents, child_key):
+    reverse = {}
+    for parent_id, parent in parents.items():
+        for child_id in parent.get(child_key, []):
+            reverse[child_id] = parent_id
+    return reverse
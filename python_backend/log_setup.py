@@ -0,0 +1,97 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+
+# Level for the backend loggers; DEBUG adds per-sheet dumps and per-cell traces
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# "text" for one readable line per record, "json" for one JSON object per line
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text")
+# Longest rendering of a logged dump (rows, payloads) before it is cut
+LOG_DUMP_CHARS = int(os.getenv("LOG_DUMP_CHARS", "2000"))
+
+# Attributes every LogRecord has; anything else was passed through extra= and is a structured field
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "process": record.process,
+            "message": record.getMessage(),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS})
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(process)d] %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = {key: value for key, value in vars(record).items() if key not in _RECORD_FIELDS}
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class Capped:
+    """
+    Lazy, size-capped rendering of a large value for log arguments: nothing
+    is rendered unless the record is emitted, and at most max_items items /
+    LOG_DUMP_CHARS characters when it is.
+    """
+
+    def __init__(self, value, max_items=3):
+        self.value = value
+        self.max_items = max_items
+
+    def __str__(self):
+        value = self.value
+        suffix = ""
+        if isinstance(value, (list, tuple)) and len(value) > self.max_items:
+            suffix = f" ... ({len(value) - self.max_items} more)"
+            value = value[:self.max_items]
+        text = str(value)
+        if len(text) > LOG_DUMP_CHARS:
+            text = text[:LOG_DUMP_CHARS] + f" ... ({len(text) - LOG_DUMP_CHARS} more chars)"
+        return text + suffix
+
+
+def setup_logging(level=None, format=None):
+    """
+    Route every record through a queue: the calling thread only enqueues,
+    and a listener thread formats and writes to stderr. Once per process
+    (the API and each worker process call it).
+    """
+    global _listener
+    if _listener is not None:
+        return
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JsonFormatter() if (format or LOG_FORMAT) == "json" else TextFormatter())
+    log_queue = queue.SimpleQueue()
+    root = logging.getLogger()
+    root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    root.setLevel(level or LOG_LEVEL)
+    _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=False)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush the queue and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,235 @@
+import asyncio
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from a single cell lookup up to a job timeout
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            lines.extend(self._render_sample(key, value))
+        return lines
+
+    def _render_sample(self, key, value):
+        return [f"{self.name}{_labels(self.label_names, key)} {_number(value)}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # One count per bucket plus +Inf, then the sum
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    def _render_sample(self, key, counts):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, key, [('le', _number(bound))])} {cumulative}")
+        lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(counts[-1])}")
+        lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Gauge(_Metric):
+    """A value read at scrape time: collect() returns {label values tuple: value}"""
+
+    type = "gauge"
+
+    def __init__(self, name, help, collect, labels=()):
+        super().__init__(name, help, labels)
+        self.collect = collect
+
+    def render(self):
+        values = dict(self.collect())
+        with self._lock:
+            self._values = values
+        return super().render()
+
+
+class CollectedCounter(Gauge):
+    """A running total kept elsewhere (e.g. cache statistics), read at scrape time"""
+
+    type = "counter"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+REQUESTS = REGISTRY.add(Counter(
+    "excel_api_requests_total", "HTTP requests handled, by endpoint and status code", ("endpoint", "status")))
+ERRORS = REGISTRY.add(Counter(
+    "excel_api_errors_total", "Failed requests, by endpoint and cause", ("endpoint", "cause")))
+REQUEST_SECONDS = REGISTRY.add(Histogram(
+    "excel_api_request_seconds", "End-to-end request latency", ("endpoint",)))
+STAGE_SECONDS = REGISTRY.add(Histogram(
+    "excel_api_stage_seconds", "Latency of each processing stage", ("stage",)))
+UPLOAD_BYTES = REGISTRY.add(Counter(
+    "excel_api_upload_bytes_total", "Bytes of workbook uploads received", ("endpoint",)))
+
+
+# Causes for error statuses whose handler did not name one
+STATUS_CAUSES = {400: "bad_request", 413: "upload_too_large", 422: "invalid_form", 504: "timeout"}
+
+# Stage timings recorded in a worker process wait here until the job's reply carries them back
+_pending_stages = None
+
+
+def observe_stage(stage_name, seconds):
+    if _pending_stages is not None:
+        _pending_stages.append((stage_name, seconds))
+    else:
+        STAGE_SECONDS.observe(seconds, stage=stage_name)
+
+
+@contextmanager
+def stage(stage_name):
+    """Time the enclosed block as one processing stage"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage_name, time.perf_counter() - start)
+
+
+def collect_stages():
+    """Called once in a worker process: keep stage timings for drain_stages()"""
+    global _pending_stages
+    _pending_stages = []
+
+
+def drain_stages():
+    """The stage timings recorded since the last call, as (stage, seconds) pairs"""
+    if _pending_stages is None:
+        return []
+    samples = list(_pending_stages)
+    _pending_stages.clear()
+    return samples
+
+
+def observe_stages(samples):
+    for stage_name, seconds in samples:
+        STAGE_SECONDS.observe(seconds, stage=stage_name)
+
+
+def set_error_cause(request, cause):
+    """Name the cause of a failing request; the first cause set wins"""
+    if not getattr(request.state, "error_cause", None):
+        request.state.error_cause = cause
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware counting requests and timing them per endpoint.
+    A plain ASGI wrapper, so streaming uploads and disconnect detection in
+    the endpoints see the original receive channel.
+    """
+
+    def __init__(self, app, paths=None):
+        self.app = app
+        # Only these paths are measured (all when None)
+        self.paths = paths
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.paths is not None and scope["path"] not in self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        endpoint = scope["path"]
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        cause = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            cause = "client_disconnected" if isinstance(e, asyncio.CancelledError) else "internal"
+            raise
+        finally:
+            REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+            code = 499 if cause == "client_disconnected" else status["code"]
+            REQUESTS.inc(endpoint=endpoint, status=code)
+            if code >= 400:
+                cause = scope.get("state", {}).get("error_cause") or cause or STATUS_CAUSES.get(code, "internal")
+                ERRORS.inc(endpoint=endpoint, cause=cause)
+
@@ -0,0 +1,129 @@
+import asyncio
+import gzip
+
+import httpx
+
+from wire_format import JSON_TYPE, dumps
+
+
+class ForwardError(Exception):
+    """The Next.js API could not be reached or rejected the payload"""
+
+
+class NextJSForwarder:
+    """
+    Sends processed sheets to the Next.js ingest endpoint over one pooled,
+    keep-alive httpx client.
+
+    max_connections caps the open connections, concurrency the POSTs in flight.
+    With batch_window > 0 (seconds) payloads arriving within that window are
+    coalesced into a single {"batch": [...]} POST of at most batch_max items;
+    the endpoint answers with one result per item, in order.
+    Bodies are serialized with wire_format.dumps (orjson when installed) and
+    sent with Content-Encoding: gzip when gzip_body is set.
+    """
+
+    def __init__(self, url, max_connections=10, concurrency=None, batch_window=0.0,
+                 batch_max=50, timeout=30.0, transport=None, gzip_body=False):
+        self.url = url
+        self.gzip_body = gzip_body
+        self.max_connections = max_connections
+        self.concurrency = concurrency or max_connections
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self.timeout = timeout
+        self._transport = transport
+        self._client = None
+        self._semaphore = None
+        self._pending = []
+        self._flush_handle = None
+        self._flushes = set()
+
+    async def start(self):
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_connections
+        )
+        self._client = httpx.AsyncClient(timeout=self.timeout, limits=limits, transport=self._transport)
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+
+    async def close(self):
+        # Deliver what is still waiting for its batch window
+        if self._pending:
+            self._flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def send(self, payload):
+        """POST one payload and return the endpoint's JSON answer"""
+        if self.batch_window <= 0:
+            async with self._semaphore:
+                return await self._post(payload)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((payload, future))
+        if len(self._pending) >= self.batch_max:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(self.batch_window, self._flush)
+        return await future
+
+    async def send_batch(self, payloads):
+        """
+        POST several payloads as one {"batch": [...]} request, bypassing the batch window.
+        Returns the endpoint's result for each payload, in order.
+        """
+        async with self._semaphore:
+            answer = await self._post({"batch": payloads})
+        results = (answer or {}).get("results")
+        if not isinstance(results, list) or len(results) != len(payloads):
+            raise ForwardError("Next.js API returned no per-item results for the batch")
+        return results
+
+    async def _post(self, body):
+        content = dumps(body)
+        headers = {"Content-Type": JSON_TYPE}
+        if self.gzip_body:
+            content = gzip.compress(content, compresslevel=5)
+            headers["Content-Encoding"] = "gzip"
+        try:
+            response = await self._client.post(self.url, content=content, headers=headers)
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            raise ForwardError(str(e)) from e
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send_batch(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _send_batch(self, batch):
+        payloads = [payload for payload, _ in batch]
+        futures = [future for _, future in batch]
+        try:
+            results = await self.send_batch(payloads)
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e if isinstance(e, ForwardError) else ForwardError(str(e)))
+            return
+
+        for future, result in zip(futures, results):
+            if future.done():
+                continue
+            if isinstance(result, dict) and result.get("error"):
+                future.set_exception(ForwardError(str(result["error"])))
+            else:
+                future.set_result(result)
@@ -0,0 +1,141 @@
+import posixpath
+import zipfile
+import xml.etree.ElementTree as ET
+
+from workbook_session import as_file, is_path
+
+XLSX_MAGIC = b"PK\x03\x04"
+XLS_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+# Standard reader of each format, the reference the faster readers must match
+ENGINES = {"xlsx": "openpyxl", "xls": "xlrd"}
+
+_REL_NS = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+_MAIN_NS = "{http://schemas.openxmlformats.org/spreadsheetml/2006/main}"
+_R_ID = "{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id"
+
+
+class InvalidWorkbookError(Exception):
+    """The uploaded file could not be opened as an Excel workbook"""
+
+
+class WorkbookInfo:
+    """What pre-flight found out about a workbook without parsing any sheet"""
+
+    def __init__(self, format, sheet_names):
+        self.format = format
+        # Worksheets in the order pandas and openpyxl index them
+        self.sheet_names = sheet_names
+
+
+def read_head(source, count=8):
+    """First count bytes of a path, bytes or file-like object (file-like objects are rewound)"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source[:count])
+    if is_path(source):
+        with open(source, "rb") as f:
+            return f.read(count)
+    source.seek(0)
+    head = source.read(count)
+    source.seek(0)
+    return head
+
+
+def sniff_format(source):
+    """"xlsx", "xls" or None, from the magic bytes alone"""
+    head = read_head(source)
+    if head.startswith(XLSX_MAGIC):
+        return "xlsx"
+    if head.startswith(XLS_MAGIC):
+        return "xls"
+    return None
+
+
+def inspect_workbook(source):
+    """
+    Identify the format and list the worksheets. For .xlsx only the zip
+    central directory and the small workbook/relationship parts are read;
+    for .xls only the workbook globals. Raises InvalidWorkbookError.
+    """
+    try:
+        format = sniff_format(source)
+    except OSError as e:
+        raise InvalidWorkbookError(str(e))
+    if format == "xlsx":
+        return WorkbookInfo(format, _xlsx_sheet_names(source))
+    if format == "xls":
+        return WorkbookInfo(format, _xls_sheet_names(source))
+    raise InvalidWorkbookError("File is neither an .xlsx (zip) nor an .xls (OLE2) workbook")
+
+
+def validate_workbook(source, sheet_indexes=()):
+    """inspect_workbook plus a check that every sheet index the request needs exists"""
+    info = inspect_workbook(source)
+    missing = sorted(index for index in set(sheet_indexes) if index >= len(info.sheet_names))
+    if missing:
+        raise InvalidWorkbookError(
+            f"Workbook has {len(info.sheet_names)} sheets, sheet index {missing[0]} is required"
+        )
+    return info
+
+
+def _xlsx_sheet_names(source):
+    try:
+        with zipfile.ZipFile(as_file(source)) as archive:
+            names = set(archive.namelist())
+            workbook_part = _office_document(archive, names)
+            rels_part = posixpath.join(posixpath.dirname(workbook_part), "_rels",
+                                       posixpath.basename(workbook_part) + ".rels")
+            targets = {}
+            if rels_part in names:
+                for rel in ET.fromstring(archive.read(rels_part)).iter(f"{_REL_NS}Relationship"):
+                    if rel.get("Type", "").endswith("/worksheet"):
+                        targets[rel.get("Id")] = _resolve(workbook_part, rel.get("Target", ""))
+
+            sheet_names = []
+            for sheet in ET.fromstring(archive.read(workbook_part)).iter(f"{_MAIN_NS}sheet"):
+                target = targets.get(sheet.get(_R_ID))
+                if target is None:
+                    # Chartsheets and dialogsheets are not indexed by the readers
+                    continue
+                if target not in names:
+                    raise InvalidWorkbookError(f"Sheet {sheet.get('name')} is missing its part {target}")
+                sheet_names.append(sheet.get("name"))
+    except (zipfile.BadZipFile, ET.ParseError, KeyError) as e:
+        raise InvalidWorkbookError(str(e))
+    return sheet_names
+
+
+def _office_document(archive, names):
+    if "_rels/.rels" in names:
+        for rel in ET.fromstring(archive.read("_rels/.rels")).iter(f"{_REL_NS}Relationship"):
+            if rel.get("Type", "").endswith("/officeDocument"):
+                part = _resolve("", rel.get("Target", ""))
+                if part in names:
+                    return part
+    if "xl/workbook.xml" in names:
+        return "xl/workbook.xml"
+    raise InvalidWorkbookError("Zip file does not contain a workbook part")
+
+
+def _resolve(base_part, target):
+    """Zip member name of a relationship target, which may be absolute or relative to base_part"""
+    if target.startswith("/"):
+        return target.lstrip("/")
+    return posixpath.normpath(posixpath.join(posixpath.dirname(base_part), target))
+
+
+def _xls_sheet_names(source):
+    import xlrd
+
+    try:
+        if is_path(source):
+            book = xlrd.open_workbook(source, on_demand=True)
+        else:
+            data = source if isinstance(source, (bytes, bytearray)) else as_file(source).read()
+            book = xlrd.open_workbook(file_contents=data, on_demand=True)
+    except Exception as e:
+        raise InvalidWorkbookError(str(e))
+    try:
+        return book.sheet_names()
+    finally:
+        book.release_resources()
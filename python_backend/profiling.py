@@ -0,0 +1,86 @@
+import cProfile
+import datetime
+import json
+import os
+import pstats
+import time
+import tracemalloc
+
+
+def profiled(source, top, func, *args):
+    """
+    Run func(source, *args) under cProfile and tracemalloc.
+    Returns (result, report). Runs in the worker process like the job itself;
+    the module is imported with the API, but cProfile and tracemalloc only
+    start here, for a request that asked for a profile.
+    """
+    already_tracing = tracemalloc.is_tracing()
+    if not already_tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    profiler = cProfile.Profile()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        profiler.enable()
+        try:
+            result = func(source, *args)
+        finally:
+            profiler.disable()
+        wall, cpu = time.perf_counter() - wall_start, time.process_time() - cpu_start
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+        ])
+    finally:
+        if not already_tracing:
+            tracemalloc.stop()
+
+    report = {
+        "function": getattr(func, "__name__", str(func)),
+        "wall_seconds": wall,
+        "cpu_seconds": cpu,
+        "peak_memory_bytes": peak,
+        "top_functions": top_functions(profiler, top),
+        "top_allocations": top_allocations(snapshot, top),
+    }
+    return result, report
+
+
+def top_functions(profiler, top):
+    """The top functions by cumulative time"""
+    stats = pstats.Stats(profiler).stats
+    rows = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:top]
+    return [
+        {
+            "function": f"{filename}:{line}({name})",
+            "calls": calls,
+            "total_seconds": total,
+            "cumulative_seconds": cumulative,
+        }
+        for (filename, line, name), (_, calls, total, cumulative, _) in rows
+    ]
+
+
+def top_allocations(snapshot, top):
+    """Allocation sites still holding the most memory when the job returned"""
+    return [
+        {"site": str(stat.traceback), "size_bytes": stat.size, "count": stat.count}
+        for stat in snapshot.statistics("lineno")[:top]
+    ]
+
+
+def save_report(directory, report, label):
+    """Write report as JSON into directory and return the file name"""
+    os.makedirs(directory, exist_ok=True)
+    stamp = datetime.datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    name = f"{stamp}-{label}.json"
+    with open(os.path.join(directory, name), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return name
+
+
+def list_reports(directory):
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted((name for name in os.listdir(directory) if name.endswith(".json")), reverse=True)
@@ -1,8 +1,13 @@
-import pandas as pd
-import json
+import logging
 from dic_of_accounts import financial_accounts
+from workbook_session import is_path, read_sheet
+from cell_extractor import ExtractionPlan, read_block, to_text, to_numbers
+from log_setup import Capped
+import numpy as np
 import os
 
+logger = logging.getLogger(__name__)
+
 # Dictionary mapping (row, col) to type_id
 ROW_COL_TO_TYPE = {
     (6,7): '1_1111', (7,7): '1_1112', (8,7): '1_1113', (9,7): '1_1114', (10,7): '1_1115',
@@ -44,6 +49,68 @@ ROW_COL_TO_TYPE = {
     (312,7): '2_4313', (313,7): '2_4314', (314,7): '2_4315'
 }
 
+# ROW_COL_TO_TYPE is indexed like a DataFrame read with a header row, so the
+# actual sheet row of every entry is one further down.
+TYPE_CELL_COORDINATES = {
+    (row + 1, col): type_id for (row, col), type_id in ROW_COL_TO_TYPE.items()
+}
+
+# Compiled once at import: flat row/col index arrays + type ids
+TYPE_PLAN = ExtractionPlan(TYPE_CELL_COORDINATES.keys(), TYPE_CELL_COORDINATES.values())
+
+# ID table of financial_accounts, one (main_category, sub_category, id) row per account
+ACCOUNT_TABLE = [
+    (main_category, sub_category, accounts['id'])
+    for main_category, sub_categories in financial_accounts.items()
+    for sub_category, accounts in sub_categories.items()
+]
+
+# Debit and credit cells interleaved per account; financial_accounts stores (col, row)
+ACCOUNT_PLAN = ExtractionPlan(
+    [
+        (coords[1], coords[0])
+        for sub_categories in financial_accounts.values()
+        for accounts in sub_categories.values()
+        for coords in (accounts['debit'], accounts['credit'])
+    ],
+    [account_id for _, _, account_id in ACCOUNT_TABLE for _side in ('debit', 'credit')]
+)
+
+def _type_values_from_block(block):
+    """{type_id: value} of the non-empty ROW_COL_TO_TYPE cells in a sheet block"""
+    texts = to_text(TYPE_PLAN.gather(block))
+    found = np.char.str_len(np.char.strip(texts)) > 0
+    return dict(zip(TYPE_PLAN.ids[found].tolist(), texts[found].tolist()))
+
+def _account_values_from_block(block):
+    """
+    (debit, credit) float arrays in ACCOUNT_TABLE order plus the mask of accounts
+    holding non-numeric text; like the old per-account ValueError handling, one
+    bad cell zeroes both sides of its account.
+    """
+    numbers, invalid = to_numbers(ACCOUNT_PLAN.gather(block))
+    numbers = numbers.reshape(-1, 2)
+    invalid = invalid.reshape(-1, 2).any(axis=1)
+    numbers[invalid] = 0.0
+    return numbers[:, 0], numbers[:, 1], invalid
+
+def extract_type_values(file_path, sheet_name):
+    """
+    Return {type_id: value} for the ROW_COL_TO_TYPE cells of a sheet, the same
+    type_values excel_to_json produces, by streaming only the mapped cells
+    instead of loading the whole sheet into a DataFrame.
+    file_path may be a path, bytes, a file-like object or an open WorkbookSession.
+    """
+    try:
+        block, _ = read_block(file_path, sheet_name, TYPE_PLAN)
+    except Exception as e:
+        logger.error("❌ خطأ: %s", e)
+        return None
+
+    type_values = _type_values_from_block(block)
+    logger.debug("Total values found: %d", len(type_values))
+    return type_values
+
 def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321, 
                  start_row=None, end_row=None, start_col=6, end_col=7,
                  cell_row=None, cell_col=None, find_spaces=False):
@@ -51,11 +118,10 @@ def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321,
     نسخة معدلة للعمل خارج Jupyter (بدون استخدام display و Markdown)
     """
     try:
-        # قراءة ملف الإكسل
-        df = pd.read_excel(
+        # قراءة ملف الإكسل (أو من جلسة المصنف المفتوحة مسبقاً)
+        df = read_sheet(
             file_path,
-            engine='openpyxl',
-            sheet_name=sheet_name,
+            sheet_name,
             keep_default_na=False,
             dtype=str
         ).fillna('')
@@ -63,45 +129,29 @@ def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321,
         # استخراج اسم المكتب والمديرية
         # احذف استخراج اسم المكتب والمديرية
         
-        print(f"[DEBUG] Excel file shape: {df.shape}")
-        print(f"[DEBUG] Looking for values in column 6 (index 5)")
+        logger.debug("Excel file shape: %s, looking for values in column 6 (index 5)", df.shape)
         
-        # Extract type values from column 6
-        type_values = {}
-        found_values = 0
-        
-        for (row, col), type_id in ROW_COL_TO_TYPE.items():
-            # Adjust for 0-based indexing in pandas
-            row_idx = row - 1
-            col_idx = col - 1
-            
-            if row_idx < len(df) and col_idx < len(df.columns):
-                value = df.iat[row_idx, col_idx]
-                if value and str(value).strip():  # Only add non-empty values
-                    type_values[type_id] = value
-                    found_values += 1
-                    print(f"[DEBUG] Found value at ({row}, {col}): {type_id} = {value}")
-            else:
-                print(f"[DEBUG] Index out of range: ({row}, {col}) -> ({row_idx}, {col_idx}) for {type_id}")
+        # Extract type values from column 6 with one gather over the compiled plan
+        # (the frame consumed the sheet's first row as its header)
+        type_values = _type_values_from_block(TYPE_PLAN.block_from_frame(df, header_rows=1))
         
-        print(f"[DEBUG] Total values found: {found_values}")
+        logger.debug("Total values found: %d", len(type_values))
         
         # التحويل إلى JSON
         json_data = df.to_json(orient=orient, force_ascii=False, indent=4)
         
-        print("🎉 تم التحويل بنجاح!")
+        logger.debug("🎉 تم التحويل بنجاح!")
         
-        # Print extracted values in a consistent format
-        print("\n=== القيم المستخرجة ===")
+        # Per-cell trace of the extracted values, only built when DEBUG is on
         if type_values:
-            for type_id, value in type_values.items():
-                print(f"{type_id}: {value}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("=== القيم المستخرجة === %s", Capped(
+                    [f"{type_id}: {value}" for type_id, value in type_values.items()], max_items=50))
         else:
-            print("❌ فشل في استخراج القيم من ملف Excel")
-            print("[DEBUG] Checking first few rows of column 6:")
-            for i in range(min(10, len(df))):
-                value = df.iat[i, 5] if len(df.columns) > 5 else "N/A"
-                print(f"  Row {i+1}: {value}")
+            logger.warning("❌ فشل في استخراج القيم من ملف Excel")
+            if logger.isEnabledFor(logging.DEBUG):
+                first_rows = [df.iat[i, 5] if len(df.columns) > 5 else "N/A" for i in range(min(10, len(df)))]
+                logger.debug("First rows of column 6: %s", first_rows)
         
         # #البحث عن المسافات
         # if find_spaces:
@@ -155,96 +205,60 @@ def excel_to_json(file_path, sheet_name, orient='records', preview_rows=321,
         return json_data, df, type_values
     
     except Exception as e:
-        print(f"❌ خطأ: {str(e)}")
+        logger.error("❌ خطأ: %s", e)
         return None, None, None
 
 def read_accounts_from_excel(file_path, sheet_name=0):
     """
-    Read Excel file and extract values based on the coordinates in financial_accounts dictionary
+    Read Excel file and extract values based on the coordinates in financial_accounts dictionary.
+    file_path may be a path on disk, bytes, a file-like object or an open WorkbookSession.
+
+    Debit and credit cells are read on their own: a cell outside the sheet is
+    empty (0.0) without touching the other side of its account. A non-numeric
+    cell (text, a date or a time) zeroes both sides of its account and the
+    rest of the sheet is still returned. (Before the cells were streamed, a
+    cell outside the sheet zeroed both sides and a date or time cell made the
+    whole sheet return None.)
     """
     try:
-        # Validate file exists
-        if not os.path.exists(file_path):
-            print(f"Error: File does not exist: {file_path}")
-            return None
-            
-        # Check file size
-        file_size = os.path.getsize(file_path)
-        if file_size == 0:
-            print(f"Error: File is empty: {file_path}")
-            return None
-            
-        # Try to read Excel file with better error handling
-        try:
-            # Read Excel file using pandas with openpyxl engine
-            df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, engine='openpyxl')
-        except Exception as openpyxl_error:
-            print(f"Error reading Excel file with openpyxl: {openpyxl_error}")
-            
-            # Try alternative engine
-            try:
-                df = pd.read_excel(file_path, sheet_name=sheet_name, header=None, engine='xlrd')
-            except Exception as xlrd_error:
-                print(f"Error reading Excel file with xlrd: {xlrd_error}")
-                
-                # Try without specifying engine
-                try:
-                    df = pd.read_excel(file_path, sheet_name=sheet_name, header=None)
-                except Exception as generic_error:
-                    print(f"Error reading Excel file with generic engine: {generic_error}")
-                    return None
-        
-        # Check if dataframe is empty
-        if df.empty:
-            print(f"Error: Excel file is empty or has no data: {file_path}")
+        if is_path(file_path):
+            # Validate file exists
+            if not os.path.exists(file_path):
+                logger.error("File does not exist: %s", file_path)
+                return None
+
+            # Check file size
+            file_size = os.path.getsize(file_path)
+            if file_size == 0:
+                logger.error("File is empty: %s", file_path)
+                return None
+
+        # Stream only the debit/credit cells instead of reading the whole sheet
+        # with the configured reader for the file's format (see excel_readers)
+        block, has_data = read_block(file_path, sheet_name, ACCOUNT_PLAN)
+
+        # Check if the sheet is empty
+        if not has_data:
+            logger.error("Excel file is empty or has no data: %s", file_path)
             return None
-            
-        print(f"Successfully read Excel file. Shape: {df.shape}")
-        
+
+        debit_values, credit_values, invalid = _account_values_from_block(block)
+        for index in np.flatnonzero(invalid):
+            main_category, sub_category, _ = ACCOUNT_TABLE[index]
+            logger.debug("Value error for %s/%s", main_category, sub_category)
+
         # Create a new dictionary with the same structure but with actual values
         result_dict = {}
-        
-        # Iterate through the dictionary structure
-        for main_category, sub_categories in financial_accounts.items():
-            result_dict[main_category] = {}
-            
-            for sub_category, accounts in sub_categories.items():
-                result_dict[main_category][sub_category] = {}
-                
-                # Get debit and credit values from Excel using the coordinates
-                debit_col, debit_row = accounts['debit']
-                credit_col, credit_row = accounts['credit']
-                
-                # Excel coordinates are 0-based, so we subtract 1 from the provided coordinates
-                try:
-                    debit_value = df.iloc[debit_row - 1, debit_col - 1]
-                    credit_value = df.iloc[credit_row - 1, credit_col - 1]
-                    
-                    # Store the actual values with proper error handling
-                    result_dict[main_category][sub_category] = {
-                        'debit': float(debit_value) if pd.notna(debit_value) and str(debit_value).strip() else 0.0,
-                        'credit': float(credit_value) if pd.notna(credit_value) and str(credit_value).strip() else 0.0
-                    }
-                    
-                except IndexError as idx_error:
-                    print(f"Warning: Index out of range for {main_category}/{sub_category}: {idx_error}")
-                    result_dict[main_category][sub_category] = {
-                        'debit': 0.0,
-                        'credit': 0.0
-                    }
-                except ValueError as val_error:
-                    print(f"Warning: Value error for {main_category}/{sub_category}: {val_error}")
-                    result_dict[main_category][sub_category] = {
-                        'debit': 0.0,
-                        'credit': 0.0
-                    }
+        for (main_category, sub_category, _), debit, credit in zip(ACCOUNT_TABLE, debit_values.tolist(), credit_values.tolist()):
+            result_dict.setdefault(main_category, {})[sub_category] = {
+                'debit': debit,
+                'credit': credit
+            }
         
         return result_dict
     
     except Exception as e:
-        print(f"Error reading accounts from Excel file: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error reading accounts from Excel file: %s", e)
         return None
 
 def test_accounts_extraction(excel_path, sheet_name=0):
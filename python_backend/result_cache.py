@@ -0,0 +1,166 @@
+import asyncio
+import logging
+import os
+import pickle
+import time
+from collections import Counter, OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(digest, *parts):
+    """
+    Content address of an upload: the hex SHA-256 of its bytes (computed while
+    it streamed in) plus the request parts that shape the result.
+    """
+    return "-".join([digest] + [str(part) for part in parts])
+
+
+class ResultCache:
+    """
+    Two-tier cache for processing results.
+
+    Memory: LRU of at most max_entries, each entry valid for ttl seconds.
+    Disk (optional): one pickle per key in directory, written atomically so
+    several uvicorn workers can share it; expired by file age and pruned to
+    max_disk_entries.
+
+    get_or_compute collapses concurrent requests for the same key onto one
+    computation; it is only cancelled once every waiter has gone away.
+    stats counts its lookups by outcome: memory_hit, disk_hit, shared (joined
+    a computation in flight) and miss.
+    """
+
+    def __init__(self, max_entries=128, ttl=3600, directory=None, max_disk_entries=1000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.directory = directory
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self._inflight = {}
+        self.stats = Counter()
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def get(self, key):
+        """Memory tier only; returns None on a miss"""
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self._memory[key] = (time.monotonic() + self.ttl, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_path(self, key):
+        return os.path.join(self.directory, f"{key}.pickle")
+
+    def read_disk(self, key):
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("Ignoring unreadable cache entry %s: %s", path, e)
+            return None
+
+    def write_disk(self, key, value):
+        if not self.directory:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+            self._prune_disk()
+        except Exception as e:
+            logger.warning("Failed to write cache entry %s: %s", path, e)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _prune_disk(self):
+        entries = [entry for entry in os.scandir(self.directory) if entry.name.endswith(".pickle")]
+        if len(entries) <= self.max_disk_entries:
+            return
+        entries.sort(key=lambda entry: entry.stat().st_mtime)
+        for entry in entries[:len(entries) - self.max_disk_entries]:
+            try:
+                os.remove(entry.path)
+            except FileNotFoundError:
+                pass
+
+    async def get_or_compute(self, key, compute, hand_off=None):
+        """
+        Return the cached result for key, or await compute() once for all
+        concurrent callers with the same key and cache what it returns.
+        Exceptions are passed to every waiter and not cached.
+
+        hand_off() is called when this call starts the computation, before it
+        is scheduled, so the caller knows the computation (which may outlive
+        it) now owns what compute() needs. It may return a callable, run once
+        the computation is over: finished, failed, or cancelled even before it ran.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.stats["memory_hit"] += 1
+            return value
+
+        flight = self._inflight.get(key)
+        if flight is not None:
+            self.stats["shared"] += 1
+        else:
+            release = hand_off() if hand_off is not None else None
+            flight = _Flight(asyncio.ensure_future(self._compute(key, compute)))
+            self._inflight[key] = flight
+            flight.task.add_done_callback(lambda _: self._inflight.pop(key, None))
+            if release is not None:
+                flight.task.add_done_callback(lambda _: release())
+        return await flight.wait()
+
+    async def _compute(self, key, compute):
+        loop = asyncio.get_running_loop()
+        value = await loop.run_in_executor(None, self.read_disk, key)
+        if value is not None:
+            self.stats["disk_hit"] += 1
+        else:
+            self.stats["miss"] += 1
+            value = await compute()
+            await loop.run_in_executor(None, self.write_disk, key, value)
+        self.put(key, value)
+        return value
+
+
+class _Flight:
+    """One shared computation and the number of requests still waiting for it"""
+
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+    async def wait(self):
+        self.waiters += 1
+        try:
+            return await asyncio.shield(self.task)
+        except asyncio.CancelledError:
+            if not self.task.done() and self.waiters == 1:
+                # Last interested request went away: stop the work too
+                self.task.cancel()
+            raise
+        finally:
+            self.waiters -= 1
@@ -0,0 +1,82 @@
+"""
+Arrow export: negotiated only when the client accepts the stream type, the
+same table from row and columnar sheet 1 layouts, and Parquet batch output
+with one row per extracted row.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+import arrow_export
+from arrow_export import ARROW_STREAM_TYPE, sheet_table, to_ipc_stream, wants_arrow, write_parquet
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, False),
+    ("application/json", False),
+    (ARROW_STREAM_TYPE, True),
+    (f"application/json;q=0.9, {ARROW_STREAM_TYPE};q=0.5", True),
+    (f"{ARROW_STREAM_TYPE};q=0", False),
+    (f"application/json, {ARROW_STREAM_TYPE};q=0", False),
+    (f"{ARROW_STREAM_TYPE}-extra", False),
+])
+def test_wants_arrow_honours_q(monkeypatch, accept, expected):
+    monkeypatch.setattr(arrow_export, "pa", object())
+    assert wants_arrow(accept) is expected
+
+
+def test_wants_arrow_needs_pyarrow(monkeypatch):
+    monkeypatch.setattr(arrow_export, "pa", None)
+    assert not wants_arrow(ARROW_STREAM_TYPE)
+
+
+def test_row_and_columnar_layouts_give_the_same_table():
+    pa = pytest.importorskip("pyarrow")
+    pytest.importorskip("openpyxl")
+    from excel_pipeline import process_sheets, workbook_sheets
+    from synthetic_workbook import generate_workbook
+
+    workbook = generate_workbook()
+    sheets = workbook_sheets(["3"])
+    rows, columnar = (process_sheets(workbook, sheets, row_layout=layout)["sheets"] for layout in ("rows", "columnar"))
+    for row_sheet, columnar_sheet in zip(rows, columnar):
+        number = row_sheet["sheet_number"]
+        table = sheet_table("3", number, row_sheet["processed_data"], {"file": "march.xlsx"})
+        assert table.num_rows > 0
+        assert table.equals(sheet_table("3", number, columnar_sheet["processed_data"], {"file": "march.xlsx"}))
+        assert table.schema.metadata == {b"file": b"march.xlsx"}
+        assert pa.ipc.open_stream(to_ipc_stream(table)).read_all().equals(table)
+
+
+def test_empty_sheet_keeps_its_schema():
+    pytest.importorskip("pyarrow")
+    for number in (1, 2):
+        table = sheet_table("1", number, None)
+        assert table.num_rows == 0 and "month" in table.column_names
+
+
+def test_write_parquet_adds_the_source_of_each_row(tmp_path):
+    pytest.importorskip("pyarrow")
+    pytest.importorskip("openpyxl")
+    import pyarrow.parquet as pq
+    from excel_pipeline import process_sheets, workbook_sheets
+    from synthetic_workbook import generate_workbook
+
+    result = process_sheets(generate_workbook(directorate="المكلا"), workbook_sheets(["1", "2"]))
+    hierarchy_path, accounts_path = write_parquet([("first.xlsx", result), ("second.xlsx", result)], str(tmp_path))
+    hierarchy, accounts = pq.read_table(hierarchy_path), pq.read_table(accounts_path)
+    one_workbook = {number: sum(sheet_table(s["month"], number, s["processed_data"]).num_rows
+                                for s in result["sheets"] if s["sheet_number"] == number)
+                    for number in (1, 2)}
+    assert (hierarchy.num_rows, accounts.num_rows) == (2 * one_workbook[1], 2 * one_workbook[2])
+    assert hierarchy.column_names[:2] == ["file_name", "directorate_name"]
+    assert set(accounts.column("file_name").to_pylist()) == {"first.xlsx", "second.xlsx"}
+    assert set(hierarchy.column("directorate_name").to_pylist()) == {result["directorate_col"]}
+    assert set(accounts.column("month").to_pylist()) == {"1", "2"}
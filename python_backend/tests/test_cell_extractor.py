@@ -0,0 +1,74 @@
+"""
+Extraction plans: a streamed block must hold the same planned cells as the
+block built from a full-sheet DataFrame, and the vectorized conversions
+must treat blanks, NA-like strings and text like the old scalar code.
+
+Run from python_backend:  python -m pytest tests
+"""
+import datetime
+import io
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from cell_extractor import ExtractionPlan, read_block, read_cells, to_numbers, to_text
+
+
+def workbook(cells):
+    book = openpyxl.Workbook()
+    for coordinate, value in cells.items():
+        book.active[coordinate] = value
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def test_plan_is_zero_based_and_gathers_in_order():
+    plan = ExtractionPlan([(2, 3), (1, 1), (4, 2)], ["a", "b", "c"])
+    assert plan.shape == (4, 3)
+    assert plan.row_columns == {1: [2], 0: [0], 3: [1]}
+    block = np.arange(12).reshape(4, 3)
+    assert plan.gather(block).tolist() == [5, 0, 10]
+
+
+def test_streamed_block_matches_the_frame_block():
+    data = workbook({"A1": "header", "C2": 12.5, "B4": "text", "D4": 7})
+    plan = ExtractionPlan([(2, 3), (4, 2), (4, 4), (3, 1), (9, 9)], ["a", "b", "c", "d", "e"])
+    block, has_data = read_block(data, 0, plan)
+    assert has_data
+    frame = pd.read_excel(io.BytesIO(data), sheet_name=0, header=None)
+    expected = plan.block_from_frame(frame)
+    streamed, framed = plan.gather(block), plan.gather(expected)
+    # The frame gives NaN for empty cells and floats in numeric columns
+    assert to_numbers(streamed)[0].tolist() == to_numbers(framed)[0].tolist() == [12.5, 0.0, 7.0, 0.0, 0.0]
+    assert to_text(streamed)[1] == to_text(framed)[1] == "text"
+    assert read_cells(data, 0, [(2, 3), (9, 9)]) == {(2, 3): 12.5}
+
+
+def test_empty_sheet_has_no_data():
+    _, has_data = read_block(workbook({}), 0, ExtractionPlan([(1, 1)], ["a"]))
+    assert not has_data
+
+
+def test_to_numbers_blanks_and_invalid_cells():
+    numbers, invalid = to_numbers([None, "", "nan", " ", "12", 3, True, "abc",
+                                   datetime.datetime(2026, 1, 1), datetime.time(8, 0)])
+    assert numbers.tolist() == [0.0, 0.0, 0.0, 0.0, 12.0, 3.0, 1.0, 0.0, 0.0, 0.0]
+    assert invalid.tolist() == [False] * 7 + [True] * 3
+
+
+def test_to_numbers_fast_path():
+    numbers, invalid = to_numbers([1, 2.5, None, ""])
+    assert numbers.tolist() == [1.0, 2.5, 0.0, 0.0]
+    assert not invalid.any()
+
+
+def test_to_text():
+    assert to_text([None, "x", 5]).tolist() == ["", "x", "5"]
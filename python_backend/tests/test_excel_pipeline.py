@@ -0,0 +1,84 @@
+"""
+process_sheets must extract every mapped sheet of one upload like
+process_workbook does sheet by sheet, and give a missing sheet no data
+instead of failing the others.
+
+Run from python_backend:  python -m pytest tests
+"""
+import io
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from excel_pipeline import (
+    MONTHS_SHEET_MAPPING, InvalidWorkbookError, get_directorate_name, process_sheets, process_workbook, workbook_sheets
+)
+from hierarchy_arrays import COLUMNAR_KEY
+from synthetic_workbook import generate_workbook
+
+WORKBOOK = generate_workbook(directorate="المكلا")
+
+
+def truncated(content, sheet_count):
+    """content with only its first sheet_count sheets"""
+    book = openpyxl.load_workbook(io.BytesIO(content))
+    for name in book.sheetnames[sheet_count:]:
+        del book[name]
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def test_every_sheet_matches_process_workbook():
+    result = process_sheets(WORKBOOK, workbook_sheets(["1", "7"]))
+    assert [(sheet["month"], sheet["sheet_number"]) for sheet in result["sheets"]] == [
+        ("1", 1), ("1", 2), ("7", 1), ("7", 2)
+    ]
+    for sheet in result["sheets"]:
+        single = process_workbook(WORKBOOK, sheet["sheet_number"], sheet["actual_sheet_index"])
+        assert sheet["processed_data"] is not None
+        assert sheet["processed_data"] == single["processed_data"]
+        assert (result["office_name"], result["directorate_col"]) == (single["office_name"], single["directorate_col"])
+        assert single["directorate_name"] == "المكلا"
+
+
+def test_missing_sheets_get_no_data():
+    # Sheets 0-9: months 1 to 3 only
+    result = process_sheets(truncated(WORKBOOK, 10), workbook_sheets())
+    assert len(result["sheets"]) == 2 * len(MONTHS_SHEET_MAPPING)
+    present = {sheet["month"] for sheet in result["sheets"] if sheet["processed_data"] is not None}
+    assert present == {"1", "2", "3"}
+
+
+def test_columnar_layout():
+    result = process_sheets(WORKBOOK, [("1", 1, 2)], with_names=False, row_layout="columnar")
+    processed_data = result["sheets"][0]["processed_data"]
+    assert COLUMNAR_KEY in processed_data and "hierarchical_rows" not in processed_data
+    assert result["office_name"] is None
+
+
+def test_directorate_name():
+    assert get_directorate_name(WORKBOOK) == "المكلا"
+    assert get_directorate_name(generate_workbook(directorate="سيئون")) == "سيئون"
+
+
+def test_not_a_workbook_is_rejected():
+    with pytest.raises(InvalidWorkbookError):
+        process_sheets(b"not a workbook", workbook_sheets(["1"]))
+
+
+def test_bytes_file_objects_and_paths_give_the_same_result(tmp_path):
+    path = tmp_path / "upload.xlsx"
+    path.write_bytes(WORKBOOK)
+    sheets = workbook_sheets(["2"])
+    from_bytes = process_sheets(WORKBOOK, sheets)
+    assert process_sheets(io.BytesIO(WORKBOOK), sheets) == from_bytes
+    assert process_sheets(str(path), sheets) == from_bytes
+    assert process_workbook(WORKBOOK, 2, 6) == process_workbook(str(path), 2, 6)
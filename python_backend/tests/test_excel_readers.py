@@ -0,0 +1,61 @@
+"""
+Reader backends: every installed reader must extract the same values as
+openpyxl, and reader_for must fall back to one that can read the format.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+pytest.importorskip("openpyxl")
+
+import excel_readers
+from excel_pipeline import process_sheets, workbook_sheets
+from excel_readers import READER_ENV, READERS, available_readers, reader_for, use_reader
+from synthetic_workbook import generate_workbook
+
+
+@pytest.fixture
+def reader_env(monkeypatch):
+    monkeypatch.setenv(READER_ENV, "auto")
+
+
+def test_every_installed_reader_extracts_the_same_values():
+    content = generate_workbook(rows=60, cols=20, seed=3)
+    sheets = workbook_sheets(["1", "12"])
+    reference = process_sheets(content, sheets, reader="openpyxl")
+    assert all(sheet["processed_data"] for sheet in reference["sheets"])
+    for reader in available_readers("xlsx"):
+        assert process_sheets(content, sheets, reader=reader.name) == reference, reader.name
+
+
+def test_reader_for_falls_back_to_a_capable_reader(reader_env, monkeypatch):
+    assert reader_for("xlsx", "openpyxl").name == "openpyxl"
+    # openpyxl cannot read .xls, an unknown name means auto
+    assert reader_for("xls", "openpyxl").name in ("calamine", "xlrd")
+    assert reader_for("xlsx", "nonsense") is available_readers("xlsx")[0]
+    # Undetected formats are read as .xlsx
+    assert "xlsx" in reader_for(None).formats
+    monkeypatch.setattr(READERS["calamine"], "available", lambda: False)
+    assert reader_for("xlsx", "calamine").name == "openpyxl"
+    assert reader_for("xls").name == "xlrd"
+
+
+def test_use_reader_sets_the_process_default(reader_env):
+    use_reader("openpyxl")
+    assert os.environ[READER_ENV] == "openpyxl"
+    assert reader_for("xlsx").name == "openpyxl"
+    with pytest.raises(ValueError):
+        use_reader("nonsense")
+
+
+def test_no_reader_installed(monkeypatch):
+    monkeypatch.setattr(excel_readers, "AUTO_ORDER", {"xlsx": ()})
+    with pytest.raises(ValueError, match="No Excel reader"):
+        reader_for("xlsx", "auto")
@@ -0,0 +1,108 @@
+"""
+Extraction store: a re-upload replaces the earlier version of its source,
+re-sending the current one is a no-op, compaction drops replaced rows, and
+reads only return the partitions and columns asked for.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import sys
+from urllib.parse import quote
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pyarrow")
+
+from extraction_store import UNKNOWN_DIRECTORATE, ExtractionStore
+
+DIRECTORATE = "مديرية المكلا"
+
+
+def types(*values):
+    return {"types": [{"id": f"1_{i}", "name": "", "value": str(value)} for i, value in enumerate(values, 1)]}
+
+
+def store_types(store, values, office_name, upload_id, month="3", directorate=DIRECTORATE):
+    return store.append(1, types(*values), "2026", month, directorate, f"{office_name}.xlsx", office_name, upload_id)
+
+
+def stored_values(store, **filters):
+    table = store.read("types", columns=["office_name", "value"], **filters)
+    return sorted(zip(table.column("office_name").to_pylist(), table.column("value").to_pylist()))
+
+
+def part_files(store, key):
+    return sorted(name for name in os.listdir(os.path.join(store.directory, key)) if name.endswith(".parquet"))
+
+
+def test_reupload_replaces_the_part_of_its_source(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    assert store_types(store, (1, 2), "finance", "first") == 2
+    store_types(store, (5,), "health", "other")
+    key = ExtractionStore.partition_key("types", "2026", "3", DIRECTORATE)
+    first_part = store.partitions()[0]["files"][0]["name"]
+
+    assert store_types(store, (10,), "finance", "second") == 1
+    assert stored_values(store) == [("finance", 10.0), ("health", 5.0)]
+    (entry,) = store.partitions()
+    assert entry["key"] == key and entry["rows"] == 2
+    assert entry["sources"]["finance"]["upload_id"] == "second"
+    # Only the replaced upload's part is gone, from the index and the disk
+    assert len(part_files(store, key)) == 2 and first_part not in part_files(store, key)
+    assert [part["uploads"] for part in entry["files"]] == [["other"], ["second"]]
+
+
+def test_resending_the_current_upload_is_a_no_op(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    store_types(store, (1,), "finance", "first")
+    assert store_types(store, (1,), "finance", "first") == 0
+    assert stored_values(store) == [("finance", 1.0)]
+    assert len(store.partitions()[0]["files"]) == 1
+
+
+def test_compaction_drops_rows_of_replaced_uploads(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    store_types(store, (1,), "finance", "first")
+    store_types(store, (2,), "health", "other")
+    key = ExtractionStore.partition_key("types", "2026", "3", DIRECTORATE)
+    assert store.compact() == [key]
+    assert store.compact() == []
+
+    # The compacted file still holds a current upload, so it stays and its replaced rows are skipped
+    store_types(store, (7,), "finance", "second")
+    assert stored_values(store) == [("finance", 7.0), ("health", 2.0)]
+    assert len(store.partitions()[0]["files"]) == 2
+
+    assert store.compact() == [key]
+    (entry,) = store.partitions()
+    assert entry["files"][0]["uploads"] == ["other", "second"]
+    assert len(part_files(store, key)) == 1
+    assert store.read("types").num_rows == 2
+    assert stored_values(store) == [("finance", 7.0), ("health", 2.0)]
+
+
+def test_read_selects_partitions_and_columns(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    store_types(store, (1,), "finance", "march", month="3")
+    store_types(store, (2,), "finance", "april", month="4")
+    store_types(store, (4,), "finance", "nameless", directorate="")
+    store.append(2, {"الحسابات الرئيسية": {"الموارد": {"debit": 3.0, "credit": 1.0}}},
+                 "2026", "3", DIRECTORATE, "finance.xlsx", "finance", "accounts")
+
+    assert stored_values(store, month=3, directorate=DIRECTORATE) == [("finance", 1.0)]
+    assert stored_values(store, directorate=UNKNOWN_DIRECTORATE) == [("finance", 4.0)]
+    assert [entry["month"] for entry in store.partitions(kind="types", directorate=DIRECTORATE)] == ["3", "4"]
+    assert store.partitions(kind="accounts")[0]["key"].endswith(f"directorate={quote(DIRECTORATE, safe='')}")
+
+    table = store.read("types", month=4, columns=["type_id", "value"])
+    assert table.column_names == ["type_id", "value", "year", "month", "directorate"]
+    assert table.to_pylist() == [
+        {"type_id": "1_1", "value": 2.0, "year": "2026", "month": "4", "directorate": DIRECTORATE}
+    ]
+    accounts = store.read("accounts")
+    assert (accounts.column("account_id").to_pylist(), accounts.column("debit").to_pylist()) == ([1], [3.0])
+
+    empty = store.read("types", month=12, columns=["value"])
+    assert empty.num_rows == 0 and empty.column_names == ["value", "year", "month", "directorate"]
@@ -0,0 +1,66 @@
+"""
+A corrected re-upload of a sheet must replace the earlier version in the
+consolidated report, not add to it.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+pytest.importorskip("pyarrow")
+
+from extraction_store import ExtractionStore
+from final_report import ConsolidatedReport
+
+TYPE_ID = "1_1111"
+
+
+def payload(value, office_name, file_name, month="3"):
+    return {
+        "file_name": file_name, "month": month, "year": "2026", "office_name": office_name,
+        "directorate_name": "مديرية المكلا", "sheet_number_processed": 1,
+        "processed_data": {"types": [{"id": TYPE_ID, "name": "", "value": str(value)}]},
+    }
+
+
+def type_total(report, month="3"):
+    return report.totals("types")[0, int(month) - 1, report.ids("types").index(TYPE_ID)]
+
+
+def test_store_report_counts_only_the_latest_upload(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    store.append_payload(payload(100, "مكتب المالية", "march.xlsx"), "first")
+    store.append_payload(payload(40, "مكتب الصحة", "health.xlsx"), "other-office")
+    store.compact()
+    store.append_payload(payload(250, "مكتب المالية", "march-corrected.xlsx"), "second")
+
+    report = ConsolidatedReport.from_store(store, "2026")
+    assert type_total(report) == 250 + 40
+    assert report.grand_totals("chapters").sum() == 250 + 40
+
+    # Compaction keeps only the rows of the current uploads
+    store.compact()
+    assert type_total(ConsolidatedReport.from_store(store, "2026")) == 250 + 40
+
+
+def test_resending_the_current_upload_is_a_no_op(tmp_path):
+    store = ExtractionStore(str(tmp_path))
+    assert store.append_payload(payload(100, "مكتب المالية", "march.xlsx"), "first") == 1
+    assert store.append_payload(payload(100, "مكتب المالية", "march.xlsx"), "first") == 0
+    assert type_total(ConsolidatedReport.from_store(store, "2026")) == 100
+
+
+def test_payload_report_counts_only_the_latest_upload():
+    report = ConsolidatedReport.from_payloads([
+        payload(100, "مكتب المالية", "march.xlsx"),
+        payload(40, "مكتب الصحة", "health.xlsx"),
+        payload(250, "مكتب المالية", "march-corrected.xlsx"),
+        payload(7, "مكتب المالية", "april.xlsx", month="4"),
+    ])
+    assert type_total(report) == 250 + 40
+    assert type_total(report, "4") == 7
+    assert report.year_to_date("types")[0, 3, report.ids("types").index(TYPE_ID)] == 250 + 40 + 7
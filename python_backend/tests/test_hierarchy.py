@@ -0,0 +1,176 @@
+"""
+HierarchyArrays must give exactly what HierarchicalDictionaries.print_structure()
+gives after update_values(values, 'types'), on the real tree and on edge cases.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dics_of_ExcelCells import HIERARCHY_ARRAYS, HIERARCHY_TEMPLATE, TYPE_ANCESTORS, HierarchicalDictionaries
+from hierarchy_arrays import COLUMNAR_KEY, COLUMNAR_STRUCTURE_KEYS, HierarchyArrays, hierarchical_columns
+
+# Strings a sheet cell can come out as
+EDGE_VALUES = ["", "abc", "0", "0.0", "-0", "-5", "1e3", " 7 ", "12.50", "nan", "inf", "1,000"]
+
+
+def dictionaries_structure(dict_system, values, include=None):
+    overlay = dict_system.overlay()
+    overlay.update_values(values, "types")
+    return overlay.print_structure(include)
+
+
+def small_tree():
+    """A tree whose links point at missing children and link one type twice"""
+    dict_system = HierarchicalDictionaries()
+    dict_system.initialize_structure(
+        {"c1": "chapter 1", "c2": "chapter 2"},
+        {"s1": "section 1", "s2": "section 2"},
+        {"i1": "item 1", "i2": "item 2", "i3": "item 3"},
+        {"t1": "type 1", "t2": "type 2", "t3": "type 3", "t4": "type 4"},
+    )
+    dict_system.link_hierarchy(
+        type_to_item={"i1": ["t1", "t2", "missing"], "i2": ["t2", "t3"], "i3": []},
+        item_to_section={"s1": ["i1", "gone"], "s2": ["i2", "i3"]},
+        section_to_chapter={"c1": ["s1", "s2", "absent"], "c2": ["nowhere"]},
+    )
+    return dict_system
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_arrays_match_dictionaries_on_the_template(seed):
+    rnd = random.Random(seed)
+    values = {}
+    for type_id in HIERARCHY_ARRAYS.type_ids:
+        draw = rnd.random()
+        if draw < 0.3:
+            continue
+        values[type_id] = rnd.choice(EDGE_VALUES) if draw < 0.5 else str(rnd.randint(-1000, 100000))
+    assert HIERARCHY_ARRAYS.structure(values) == dictionaries_structure(HIERARCHY_TEMPLATE, values)
+    # Compared as repr: "nan" cells give NaN fact values, which never compare equal
+    assert (repr(HIERARCHY_ARRAYS.structure(values, COLUMNAR_STRUCTURE_KEYS))
+            == repr(dictionaries_structure(HIERARCHY_TEMPLATE, values, COLUMNAR_STRUCTURE_KEYS)))
+
+
+@pytest.mark.parametrize("values", [
+    {},
+    {"t1": "", "t2": "", "t3": ""},
+    {"t1": "abc", "t2": "x", "t3": "5"},
+    {"t1": "5", "t2": "-5", "t3": "0"},
+    {"t1": "0", "t2": "0.0", "t3": "-0"},
+    {"t1": "1.5", "t2": "2", "t3": "3", "t4": "4", "unknown": "9"},
+    {"t2": "nan", "t3": "1"},
+])
+def test_arrays_match_dictionaries_on_edge_cases(values):
+    dict_system = small_tree()
+    arrays = HierarchyArrays.from_dictionaries(dict_system)
+    assert arrays.structure(values) == dictionaries_structure(dict_system, values)
+
+
+def test_batch_matches_single_sheets():
+    sheets = [{"t1": "1", "t2": "2"}, {"t3": "abc"}, {"t4": "4", "t1": "-1"}]
+    arrays = HierarchyArrays.from_dictionaries(small_tree())
+    assert arrays.structures(sheets) == [arrays.structure(values) for values in sheets]
+
+
+def node_values(dict_system):
+    return {level: {node_id: node["value"] for node_id, node in getattr(dict_system, level).items()}
+            for level in ("chapters", "sections", "items", "types")}
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_corrections_propagate_like_a_full_roll_up(seed):
+    rnd = random.Random(seed)
+    type_ids = list(HIERARCHY_TEMPLATE.types)
+    first = {type_id: str(rnd.randint(0, 1000)) for type_id in type_ids}
+    corrections = {type_id: rnd.choice(["", "abc", "0", str(rnd.randint(0, 1000))])
+                   for type_id in rnd.sample(type_ids, 10)}
+
+    corrected = HIERARCHY_TEMPLATE.overlay()
+    corrected.update_values(first, "types")
+    corrected.update_values(corrections, "types")
+
+    fresh = HIERARCHY_TEMPLATE.overlay()
+    fresh.update_values({**first, **corrections}, "types")
+    assert node_values(corrected) == node_values(fresh)
+
+
+def test_corrections_on_a_tree_with_missing_children():
+    corrected = small_tree()
+    corrected.update_values({"t1": "1", "t2": "2", "t3": "3"}, "types")
+    corrected.update_values({"t2": "20"}, "types")
+    fresh = small_tree()
+    fresh.update_values({"t1": "1", "t2": "20", "t3": "3"}, "types")
+    assert node_values(corrected) == node_values(fresh)
+    assert corrected.items["i1"]["value"] == "21.0" and corrected.chapters["c1"]["value"] == "44.0"
+
+
+def test_hand_set_totals_are_recomputed_by_the_next_types_update():
+    dict_system = small_tree()
+    dict_system.update_values({"t1": "1"}, "types")
+    dict_system.update_values({"i1": "100"}, "items")
+    dict_system.update_values({"t3": "3"}, "types")
+    assert dict_system.items["i1"]["value"] == "1.0"
+    assert dict_system.chapters["c1"]["value"] == "4.0"
+
+
+def test_overlays_never_write_to_the_template():
+    before = node_values(HIERARCHY_TEMPLATE)
+    links = {item_id: list(item["type_ids"]) for item_id, item in HIERARCHY_TEMPLATE.items.items()}
+    type_id = next(iter(HIERARCHY_TEMPLATE.types))
+    for value in ("5", "7"):
+        overlay = HIERARCHY_TEMPLATE.overlay()
+        overlay.update_values({type_id: value}, "types")
+        assert overlay.types[type_id]["value"] == value
+    assert node_values(HIERARCHY_TEMPLATE) == before
+    assert {item_id: list(item["type_ids"]) for item_id, item in HIERARCHY_TEMPLATE.items.items()} == links
+    assert node_values(HIERARCHY_TEMPLATE.overlay()) == before
+
+
+def test_ancestor_table_follows_the_last_parent():
+    ancestors = small_tree()._ancestor_table()
+    # t2 is linked by i1 and i2; the last parent wins
+    assert ancestors["t2"] == ("c1", "s2", "i2")
+    assert ancestors["t1"] == ("c1", "s1", "i1")
+    assert ancestors["t4"] == ("", "", "")
+    for type_id, (chapter_id, section_id, item_id) in TYPE_ANCESTORS.items():
+        assert HIERARCHY_ARRAYS.type_to_item.get(type_id, "") == item_id
+        assert HIERARCHY_ARRAYS.item_to_section.get(item_id, "") == section_id
+        assert HIERARCHY_ARRAYS.section_to_chapter.get(section_id, "") == chapter_id
+
+
+def test_hierarchical_columns_deduplicates_dimensions():
+    names = {"chapters": {"c1": "chapter 1"}, "sections": {"s1": "section 1"},
+             "items": {"i1": "item 1"}, "types": {"t1": "type 1", "t2": "type 2"}}
+    paths = [("c1", "s1", "i1", "t1"), ("c1", "s1", "i1", "t2"), ("", "", "", "t3")]
+    columns = hierarchical_columns(paths, [1.0, 2.0, 3.0], names)
+    assert columns["chapters"] == [{"chapter_id": "c1", "name": "chapter 1"}]
+    assert columns["sections"] == [{"section_id": "s1", "name": "section 1", "chapter_id": "c1"}]
+    assert columns["items"] == [{"item_id": "i1", "name": "item 1", "section_id": "s1"}]
+    # An unnamed type keeps its ID as name; a type without parents has an empty parent ID
+    assert columns["types"] == [
+        {"type_id": "t1", "name": "type 1", "item_id": "i1"},
+        {"type_id": "t2", "name": "type 2", "item_id": "i1"},
+        {"type_id": "t3", "name": "t3", "item_id": ""},
+    ]
+    assert columns["facts"] == {
+        "chapter_id": ["c1", "c1", ""], "section_id": ["s1", "s1", ""], "item_id": ["i1", "i1", ""],
+        "type_id": ["t1", "t2", "t3"], "value": [1.0, 2.0, 3.0],
+    }
+
+
+def test_columns_carry_the_same_rows_as_hierarchical_rows():
+    values = {type_id: str(i) for i, type_id in enumerate(HIERARCHY_ARRAYS.type_ids[::7], 1)}
+    structure = HIERARCHY_ARRAYS.structure(values, ("hierarchical_rows", COLUMNAR_KEY))
+    rows, columns = structure["hierarchical_rows"], structure[COLUMNAR_KEY]
+    facts = columns["facts"]
+    for column in ("chapter_id", "section_id", "item_id", "type_id"):
+        assert facts[column] == [row[column] for row in rows]
+    assert facts["value"] == [float(row["value"]) for row in rows]
+    type_names = {row["type_id"]: row["name"] for row in columns["types"]}
+    assert type_names == {row["type_id"]: row["name"] for row in rows}
@@ -0,0 +1,53 @@
+"""
+Load test helpers: nearest-rank percentiles, the saturation point, and the
+Next.js stub answering single payloads and batches like the real route.
+
+Run from python_backend:  python -m pytest tests
+"""
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+pytest.importorskip("httpx")
+
+from loadtest import percentile, saturation_level
+from nextjs_stub import PROCESS_PATH, create_app
+
+
+def test_nearest_rank_percentile():
+    values = sorted([5, 1, 4, 2, 3, 10, 9, 8, 7, 6])
+    assert percentile(values, 0.5) == 5
+    assert percentile(values, 0.9) == 9
+    assert percentile(values, 0.99) == 10
+    assert percentile(values, 0.0) == 1
+    assert percentile([], 0.5) is None
+
+
+def test_saturation_is_the_last_level_that_still_paid_off():
+    levels = [{"concurrency": c, "throughput_rps": rps} for c, rps in ((1, 10), (2, 19), (4, 30), (8, 32), (16, 31))]
+    assert saturation_level(levels)["concurrency"] == 4
+    assert saturation_level(levels[:3]) is None
+    assert saturation_level([]) is None
+
+
+def test_stub_answers_like_the_ingest_route():
+    from fastapi.testclient import TestClient
+
+    with TestClient(create_app(failure_rate=0.0)) as client:
+        assert client.post(PROCESS_PATH, json={"month": "1"}).status_code == 200
+        batch = client.post(PROCESS_PATH, content=gzip.compress(json.dumps({"batch": [{}, {}]}).encode()),
+                            headers={"content-encoding": "gzip", "content-type": "application/json"})
+        assert batch.json() == {"results": [{"message": "Data processed and saved successfully"}] * 2}
+        stats = client.get("/stats").json()
+        assert (stats["requests"], stats["batches"], stats["payloads"]) == (2, 1, 3)
+
+    with TestClient(create_app(failure_rate=1.0)) as client:
+        assert client.post(PROCESS_PATH, json={}).status_code == 500
+        assert client.post(PROCESS_PATH, json={"batch": [{}]}).json() == {"results": [{"error": "Failed to process data"}]}
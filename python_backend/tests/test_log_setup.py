@@ -0,0 +1,64 @@
+"""
+Logging helpers: Capped renders big dumps lazily and cut to size, and both
+formatters carry the fields passed through extra=.
+
+Run from python_backend:  python -m pytest tests
+"""
+import json
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import log_setup
+from log_setup import Capped, JsonFormatter, TextFormatter
+
+
+class Rendering:
+    """A value that counts how often it is rendered"""
+
+    def __init__(self):
+        self.renders = 0
+
+    def __str__(self):
+        self.renders += 1
+        return "rendered"
+
+
+def test_capped_cuts_items_and_characters(monkeypatch):
+    assert str(Capped([1, 2, 3, 4, 5], max_items=2)) == "[1, 2] ... (3 more)"
+    assert str(Capped([1, 2])) == "[1, 2]"
+    monkeypatch.setattr(log_setup, "LOG_DUMP_CHARS", 10)
+    assert str(Capped("x" * 25)) == "x" * 10 + " ... (15 more chars)"
+
+
+def test_capped_is_only_rendered_for_emitted_records():
+    value = Rendering()
+    logger = logging.getLogger("test_log_setup.lazy")
+    logger.setLevel(logging.INFO)
+    logger.debug("dump: %s", Capped(value))
+    assert value.renders == 0
+    record = logger.makeRecord(logger.name, logging.INFO, __file__, 0, "dump: %s", (Capped(value),), None)
+    assert record.getMessage() == "dump: rendered"
+    assert value.renders == 1
+
+
+def record_with_fields():
+    return logging.getLogger("excel_api").makeRecord(
+        "excel_api", logging.INFO, __file__, 1, "Parsed %s", ("march.xlsx",), None,
+        extra={"sheets": 24, "reader": "calamine"},
+    )
+
+
+def test_json_formatter_keeps_structured_fields():
+    entry = json.loads(JsonFormatter().format(record_with_fields()))
+    assert entry["message"] == "Parsed march.xlsx"
+    assert (entry["level"], entry["logger"]) == ("INFO", "excel_api")
+    assert (entry["sheets"], entry["reader"]) == (24, "calamine")
+
+
+def test_text_formatter_appends_structured_fields():
+    line = TextFormatter().format(record_with_fields())
+    assert "INFO" in line and "excel_api: Parsed march.xlsx" in line
+    assert line.endswith(" sheets=24 reader=calamine")
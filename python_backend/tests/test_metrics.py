@@ -0,0 +1,100 @@
+"""
+Prometheus metrics: text rendering of each metric type, stage timings
+carried back from worker processes, and the request/error accounting of
+MetricsMiddleware.
+
+Run from python_backend:  python -m pytest tests
+"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import metrics
+from metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_rendering_escapes_labels():
+    counter = Counter("demo_total", "Demo counter", ("path",))
+    counter.inc(path='a"b\\c')
+    counter.inc(2, path='a"b\\c')
+    assert counter.render() == [
+        "# HELP demo_total Demo counter",
+        "# TYPE demo_total counter",
+        'demo_total{path="a\\"b\\\\c"} 3',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("demo_seconds", "Demo histogram", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+    assert histogram.render()[2:] == [
+        'demo_seconds_bucket{le="0.1"} 2',
+        'demo_seconds_bucket{le="1"} 3',
+        'demo_seconds_bucket{le="+Inf"} 4',
+        "demo_seconds_sum 3.65",
+        "demo_seconds_count 4",
+    ]
+
+
+def test_gauges_are_read_at_scrape_time():
+    depth = {"value": 1}
+    registry = Registry()
+    registry.add(Gauge("demo_depth", "Demo gauge", lambda: {(): depth["value"]}))
+    assert registry.render().endswith("demo_depth 1\n")
+    depth["value"] = 4
+    assert registry.render().endswith("demo_depth 4\n")
+
+
+def test_worker_stage_timings_wait_for_the_reply(monkeypatch):
+    monkeypatch.setattr(metrics, "_pending_stages", None)
+    metrics.collect_stages()
+    with metrics.stage("demo_stage"):
+        pass
+    samples = metrics.drain_stages()
+    assert [name for name, _ in samples] == ["demo_stage"]
+    assert metrics.drain_stages() == []
+    assert ("demo_stage",) not in metrics.STAGE_SECONDS._values
+    monkeypatch.setattr(metrics, "_pending_stages", None)
+    metrics.observe_stages(samples)
+    # One observation over the buckets and +Inf, the sum last
+    assert sum(metrics.STAGE_SECONDS._values[("demo_stage",)][:-1]) == 1
+
+
+def test_middleware_counts_statuses_and_causes():
+    pytest.importorskip("httpx")
+    from fastapi import FastAPI, HTTPException, Request
+    from fastapi.testclient import TestClient
+
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware, paths={"/demo-ok", "/demo-bad", "/demo-named"})
+
+    @app.get("/demo-ok")
+    def ok():
+        return {}
+
+    @app.get("/demo-bad")
+    def bad():
+        raise HTTPException(status_code=400)
+
+    @app.get("/demo-named")
+    def named(request: Request):
+        metrics.set_error_cause(request, "invalid_workbook")
+        metrics.set_error_cause(request, "ignored")
+        raise HTTPException(status_code=400)
+
+    @app.get("/demo-unmeasured")
+    def unmeasured():
+        return {}
+
+    with TestClient(app) as client:
+        for path in ("/demo-ok", "/demo-ok", "/demo-bad", "/demo-named", "/demo-unmeasured"):
+            client.get(path)
+
+    assert metrics.REQUESTS._values[("/demo-ok", "200")] == 2
+    assert metrics.ERRORS._values[("/demo-bad", "bad_request")] == 1
+    assert metrics.ERRORS._values[("/demo-named", "invalid_workbook")] == 1
+    assert not any(key[0] == "/demo-unmeasured" for key in metrics.REQUESTS._values)
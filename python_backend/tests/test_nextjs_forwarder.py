@@ -0,0 +1,95 @@
+"""
+Payloads sent within one batch window must reach Next.js as one
+{"batch": [...]} POST, each caller getting its own item's result.
+
+Run from python_backend:  python -m pytest tests
+"""
+import asyncio
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+httpx = pytest.importorskip("httpx")
+
+from nextjs_forwarder import ForwardError, NextJSForwarder
+
+
+class Endpoint:
+    """Records the bodies posted to it and answers like the ingest endpoint"""
+
+    def __init__(self, status=200):
+        self.status = status
+        self.bodies = []
+
+    def __call__(self, request):
+        content = request.content
+        if request.headers.get("content-encoding") == "gzip":
+            content = gzip.decompress(content)
+        body = json.loads(content)
+        self.bodies.append(body)
+        if "batch" in body:
+            results = [{"error": "rejected"} if item.get("bad") else {"ok": item["n"]} for item in body["batch"]]
+            return httpx.Response(self.status, json={"results": results})
+        return httpx.Response(self.status, json={"ok": body["n"]})
+
+
+def forward(endpoint, scenario, **options):
+    async def main():
+        forwarder = NextJSForwarder("http://nextjs/api/ingest", transport=httpx.MockTransport(endpoint), **options)
+        await forwarder.start()
+        try:
+            return await scenario(forwarder)
+        finally:
+            await forwarder.close()
+    return asyncio.run(main())
+
+
+def test_unbatched_send_posts_each_payload():
+    endpoint = Endpoint()
+    results = forward(endpoint, lambda f: asyncio.gather(f.send({"n": 1}), f.send({"n": 2})))
+    assert results == [{"ok": 1}, {"ok": 2}]
+    assert sorted(body["n"] for body in endpoint.bodies) == [1, 2]
+
+
+def test_batch_window_coalesces_sends():
+    endpoint = Endpoint()
+
+    async def scenario(forwarder):
+        return await asyncio.gather(
+            *(forwarder.send({"n": n, "bad": n == 2}) for n in range(4)), return_exceptions=True
+        )
+
+    results = forward(endpoint, scenario, batch_window=0.05)
+    assert len(endpoint.bodies) == 1
+    assert [item["n"] for item in endpoint.bodies[0]["batch"]] == [0, 1, 2, 3]
+    assert results[0] == {"ok": 0} and results[3] == {"ok": 3}
+    assert isinstance(results[2], ForwardError)
+
+
+def test_batch_max_flushes_without_waiting():
+    endpoint = Endpoint()
+
+    async def scenario(forwarder):
+        return await asyncio.wait_for(asyncio.gather(*(forwarder.send({"n": n}) for n in range(3))), 5)
+
+    assert forward(endpoint, scenario, batch_window=60, batch_max=3) == [{"ok": 0}, {"ok": 1}, {"ok": 2}]
+    assert len(endpoint.bodies) == 1
+
+
+def test_http_error_fails_every_item_of_the_batch():
+    async def scenario(forwarder):
+        return await asyncio.gather(forwarder.send({"n": 1}), forwarder.send({"n": 2}), return_exceptions=True)
+
+    results = forward(Endpoint(status=500), scenario, batch_window=0.05)
+    assert all(isinstance(result, ForwardError) for result in results)
+
+
+def test_gzip_body():
+    endpoint = Endpoint()
+    assert forward(endpoint, lambda f: f.send({"n": 7}), gzip_body=True) == {"ok": 7}
+    assert endpoint.bodies == [{"n": 7}]
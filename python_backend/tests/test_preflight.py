@@ -0,0 +1,84 @@
+"""
+Pre-flight: the format comes from the file signature and the worksheet list
+from the workbook directory, and broken or incomplete files are rejected
+before any sheet is parsed.
+
+Run from python_backend:  python -m pytest tests
+"""
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from preflight import InvalidWorkbookError, inspect_workbook, sniff_format, validate_workbook
+
+
+def workbook(*names, chartsheet=False):
+    book = openpyxl.Workbook()
+    book.active.title = names[0]
+    for name in names[1:]:
+        book.create_sheet(name)
+    if chartsheet:
+        book.create_chartsheet("Chart", 1)
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def without_member(content, member):
+    source = zipfile.ZipFile(io.BytesIO(content))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as target:
+        for info in source.infolist():
+            if info.filename != member:
+                target.writestr(info, source.read(info))
+    return buffer.getvalue()
+
+
+def test_sniff_format_of_every_source_kind(tmp_path):
+    content = workbook("a")
+    path = tmp_path / "book.xlsx"
+    path.write_bytes(content)
+    file_object = io.BytesIO(content)
+    assert sniff_format(content) == sniff_format(str(path)) == sniff_format(file_object) == "xlsx"
+    # File-like objects are rewound for the reader
+    assert file_object.tell() == 0
+    assert sniff_format(b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1rest") == "xls"
+    assert sniff_format(b"%PDF-1.7") is None
+
+
+def test_worksheets_in_reader_order_without_chartsheets():
+    info = inspect_workbook(workbook("first", "second", "third", chartsheet=True))
+    assert info.format == "xlsx"
+    assert info.sheet_names == ["first", "second", "third"]
+
+
+def test_required_sheet_indexes():
+    content = workbook("a", "b", "c")
+    assert validate_workbook(content, (0, 2)).sheet_names == ["a", "b", "c"]
+    with pytest.raises(InvalidWorkbookError, match="sheet index 5"):
+        validate_workbook(content, (0, 5, 9))
+
+
+@pytest.mark.parametrize("content", [
+    b"not a workbook at all",
+    b"PK\x03\x04 truncated zip",
+    b"",
+])
+def test_unreadable_files_are_rejected(content):
+    with pytest.raises(InvalidWorkbookError):
+        inspect_workbook(content)
+
+
+def test_incomplete_workbooks_are_rejected():
+    content = workbook("a", "b")
+    with pytest.raises(InvalidWorkbookError, match="missing its part"):
+        inspect_workbook(without_member(content, "xl/worksheets/sheet2.xml"))
+    with pytest.raises(InvalidWorkbookError):
+        inspect_workbook(without_member(without_member(content, "xl/workbook.xml"), "_rels/.rels"))
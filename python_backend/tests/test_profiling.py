@@ -0,0 +1,50 @@
+"""
+Opt-in profiling: profiled() returns the job's result with a report of its
+hottest functions and allocations, and leaves tracemalloc as it found it.
+
+Run from python_backend:  python -m pytest tests
+"""
+import json
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from profiling import list_reports, profiled, save_report
+
+
+def build_rows(source, count):
+    return [{"source": source, "row": i} for i in range(count)]
+
+
+def test_profiled_returns_the_result_and_a_report():
+    result, report = profiled("upload", 5, build_rows, 1000)
+    assert result == build_rows("upload", 1000)
+    assert report["function"] == "build_rows"
+    assert report["wall_seconds"] >= 0 and report["cpu_seconds"] >= 0
+    assert report["peak_memory_bytes"] > 0
+    assert 0 < len(report["top_functions"]) <= 5
+    assert any("build_rows" in row["function"] for row in report["top_functions"])
+    assert len(report["top_allocations"]) <= 5
+    json.dumps(report)
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiled_keeps_an_earlier_tracemalloc_running():
+    tracemalloc.start()
+    try:
+        profiled("upload", 3, build_rows, 10)
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+
+def test_reports_are_saved_and_listed_newest_first(tmp_path):
+    directory = str(tmp_path / "profiles")
+    assert list_reports(directory) == []
+    first = save_report(directory, {"n": 1}, "first")
+    second = save_report(directory, {"n": 2}, "second")
+    assert list_reports(directory) == [second, first]
+    with open(os.path.join(directory, second), encoding="utf-8") as f:
+        assert json.load(f) == {"n": 2}
@@ -0,0 +1,57 @@
+"""
+Account semantics of read_accounts_from_excel since the debit/credit cells
+are streamed: each side is read on its own, and a non-numeric cell zeroes
+both sides of its account without failing the sheet.
+
+Run from python_backend:  python -m pytest tests
+"""
+import datetime
+import io
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from reading_Excel import read_accounts_from_excel
+
+MAIN = "الحسابات الرئيسية"
+
+
+def workbook(cells):
+    """xlsx bytes of one sheet holding cells, {"F6": value}"""
+    book = openpyxl.Workbook()
+    for coordinate, value in cells.items():
+        book.active[coordinate] = value
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+
+def test_non_numeric_cell_zeroes_both_sides_of_its_account():
+    accounts = read_accounts_from_excel(workbook({
+        "F6": 100, "K6": "abc",
+        "F7": 5, "K7": 7,
+        "F8": datetime.datetime(2026, 3, 1), "K8": 9,
+        "F9": 3, "K9": datetime.time(12, 30),
+    }))
+    assert accounts is not None
+    main = accounts[MAIN]
+    assert main["الموارد"] == {"debit": 0.0, "credit": 0.0}
+    assert main["الاستخدامات"] == {"debit": 5.0, "credit": 7.0}
+    assert main["حساب البنك موارد محلية"] == {"debit": 0.0, "credit": 0.0}
+    assert main["حساب البنك نفقات تشغيلية محلية"] == {"debit": 0.0, "credit": 0.0}
+
+
+def test_cell_outside_the_sheet_is_empty():
+    # Nothing right of column F: every credit cell lies outside the sheet
+    main = read_accounts_from_excel(workbook({"F6": 100, "F7": 3}))[MAIN]
+    assert main["الموارد"] == {"debit": 100.0, "credit": 0.0}
+    assert main["الاستخدامات"] == {"debit": 3.0, "credit": 0.0}
+
+
+def test_empty_sheet_gives_none():
+    assert read_accounts_from_excel(workbook({})) is None
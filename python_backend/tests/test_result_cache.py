@@ -0,0 +1,129 @@
+"""
+Result cache: keys, expiry, the disk tier, and single-flight computations
+that only stop once every waiter has gone and release what they were handed.
+
+Run from python_backend:  python -m pytest tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from result_cache import ResultCache, cache_key
+
+
+def test_cache_key_separates_request_parts():
+    assert cache_key("abc", "2", "3", 1) == "abc-2-3-1"
+    assert cache_key("abc", "2", "3", 1) != cache_key("abc", "2", "3", 2)
+
+
+def test_memory_tier_expires_and_evicts(monkeypatch):
+    cache = ResultCache(max_entries=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # "b" was the least recently used
+    assert (cache.get("a"), cache.get("b"), cache.get("c")) == (1, None, 3)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get("a") is None
+
+
+def test_disk_tier_is_shared_and_expires(tmp_path):
+    ResultCache(directory=str(tmp_path)).write_disk("k", {"v": 1})
+    assert ResultCache(directory=str(tmp_path)).read_disk("k") == {"v": 1}
+    expired = ResultCache(ttl=10, directory=str(tmp_path))
+    os.utime(tmp_path / "k.pickle", (time.time() - 60, time.time() - 60))
+    assert expired.read_disk("k") is None
+    assert not (tmp_path / "k.pickle").exists()
+
+
+def test_concurrent_callers_share_one_computation():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "value"
+
+    async def main():
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+        return results, await cache.get_or_compute("k", compute)
+
+    results, again = asyncio.run(main())
+    assert results == ["value"] * 5 and again == "value"
+    assert len(calls) == 1
+    assert cache.stats == {"miss": 1, "shared": 4, "memory_hit": 1}
+
+
+def test_exceptions_reach_every_waiter_and_are_not_cached():
+    cache = ResultCache()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("bad workbook")
+
+    async def main():
+        results = await asyncio.gather(cache.get_or_compute("k", fail), cache.get_or_compute("k", fail),
+                                       return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return await cache.get_or_compute("k", lambda: asyncio.sleep(0, "fixed"))
+
+    assert asyncio.run(main()) == "fixed"
+
+
+def test_computation_outlives_a_cancelled_initiator():
+    cache = ResultCache()
+    released = []
+
+    def hand_off():
+        return lambda: released.append("closed")
+
+    async def compute():
+        # The upload must still be open while the shared computation runs
+        await asyncio.sleep(0.05)
+        assert not released
+        return "value"
+
+    async def main():
+        first = asyncio.ensure_future(cache.get_or_compute("k", compute, hand_off))
+        second = asyncio.ensure_future(cache.get_or_compute("k", compute, hand_off))
+        # Cancelled before the shared computation has even started
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "value"
+    assert released == ["closed"]
+
+
+def test_last_waiter_leaving_cancels_and_releases():
+    cache = ResultCache()
+    released = []
+    started = []
+
+    async def compute():
+        started.append(1)
+        await asyncio.sleep(10)
+
+    async def main():
+        task = asyncio.ensure_future(cache.get_or_compute("k", compute, lambda: lambda: released.append(1)))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+    # Cancelled before it ran, and still released
+    assert not started
+    assert released == [1]
+    assert not cache._inflight
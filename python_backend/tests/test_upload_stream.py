@@ -0,0 +1,134 @@
+"""
+The streaming multipart parser: form fields, the signature check, the size
+limit, spooling past spool_size, and the 422 the API answers for a request
+without a file part or with a malformed form value.
+
+Run from python_backend:  python -m pytest tests
+"""
+import asyncio
+import hashlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from upload_stream import (
+    InvalidUploadError, MissingUploadError, UploadTooLargeError, receive_upload
+)
+
+BOUNDARY = "testboundary"
+XLSX_HEAD = b"PK\x03\x04"
+
+
+class StreamedRequest:
+    """Just what receive_upload uses of a Starlette request"""
+
+    def __init__(self, body, content_type=f"multipart/form-data; boundary={BOUNDARY}", chunk_size=7):
+        self.headers = {"content-type": content_type, "content-length": str(len(body))}
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self._body), self._chunk_size):
+            yield self._body[start:start + self._chunk_size]
+
+
+def multipart(fields, file_content=None, filename="march.xlsx"):
+    parts = [
+        f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode()
+        for name, value in fields.items()
+    ]
+    if file_content is not None:
+        parts.append(
+            f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+            f'Content-Type: application/octet-stream\r\n\r\n'.encode() + file_content + b"\r\n"
+        )
+    return b"".join(parts) + f"--{BOUNDARY}--\r\n".encode()
+
+
+def receive(body, **options):
+    return asyncio.run(receive_upload(StreamedRequest(body), **options))
+
+
+def test_fields_file_and_hash():
+    content = XLSX_HEAD + b"rest of the workbook" * 10
+    upload = receive(multipart({"month": "3", "sheet_number": "2"}, content))
+    try:
+        assert upload.fields == {"month": "3", "sheet_number": "2"}
+        assert (upload.filename, upload.size, upload.path) == ("march.xlsx", len(content), None)
+        assert upload.source() == content
+        assert upload.sha256 == hashlib.sha256(content).hexdigest()
+    finally:
+        upload.close()
+
+
+def test_large_upload_is_spooled_to_disk():
+    content = XLSX_HEAD + os.urandom(5000)
+    upload = receive(multipart({"month": "3"}, content), spool_size=1024)
+    path = upload.source()
+    try:
+        assert path == upload.path and os.path.exists(path)
+        with open(path, "rb") as f:
+            assert f.read() == content
+    finally:
+        upload.close()
+    assert not os.path.exists(path)
+
+
+def test_signature_is_checked_before_the_rest_is_read():
+    with pytest.raises(InvalidUploadError, match="Excel"):
+        receive(multipart({}, b"hello world" * 100))
+    # An empty file is left to the caller to report
+    upload = receive(multipart({}, b""))
+    assert upload.size == 0
+    upload.close()
+
+
+def test_size_limit():
+    with pytest.raises(UploadTooLargeError):
+        receive(multipart({}, XLSX_HEAD + b"x" * 5000), max_size=1000)
+
+
+def test_missing_file_part():
+    with pytest.raises(MissingUploadError):
+        receive(multipart({"month": "3"}))
+    with pytest.raises(MissingUploadError):
+        asyncio.run(receive_upload(StreamedRequest(b"{}", content_type="application/json")))
+
+
+@pytest.fixture(scope="module")
+def client():
+    pytest.importorskip("httpx")
+    os.environ.setdefault("EXCEL_WORKERS", "0")
+    os.environ.setdefault("RESULT_CACHE_DIR", "")
+    from fastapi.testclient import TestClient
+
+    import Api_for_excels
+    with TestClient(Api_for_excels.app) as test_client:
+        yield test_client
+
+
+def test_api_answers_a_missing_file_like_fastapi(client):
+    for response in (client.post("/process-excel/", data={"month": "3"}),
+                     client.post("/process-workbook/", json={})):
+        assert response.status_code == 422
+        assert response.json() == {
+            "detail": [{"type": "missing", "loc": ["body", "file"], "msg": "Field required", "input": None}]
+        }
+
+
+def test_api_answers_a_malformed_form_value_like_fastapi(client):
+    response = client.post("/process-excel/", files={"file": ("march.xlsx", XLSX_HEAD)},
+                           data={"month": "3", "sheet_number": "x"})
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", "sheet_number"]
+    assert response.json()["detail"][0]["type"] == "int_parsing"
+
+
+def test_api_documents_the_form(client):
+    schema = client.get("/openapi.json").json()["paths"]["/process-excel/"]["post"]["requestBody"]
+    form = schema["content"]["multipart/form-data"]["schema"]
+    assert form["required"] == ["file"]
+    assert {"file", "sheet_number", "month", "include_payload", "row_layout"} <= set(form["properties"])
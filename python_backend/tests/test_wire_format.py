@@ -0,0 +1,94 @@
+"""
+Wire format: content negotiation from Accept / Accept-Encoding (q=0 refuses),
+gzip only when worth it, and compact payloads that refer to names by ID.
+
+Run from python_backend:  python -m pytest tests
+"""
+import gzip
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wire_format
+from wire_format import (
+    GZIP_MIN_BYTES, NAMES, NAMES_VERSION, WIRE_VERSION, compact_payload, encode, wants_gzip, wants_msgpack
+)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("gzip", True),
+    ("deflate, GZIP;q=0.5", True),
+    ("x-gzip", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *", False),
+    ("*", True),
+    ("*;q=0", False),
+    ("br, identity", False),
+    ("gzip;q=abc", False),
+])
+def test_wants_gzip(header, expected):
+    assert wants_gzip(header) is expected
+
+
+def test_wants_msgpack(monkeypatch):
+    pytest.importorskip("msgpack")
+    assert wants_msgpack("application/msgpack")
+    assert wants_msgpack("application/json;q=0.9, application/x-msgpack")
+    assert not wants_msgpack("application/msgpack;q=0")
+    assert not wants_msgpack("application/json, */*")
+    assert not wants_msgpack(None)
+    monkeypatch.setattr(wire_format, "msgpack", None)
+    assert not wants_msgpack("application/msgpack")
+
+
+def test_encode_gzips_only_large_bodies():
+    small, headers = encode({"a": 1}, accept_encoding="gzip")
+    assert json.loads(small) == {"a": 1} and "Content-Encoding" not in headers
+    big_object = {"rows": ["x" * 10] * GZIP_MIN_BYTES}
+    body, headers = encode(big_object, accept_encoding="gzip")
+    assert headers["Content-Encoding"] == "gzip" and headers["Content-Type"] == "application/json"
+    assert json.loads(gzip.decompress(body)) == big_object
+    assert "Content-Encoding" not in encode(big_object, accept_encoding="gzip;q=0")[1]
+
+
+def test_encode_msgpack():
+    msgpack = pytest.importorskip("msgpack")
+    body, headers = encode({"a": [1, 2]}, accept="application/msgpack")
+    assert headers["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(body) == {"a": [1, 2]}
+
+
+def test_compact_sheet_1_payload():
+    type_id = next(iter(NAMES["types"]))
+    payload = {
+        "file_name": "march.xlsx", "month": "3", "sheet_number_processed": 1,
+        "processed_data": {
+            "chapters": [{"id": "1_1", "name": "ignored", "value": "12.0"}],
+            "types": [{"id": type_id, "name": "ignored", "value": "12.5"}],
+            "hierarchical_rows": [{"type_id": type_id, "value": "12.5"}],
+        },
+    }
+    compact = compact_payload(payload)
+    assert (compact["wire_version"], compact["names_version"]) == (WIRE_VERSION, NAMES_VERSION)
+    assert compact["file_name"] == "march.xlsx"
+    assert compact["processed_data"] == {"chapters": {"1_1": 12}, "sections": {}, "items": {}, "types": {type_id: 12.5}}
+    assert "names" not in compact
+    assert compact_payload(payload, inline_names=True)["names"] is NAMES
+    assert NAMES["paths"][type_id] == list(wire_format.TYPE_ANCESTORS[type_id])
+
+
+def test_compact_sheet_2_payload_leaves_zero_accounts_out():
+    payload = {"sheet_number_processed": 2, "processed_data": {
+        "الحسابات الرئيسية": {
+            "الموارد": {"debit": 100.0, "credit": 2.5},
+            "الاستخدامات": {"debit": 0.0, "credit": 0.0},
+        },
+    }}
+    assert compact_payload(payload)["processed_data"] == {"accounts": {"1": [100, 2.5]}}
+    assert NAMES["accounts"]["1"] == ["الحسابات الرئيسية", "الموارد"]
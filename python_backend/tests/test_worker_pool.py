@@ -0,0 +1,69 @@
+"""
+A job that times out, is cancelled or kills its worker must only cost that
+one worker: a fresh process takes its place and the pool keeps serving.
+
+Run from python_backend:  python -m pytest tests
+"""
+import asyncio
+import operator
+import os
+import sys
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from worker_pool import JobTimeoutError, WorkerCrashedError, WorkerPool
+
+
+def with_pool(size, scenario):
+    async def main():
+        pool = WorkerPool(size)
+        pool.start()
+        try:
+            return await scenario(pool)
+        finally:
+            pool.shutdown()
+    return asyncio.run(main())
+
+
+def test_timed_out_worker_is_replaced():
+    async def scenario(pool):
+        first = await pool.run(os.getpid)
+        with pytest.raises(JobTimeoutError):
+            await pool.run(time.sleep, 30, timeout=0.5)
+        assert len(pool._workers) == 1
+        assert await pool.run(os.getpid) != first
+        assert await pool.run(operator.add, 2, 3) == 5
+    with_pool(1, scenario)
+
+
+def test_crashed_worker_is_replaced():
+    async def scenario(pool):
+        with pytest.raises(WorkerCrashedError):
+            await pool.run(os._exit, 1)
+        assert await pool.run(operator.add, 2, 3) == 5
+    with_pool(1, scenario)
+
+
+def test_cancelled_job_frees_its_worker():
+    async def scenario(pool):
+        first = await pool.run(os.getpid)
+        task = asyncio.ensure_future(pool.run(time.sleep, 30))
+        await asyncio.sleep(0.5)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert pool.busy == 0
+        assert await pool.run(os.getpid) != first
+    with_pool(1, scenario)
+
+
+def test_job_exceptions_reach_the_caller():
+    async def scenario(pool):
+        with pytest.raises(ValueError):
+            await pool.run(int, "x")
+        return await pool.run(operator.mul, 6, 7)
+    assert with_pool(1, scenario) == 42
+    assert with_pool(0, scenario) == 42
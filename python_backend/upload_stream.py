@@ -0,0 +1,199 @@
+import hashlib
+import io
+import os
+import tempfile
+
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Leading bytes of the accepted workbook formats
+EXCEL_SIGNATURES = (
+    b"PK\x03\x04",                          # .xlsx (zip)
+    b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1",    # .xls (OLE2 compound file)
+)
+# Form fields are tiny; anything bigger is not a form we sent
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """The upload exceeds the configured maximum size"""
+
+
+class InvalidUploadError(Exception):
+    """The request body is not a multipart upload of an Excel workbook"""
+
+
+class MissingUploadError(InvalidUploadError):
+    """The request body holds no file part"""
+
+
+class StreamedUpload:
+    """
+    One file part of a multipart request, received chunk by chunk.
+
+    The content is hashed while it arrives and kept in memory up to
+    spool_size bytes; past that it moves to a uniquely named temporary file,
+    so memory per upload stays bounded. source() is what the workers get:
+    the bytes when small, the temporary file's path otherwise.
+    """
+
+    def __init__(self, spool_size):
+        self.filename = None
+        self.content_type = None
+        self.size = 0
+        self.fields = {}
+        self._spool_size = spool_size
+        self._hash = hashlib.sha256()
+        self._buffer = io.BytesIO()
+        self._file = None
+        self.path = None
+        # Set when a shared computation that may outlive the request takes over close()
+        self.handed_off = False
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def write(self, data):
+        self._hash.update(data)
+        self.size += len(data)
+        if self._file is None and self.size > self._spool_size:
+            fd, self.path = tempfile.mkstemp(prefix="upload-", suffix=os.path.splitext(self.filename or "")[1])
+            self._file = os.fdopen(fd, "wb")
+            self._file.write(self._buffer.getvalue())
+            self._buffer = None
+        if self._file is not None:
+            self._file.write(data)
+        else:
+            self._buffer.write(data)
+
+    def head(self, count):
+        """First count bytes received so far"""
+        if self._buffer is not None:
+            return self._buffer.getvalue()[:count]
+        self._file.flush()
+        with open(self.path, "rb") as f:
+            return f.read(count)
+
+    def finish(self):
+        if self._file is not None:
+            self._file.close()
+
+    def source(self):
+        return self.path if self.path else self._buffer.getvalue()
+
+    def close(self):
+        if self._file is not None and not self._file.closed:
+            self._file.close()
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self._buffer = None
+
+
+async def receive_upload(request, file_field="file", max_size=50 * 1024 * 1024,
+                         spool_size=1024 * 1024, signatures=EXCEL_SIGNATURES):
+    """
+    Parse a multipart/form-data request body as it streams in.
+
+    Returns a StreamedUpload holding the file part plus the other form fields
+    (as str). Raises UploadTooLargeError as soon as the declared or received
+    size passes max_size, InvalidUploadError once the first bytes of the
+    file do not match any of signatures, without reading the rest, and
+    MissingUploadError when the body is no multipart form or has no file part.
+    Chunks that go to the spool file are parsed in a worker thread, so disk
+    writes never block the event loop.
+    The caller must close() the returned upload.
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise MissingUploadError("Expected a multipart/form-data upload")
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > max_size + MAX_FIELD_SIZE:
+        raise UploadTooLargeError(f"Upload is larger than {max_size} bytes")
+
+    upload = StreamedUpload(spool_size)
+    state = {"header_field": b"", "header_value": b"", "headers": {}, "name": None, "is_file": False,
+             "value": b"", "checked": False}
+    signature_length = max(len(signature) for signature in signatures) if signatures else 0
+
+    def check_signature():
+        state["checked"] = True
+        head = upload.head(signature_length)
+        if not any(head.startswith(signature) for signature in signatures):
+            raise InvalidUploadError("File does not look like an Excel workbook")
+
+    def on_part_begin():
+        state["headers"] = {}
+        state["value"] = b""
+
+    def on_header_field(data, start, end):
+        state["header_field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        state["header_value"] += data[start:end]
+
+    def on_header_end():
+        state["headers"][state["header_field"].lower()] = state["header_value"]
+        state["header_field"] = b""
+        state["header_value"] = b""
+
+    def on_headers_finished():
+        _, options = parse_options_header(state["headers"].get(b"content-disposition", b""))
+        state["name"] = options.get(b"name", b"").decode("utf-8")
+        state["is_file"] = state["name"] == file_field and b"filename" in options
+        if state["is_file"]:
+            upload.filename = options[b"filename"].decode("utf-8")
+            upload.content_type = state["headers"].get(b"content-type", b"").decode("latin-1")
+
+    def on_part_data(data, start, end):
+        chunk = data[start:end]
+        if not state["is_file"]:
+            state["value"] += chunk
+            if len(state["value"]) > MAX_FIELD_SIZE:
+                raise InvalidUploadError(f"Form field {state['name']} is too large")
+            return
+        upload.write(chunk)
+        if upload.size > max_size:
+            raise UploadTooLargeError(f"Upload is larger than {max_size} bytes")
+        if signatures and not state["checked"] and upload.size >= signature_length:
+            check_signature()
+
+    def on_part_end():
+        if state["is_file"]:
+            # An empty file is reported by the caller, not as a bad signature
+            if signatures and not state["checked"] and upload.size:
+                check_signature()
+        elif state["name"]:
+            upload.fields[state["name"]] = state["value"].decode("utf-8")
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+    try:
+        async for chunk in request.stream():
+            if upload.path is None and upload.size + len(chunk) <= spool_size:
+                parser.write(chunk)
+            else:
+                # May spool the upload and write to the spool file
+                await run_in_threadpool(parser.write, chunk)
+        parser.finalize()
+        if upload.path is not None:
+            await run_in_threadpool(upload.finish)
+    except Exception:
+        upload.close()
+        raise
+    if upload.filename is None:
+        upload.close()
+        raise MissingUploadError(f"No file part named {file_field}")
+    return upload
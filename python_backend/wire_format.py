@@ -0,0 +1,164 @@
+import gzip
+import hashlib
+import json
+
+from dic_of_accounts import financial_accounts
+from dics_of_ExcelCells import HIERARCHY_TEMPLATE, TYPE_ANCESTORS
+
+try:
+    import orjson
+except ImportError:  # optional, the standard json module is used instead
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional, MessagePack is then never negotiated
+    msgpack = None
+
+# Version of the compact payload layout; bump when its shape changes
+WIRE_VERSION = 1
+
+JSON_TYPE = "application/json"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+# Bodies smaller than this are sent as they are even when gzip is accepted
+GZIP_MIN_BYTES = 1024
+
+
+def _names():
+    """Everything a compact payload refers to by ID: names of every level, type paths and account names"""
+    return {
+        "chapters": {node_id: node["name"] for node_id, node in HIERARCHY_TEMPLATE.chapters.items()},
+        "sections": {node_id: node["name"] for node_id, node in HIERARCHY_TEMPLATE.sections.items()},
+        "items": {node_id: node["name"] for node_id, node in HIERARCHY_TEMPLATE.items.items()},
+        "types": {node_id: node["name"] for node_id, node in HIERARCHY_TEMPLATE.types.items()},
+        # type_id -> [chapter_id, section_id, item_id], the ancestors of a hierarchical row
+        "paths": {type_id: list(path) for type_id, path in TYPE_ANCESTORS.items()},
+        # account id -> [main_category, sub_category]
+        "accounts": {
+            str(accounts["id"]): [main_category, sub_category]
+            for main_category, sub_categories in financial_accounts.items()
+            for sub_category, accounts in sub_categories.items()
+        },
+    }
+
+
+NAMES = _names()
+# Changes whenever a name or link changes, so receivers can cache the dictionary by it
+NAMES_VERSION = hashlib.sha256(json.dumps(NAMES, sort_keys=True).encode()).hexdigest()[:12]
+
+_ACCOUNT_IDS = {
+    (main_category, sub_category): str(accounts["id"])
+    for main_category, sub_categories in financial_accounts.items()
+    for sub_category, accounts in sub_categories.items()
+}
+
+
+def name_dictionary():
+    return {"names_version": NAMES_VERSION, **NAMES}
+
+
+def _number(value):
+    """A numeric cell or total as a number, whole numbers without the .0"""
+    number = float(value) if value not in (None, "") else 0.0
+    return int(number) if number.is_integer() else number
+
+
+def compact_processed_data(sheet_number, processed_data):
+    """
+    processed_data with every name replaced by its ID and every value by a number.
+    Sheet 1: {"chapters"|"sections"|"items"|"types": {id: value}}; the
+    hierarchical rows are the "types" entries with their NAMES["paths"].
+    Sheet 2: {"accounts": {id: [debit, credit]}}; accounts left out are 0.
+    """
+    if processed_data is None:
+        return None
+    if sheet_number == 1:
+        compact = {
+            level: {node["id"]: _number(node["value"]) for node in processed_data.get(level, [])}
+            for level in ("chapters", "sections", "items", "types")
+        }
+        if processed_data.get("error"):
+            compact["error"] = processed_data["error"]
+        return compact
+    accounts = {}
+    for main_category, sub_categories in processed_data.items():
+        for sub_category, entry in sub_categories.items():
+            if entry["debit"] or entry["credit"]:
+                accounts[_ACCOUNT_IDS[(main_category, sub_category)]] = [
+                    _number(entry["debit"]), _number(entry["credit"])
+                ]
+    return {"accounts": accounts}
+
+
+def compact_payload(payload, inline_names=False):
+    """
+    The compact, versioned form of a payload built for Next.js. The name
+    dictionary is referenced by NAMES_VERSION (GET /wire/names serves it)
+    unless inline_names is set.
+    """
+    compact = {
+        "wire_version": WIRE_VERSION,
+        "names_version": NAMES_VERSION,
+        **{key: value for key, value in payload.items() if key != "processed_data"},
+        "processed_data": compact_processed_data(payload["sheet_number_processed"], payload["processed_data"]),
+    }
+    if inline_names:
+        compact["names"] = NAMES
+    return compact
+
+
+def dumps(obj):
+    """UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def parse_accept(header):
+    """{token: q} of a comma-separated Accept / Accept-Encoding header, tokens lowercased"""
+    accepted = {}
+    for part in (header or "").split(","):
+        token, *params = [piece.strip() for piece in part.split(";")]
+        if not token:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[token.lower()] = q
+    return accepted
+
+
+def wants_msgpack(accept):
+    if msgpack is None:
+        return False
+    accepted = parse_accept(accept)
+    return any(accepted.get(media_type, 0) > 0 for media_type in MSGPACK_TYPES)
+
+
+def wants_gzip(accept_encoding):
+    accepted = parse_accept(accept_encoding)
+    for coding in ("gzip", "x-gzip"):
+        if coding in accepted:
+            return accepted[coding] > 0
+    return accepted.get("*", 0) > 0
+
+
+def encode(obj, accept=None, accept_encoding=None):
+    """
+    Serialize obj for a client's Accept / Accept-Encoding headers.
+    Returns (body, headers): MessagePack or JSON, gzipped when accepted and worth it.
+    """
+    if wants_msgpack(accept):
+        body, media_type = msgpack.packb(obj, use_bin_type=True), MSGPACK_TYPES[0]
+    else:
+        body, media_type = dumps(obj), JSON_TYPE
+    headers = {"Content-Type": media_type, "Vary": "Accept, Accept-Encoding"}
+    if wants_gzip(accept_encoding) and len(body) >= GZIP_MIN_BYTES:
+        body = gzip.compress(body, compresslevel=5)
+        headers["Content-Encoding"] = "gzip"
+    return body, headers
@@ -0,0 +1,104 @@
+import io
+import os
+
+import pandas as pd
+
+from excel_readers import ExcelReader, reader_for
+
+
+class WorkbookSession:
+    """
+    Holds one loaded workbook for the lifetime of a request so that every
+    extractor (validation, directorate name, sheet values, column names)
+    reads from the same parsed zip/XML instead of reopening the file.
+    """
+
+    def __init__(self, source, reader=None):
+        """
+        reader: an ExcelReader, a reader name or None for the configured one;
+        it is matched to the file's format either way.
+        """
+        if not isinstance(reader, ExcelReader):
+            from preflight import sniff_format
+            reader = reader_for(sniff_format(source), reader)
+        self.source = source
+        self.reader = reader
+        self.engine = reader.engine
+        # pd.ExcelFile opens the archive and the workbook part exactly once;
+        # the reader streams cells from the same book
+        self.excel_file = pd.ExcelFile(as_file(source), engine=self.engine)
+        self._frames = {}
+
+    @property
+    def sheet_names(self):
+        return self.excel_file.sheet_names
+
+    @property
+    def book(self):
+        """The underlying workbook of the reader's library"""
+        return self.excel_file.book
+
+    def read_sheet(self, sheet_name, header=0, dtype=None, keep_default_na=True):
+        """Parse a sheet once per option set and serve later calls from memory"""
+        key = (sheet_name, header, dtype, keep_default_na)
+        if key not in self._frames:
+            self._frames[key] = self.excel_file.parse(
+                sheet_name,
+                header=header,
+                dtype=dtype,
+                keep_default_na=keep_default_na
+            )
+        return self._frames[key]
+
+    def close(self):
+        self._frames.clear()
+        self.excel_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+
+def is_path(source):
+    """True for a filesystem path, False for bytes, file-like objects and sessions"""
+    return isinstance(source, (str, os.PathLike))
+
+
+def as_file(source):
+    """
+    Readable form of an upload: bytes are wrapped in a BytesIO, file-like
+    objects are rewound because several extractors read the same buffer.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return io.BytesIO(source)
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+def read_sheet(source, sheet_name, header=0, dtype=None, keep_default_na=True, engine=None):
+    """
+    Read a sheet either from an open WorkbookSession or, for callers that pass
+    a path, bytes or a file-like object, directly with pandas.
+    engine defaults to the configured reader's for the file's format.
+    """
+    if isinstance(source, WorkbookSession):
+        return source.read_sheet(
+            sheet_name,
+            header=header,
+            dtype=dtype,
+            keep_default_na=keep_default_na
+        )
+    if engine is None:
+        from preflight import sniff_format
+        engine = reader_for(sniff_format(source)).engine
+    return pd.read_excel(
+        as_file(source),
+        engine=engine,
+        sheet_name=sheet_name,
+        header=header,
+        dtype=dtype,
+        keep_default_na=keep_default_na
+    )
@@ -0,0 +1,198 @@
+import asyncio
+import importlib
+import logging
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from log_setup import setup_logging
+
+logger = logging.getLogger(__name__)
+
+class JobTimeoutError(Exception):
+    """A job ran longer than its timeout and its worker was restarted"""
+
+
+class WorkerCrashedError(Exception):
+    """The worker process died while running a job"""
+
+
+def _warm_up():
+    """Import the heavy libraries once so the first job does not pay for them"""
+    import pandas  # noqa: F401
+    import openpyxl  # noqa: F401
+    import excel_pipeline  # noqa: F401
+    from excel_readers import reader_for
+    importlib.import_module(reader_for("xlsx").module)
+
+
+def _worker_main(conn):
+    # Spawned processes start without the API's logging configuration
+    setup_logging()
+    _warm_up()
+    # Stage timings go back to the API process with each reply
+    metrics.collect_stages()
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        func, args = message
+        try:
+            reply = (True, func(*args), metrics.drain_stages())
+        except BaseException as e:
+            logger.exception("Job %s failed", getattr(func, "__name__", func))
+            reply = (False, e, metrics.drain_stages())
+        try:
+            conn.send(reply)
+        except Exception as send_error:
+            # Result or exception could not be pickled
+            conn.send((False, RuntimeError(f"{type(send_error).__name__}: {send_error}"), reply[2]))
+    conn.close()
+
+
+def _call(conn, message):
+    conn.send(message)
+    return conn.recv()
+
+
+class _Worker:
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        if self.process.is_alive():
+            self.process.terminate()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        self.process.join(timeout=5)
+        self.kill()
+
+
+class WorkerPool:
+    """
+    A fixed set of warm worker processes for CPU-bound workbook parsing.
+    size 0 runs jobs in a thread of the calling process instead.
+
+    Each process owns its own pipe, so a job that times out or whose client
+    went away can be stopped by killing just that process; a fresh worker
+    takes its place and the other jobs keep running.
+    """
+
+    def __init__(self, size, timeout=None):
+        self.size = size
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = None
+        self._workers = []
+        self._waiting = 0
+        self._threads = None
+
+    @property
+    def queue_depth(self):
+        """Jobs waiting for a free worker"""
+        return self._waiting
+
+    @property
+    def busy(self):
+        """Workers currently running a job"""
+        return len(self._workers) - self._idle.qsize() if self._idle is not None else 0
+
+    def start(self):
+        self._idle = asyncio.Queue()
+        # One thread per worker blocks on that worker's pipe
+        if self.size:
+            self._threads = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix="excel-pool")
+        for _ in range(self.size):
+            self._add_worker()
+
+    def _add_worker(self):
+        worker = _Worker(self._context)
+        self._workers.append(worker)
+        self._idle.put_nowait(worker)
+
+    async def _replace(self, worker):
+        self._workers.remove(worker)
+        await asyncio.get_running_loop().run_in_executor(None, worker.kill)
+        self._add_worker()
+
+    async def run(self, func, *args, timeout=None):
+        """
+        Run func(*args) in a worker process and return its result.
+        Raises JobTimeoutError after timeout seconds (None: the pool default,
+        which may itself be None for no limit).
+        """
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        if self.size == 0:
+            return await asyncio.wait_for(loop.run_in_executor(None, func, *args), timeout)
+
+        self._waiting += 1
+        try:
+            with metrics.stage("worker_queue"):
+                worker = await self._idle.get()
+        finally:
+            self._waiting -= 1
+
+        try:
+            ok, value, stages = await asyncio.wait_for(
+                loop.run_in_executor(self._threads, _call, worker.conn, (func, args)),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            await self._replace(worker)
+            raise JobTimeoutError(f"Job did not finish within {timeout} seconds")
+        except asyncio.CancelledError:
+            # Client went away: free the CPU instead of finishing unwanted work
+            await asyncio.shield(self._replace(worker))
+            raise
+        except (EOFError, OSError) as e:
+            await self._replace(worker)
+            raise WorkerCrashedError(f"Worker process exited unexpectedly: {e}")
+
+        self._idle.put_nowait(worker)
+        metrics.observe_stages(stages)
+        if not ok:
+            raise value
+        return value
+
+    def shutdown(self):
+        for worker in self._workers:
+            worker.stop()
+        self._workers = []
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_while_connected(request, coro, poll_interval=0.5):
+    """
+    Await coro, cancelling it as soon as the HTTP client disconnects.
+    Returns the coroutine's result; raises asyncio.CancelledError on disconnect.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=poll_interval)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+                raise asyncio.CancelledError("Client disconnected")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
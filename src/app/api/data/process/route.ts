@@ -1,240 +1,357 @@
 import { NextResponse } from 'next/server';
 import { PrismaClient } from '@prisma/client';
+import { gunzipSync } from 'zlib';
 
 const prisma = new PrismaClient();
 
+// Serves the name dictionary compact payloads refer to (GET /wire/names)
+const PYTHON_API_URL = process.env.PYTHON_API_URL || 'http://localhost:8000';
+// Name dictionaries already fetched, by names_version
+const nameDictionaries = new Map<string, any>();
+
 export async function POST(request: Request) {
   try {
     const userId = 1; // Placeholder for demonstration. Replace with actual authenticated user ID.
 
-    const data = await request.json();
-    console.log('Received data from frontend:', JSON.stringify(data, null, 2));
-
-    // اطبع قائمة النماذج المتاحة في Prisma transaction
-    console.log('DEBUG: قبل بدء الترانزاكشن، قائمة النماذج المتاحة في Prisma Client:', Object.keys(prisma));
-
-    const {
-      file_name,
-      month,
-      year,
-      directorate_name,
-      office_name,
-      sheet_number_processed,
-      processed_data,
-      hierarchical_rows
-    } = data;
-
-    await prisma.$transaction(async (tx) => {
-      // اطبع قائمة النماذج المتاحة في transaction
-      console.log('DEBUG: قائمة النماذج المتاحة في tx:', Object.keys(tx));
-      // 1. Find or Create Directorate
-      let directorate = null;
-      if (directorate_name) {
-        directorate = await tx.directorate.findUnique({ where: { name: directorate_name } });
-      if (!directorate) {
-          directorate = await tx.directorate.create({ data: { name: directorate_name } });
+    const body = await readBody(request);
+
+    // The Python backend may coalesce several processed sheets into one { batch: [...] } request.
+    // Each payload keeps its own transaction and gets its own result, in order.
+    if (Array.isArray(body?.batch)) {
+      const results = [];
+      for (const data of body.batch) {
+        try {
+          await savePayload(await expandPayload(data), userId);
+          results.push({ message: 'Data processed and saved successfully' });
+        } catch (error) {
+          console.error('Error processing batched data:', error instanceof Error ? error.stack : error);
+          results.push({ error: 'Failed to process data' });
         }
       }
+      return NextResponse.json({ results });
+    }
 
-      // 2. Find or Create Office (if office_name provided)
-      let office = null;
-      if (office_name && directorate) {
-        office = await tx.office.findFirst({ where: { name: office_name, directorate_id: directorate.directorate_id } });
-      if (!office) {
-          office = await tx.office.create({ data: { name: office_name, directorate_id: directorate.directorate_id } });
-        }
+    await savePayload(await expandPayload(body), userId);
+
+    return NextResponse.json({ message: 'Data processed and saved successfully' });
+  } catch (error) {
+    console.error('Error processing data:', error instanceof Error ? error.stack : error);
+    return NextResponse.json({ error: 'Failed to process data' }, { status: 500 });
+  } finally {
+    await prisma.$disconnect();
+  }
+}
+
+// The Python backend gzips its POSTs when NEXTJS_GZIP is set
+async function readBody(request: Request) {
+  if (request.headers.get('content-encoding') === 'gzip') {
+    const raw = gunzipSync(Buffer.from(await request.arrayBuffer()));
+    return JSON.parse(raw.toString('utf-8'));
+  }
+  return request.json();
+}
+
+async function namesFor(data: any) {
+  if (data.names) return data.names;
+  let names = nameDictionaries.get(data.names_version);
+  if (!names) {
+    const response = await fetch(`${PYTHON_API_URL}/wire/names`);
+    if (!response.ok) {
+      throw new Error(`Could not load the name dictionary (status ${response.status})`);
+    }
+    names = await response.json();
+    nameDictionaries.set(names.names_version, names);
+    if (names.names_version !== data.names_version) {
+      throw new Error(`Name dictionary ${data.names_version} is not available`);
+    }
+  }
+  return names;
+}
+
+// Rebuild the full payload layout from a compact one (NEXTJS_PAYLOAD_FORMAT=compact, see python_backend/wire_format.py)
+async function expandPayload(data: any) {
+  if (!data?.wire_version) return data;
+  const names = await namesFor(data);
+  const { processed_data, ...rest } = data;
+  delete rest.wire_version;
+  delete rest.names_version;
+  delete rest.names;
+
+  let expanded: any = processed_data;
+  if (processed_data && data.sheet_number_processed === 1) {
+    const level = (key: string) =>
+      Object.entries(processed_data[key] || {}).map(([id, value]) => ({
+        id,
+        name: names[key][id] ?? id,
+        value: String(value),
+      }));
+    expanded = {
+      chapters: level('chapters'),
+      sections: level('sections'),
+      items: level('items'),
+      types: level('types'),
+      hierarchical_rows: Object.entries(processed_data.types || {}).map(([type_id, value]) => {
+        const [chapter_id, section_id, item_id] = names.paths[type_id] || ['', '', ''];
+        return { chapter_id, section_id, item_id, type_id, name: names.types[type_id] ?? type_id, value: String(value) };
+      }),
+    };
+  } else if (processed_data && data.sheet_number_processed === 2) {
+    // Accounts missing from a compact payload are zero
+    expanded = {};
+    for (const [id, [mainCategory, subCategory]] of Object.entries(names.accounts) as [string, [string, string]][]) {
+      const [debit, credit] = processed_data.accounts[id] || [0, 0];
+      expanded[mainCategory] = expanded[mainCategory] || {};
+      expanded[mainCategory][subCategory] = { debit, credit };
+    }
+  }
+  return { ...rest, processed_data: expanded };
+}
+
+async function savePayload(data: any, userId: number) {
+  console.log('Received data from frontend:', JSON.stringify(data, null, 2));
+
+  // اطبع قائمة النماذج المتاحة في Prisma transaction
+  console.log('DEBUG: قبل بدء الترانزاكشن، قائمة النماذج المتاحة في Prisma Client:', Object.keys(prisma));
+
+  const {
+    file_name,
+    month,
+    year,
+    directorate_name,
+    office_name,
+    sheet_number_processed,
+    processed_data,
+    hierarchical_rows
+  } = data;
+
+  await prisma.$transaction(async (tx) => {
+    // اطبع قائمة النماذج المتاحة في transaction
+    console.log('DEBUG: قائمة النماذج المتاحة في tx:', Object.keys(tx));
+    // 1. Find or Create Directorate
+    let directorate = null;
+    if (directorate_name) {
+      directorate = await tx.directorate.findUnique({ where: { name: directorate_name } });
+    if (!directorate) {
+        directorate = await tx.directorate.create({ data: { name: directorate_name } });
+      }
+    }
+
+    // 2. Find or Create Office (if office_name provided)
+    let office = null;
+    if (office_name && directorate) {
+      office = await tx.office.findFirst({ where: { name: office_name, directorate_id: directorate.directorate_id } });
+    if (!office) {
+        office = await tx.office.create({ data: { name: office_name, directorate_id: directorate.directorate_id } });
       }
+    }
 
-      // 3. إذا كانت الصفحة الأولى، عالج فقط hierarchical_rows
-      if (sheet_number_processed === 1) {
-        if (!Array.isArray(hierarchical_rows) || hierarchical_rows.length === 0) {
-          throw new Error('لم يتم العثور على بيانات هرمية صالحة للترحيل.');
+    // Bulk-insert layout (row_layout=columnar): each chapter/section/item/type is
+    // upserted once and all facts are inserted in a single statement
+    const columns = processed_data?.hierarchical_columns;
+    if (sheet_number_processed === 1 && columns) {
+      await tx.chapter.createMany({ data: columns.chapters, skipDuplicates: true });
+      await tx.section.createMany({ data: columns.sections, skipDuplicates: true });
+      await tx.item.createMany({ data: columns.items, skipDuplicates: true });
+      await tx.type.createMany({ data: columns.types, skipDuplicates: true });
+      const { facts } = columns;
+      const date = new Date();
+      await tx.transaction.createMany({
+        data: facts.type_id.map((type_id: string, i: number) => ({
+          office_id: office ? office.office_id : null,
+          directorate_id: directorate ? directorate.directorate_id : null,
+          type_id,
+          item_id: facts.item_id[i],
+          section_id: facts.section_id[i],
+          chapter_id: facts.chapter_id[i],
+          amount: facts.value[i],
+          date,
+        })),
+      });
+      return;
+    }
+
+    // 3. إذا كانت الصفحة الأولى، عالج فقط hierarchical_rows
+    if (sheet_number_processed === 1) {
+      if (!Array.isArray(hierarchical_rows) || hierarchical_rows.length === 0) {
+        throw new Error('لم يتم العثور على بيانات هرمية صالحة للترحيل.');
+      }
+      for (const row of hierarchical_rows) {
+        // تأكد من وجود كل المفاتيح المطلوبة
+        if (!row.chapter_id || !row.section_id || !row.item_id || !row.type_id) {
+          continue;
         }
-        for (const row of hierarchical_rows) {
-          // تأكد من وجود كل المفاتيح المطلوبة
-          if (!row.chapter_id || !row.section_id || !row.item_id || !row.type_id) {
-            continue;
+        // ابحث أو أنشئ directorate وoffice لكل صف
+        let rowDirectorate = directorate;
+        if (row.directorate_name) {
+          rowDirectorate = await tx.directorate.findUnique({ where: { name: row.directorate_name } });
+          if (!rowDirectorate) {
+            rowDirectorate = await tx.directorate.create({ data: { name: row.directorate_name } });
           }
-          // ابحث أو أنشئ directorate وoffice لكل صف
-          let rowDirectorate = directorate;
-          if (row.directorate_name) {
-            rowDirectorate = await tx.directorate.findUnique({ where: { name: row.directorate_name } });
-            if (!rowDirectorate) {
-              rowDirectorate = await tx.directorate.create({ data: { name: row.directorate_name } });
-            }
+        }
+        let rowOffice = office;
+        if (row.office_name && rowDirectorate) {
+          rowOffice = await tx.office.findFirst({ where: { name: row.office_name, directorate_id: rowDirectorate.directorate_id } });
+          if (!rowOffice) {
+            rowOffice = await tx.office.create({ data: { name: row.office_name, directorate_id: rowDirectorate.directorate_id } });
           }
-          let rowOffice = office;
-          if (row.office_name && rowDirectorate) {
-            rowOffice = await tx.office.findFirst({ where: { name: row.office_name, directorate_id: rowDirectorate.directorate_id } });
-            if (!rowOffice) {
-              rowOffice = await tx.office.create({ data: { name: row.office_name, directorate_id: rowDirectorate.directorate_id } });
-            }
+        }
+        // ابحث أو أنشئ الكيانات الهرمية
+        const findOrCreate = async (model: any, idField: string, idValue: string, data: any) => {
+          let entity = await tx[model].findUnique({ where: { [idField]: idValue } });
+          if (!entity) {
+            entity = await tx[model].create({ data });
           }
-          // ابحث أو أنشئ الكيانات الهرمية
-          const findOrCreate = async (model: any, idField: string, idValue: string, data: any) => {
-            let entity = await tx[model].findUnique({ where: { [idField]: idValue } });
-            if (!entity) {
-              entity = await tx[model].create({ data });
-            }
-            return entity;
-          };
-          await findOrCreate('chapter', 'chapter_id', row.chapter_id, { chapter_id: row.chapter_id, name: row.chapter_id });
-          await findOrCreate('section', 'section_id', row.section_id, { section_id: row.section_id, name: row.section_id, chapter_id: row.chapter_id });
-          await findOrCreate('item', 'item_id', row.item_id, { item_id: row.item_id, name: row.item_id, section_id: row.section_id });
-          await findOrCreate('type', 'type_id', row.type_id, { type_id: row.type_id, name: row.type_name || row.name, item_id: row.item_id });
-          // أنشئ الترانزاكشن
-          await tx.transaction.create({
-            data: {
-              office_id: rowOffice ? rowOffice.office_id : null,
-              directorate_id: rowDirectorate ? rowDirectorate.directorate_id : null,
-              type_id: row.type_id,
-              item_id: row.item_id,
-              section_id: row.section_id,
-              chapter_id: row.chapter_id,
-              amount: parseFloat(row.value),
-              date: row.timestamp ? new Date(row.timestamp) : new Date(),
-            },
+          return entity;
+        };
+        await findOrCreate('chapter', 'chapter_id', row.chapter_id, { chapter_id: row.chapter_id, name: row.chapter_id });
+        await findOrCreate('section', 'section_id', row.section_id, { section_id: row.section_id, name: row.section_id, chapter_id: row.chapter_id });
+        await findOrCreate('item', 'item_id', row.item_id, { item_id: row.item_id, name: row.item_id, section_id: row.section_id });
+        await findOrCreate('type', 'type_id', row.type_id, { type_id: row.type_id, name: row.type_name || row.name, item_id: row.item_id });
+        // أنشئ الترانزاكشن
+        await tx.transaction.create({
+          data: {
+            office_id: rowOffice ? rowOffice.office_id : null,
+            directorate_id: rowDirectorate ? rowDirectorate.directorate_id : null,
+            type_id: row.type_id,
+            item_id: row.item_id,
+            section_id: row.section_id,
+            chapter_id: row.chapter_id,
+            amount: parseFloat(row.value),
+            date: row.timestamp ? new Date(row.timestamp) : new Date(),
+          },
+        });
+      }
+      return;
+    }
+
+    // 2. Create ImportedFile Record
+    const importedFile = await tx.importedFile.create({
+      data: {
+        file_name: file_name,
+        original_file_name: file_name, // Assuming original_file_name is same as file_name for now
+        user_id: userId,
+        directorate_id: directorate ? directorate.directorate_id : null,
+        month: parseInt(month),
+        year: parseInt(year),
+        status: 'Processed', // Status after Python processing
+      },
+    });
+
+    // Placeholder for office_id. In a real scenario, you'd extract this from Excel
+    // or have a default/lookup mechanism.
+    const officeId = office ? office.office_id : 1; // Assuming a default office for now. Adjust as needed.
+    // Ensure the office exists or create it if necessary
+    let officeEntity = await tx.office.findUnique({ where: { office_id: officeId } });
+    if (!officeEntity) {
+      // This is a basic creation. You might need to link it to a directorate if not already.
+      officeEntity = await tx.office.create({ data: { office_id: officeId, name: 'Default Office', directorate_id: directorate ? directorate.directorate_id : null } });
+    }
+
+    // 3. Process and Insert Financial Data Entries
+    if (sheet_number_processed === 1) {
+      // Hierarchical Data (Revenue/Use types)
+      const { chapters, sections, items, types } = processed_data;
+
+      // Helper function to find or create hierarchical entities
+      const findOrCreateChapter = async (chapterId: string, name: string) => {
+        let chapter = await tx.chapter.findUnique({ where: { chapter_id: chapterId } });
+        if (!chapter) {
+          chapter = await tx.chapter.create({ data: { chapter_id: chapterId, name } });
+        }
+        return chapter;
+      };
+
+      const findOrCreateSection = async (sectionId: string, name: string, chapterId: string) => {
+        let section = await tx.section.findUnique({ where: { section_id: sectionId } });
+        if (!section) {
+          section = await tx.section.create({ 
+            data: { section_id: sectionId, name, chapter_id: chapterId } 
           });
         }
-        return;
-      }
+        return section;
+      };
 
-      // 2. Create ImportedFile Record
-      const importedFile = await tx.importedFile.create({
-        data: {
-          file_name: file_name,
-          original_file_name: file_name, // Assuming original_file_name is same as file_name for now
-          user_id: userId,
-          directorate_id: directorate ? directorate.directorate_id : null,
-          month: parseInt(month),
-          year: parseInt(year),
-          status: 'Processed', // Status after Python processing
-        },
-      });
+      const findOrCreateItem = async (itemId: string, name: string, sectionId: string) => {
+        let item = await tx.item.findUnique({ where: { item_id: itemId } });
+        if (!item) {
+          item = await tx.item.create({ 
+            data: { item_id: itemId, name, section_id: sectionId } 
+          });
+        }
+        return item;
+      };
 
-      // Placeholder for office_id. In a real scenario, you'd extract this from Excel
-      // or have a default/lookup mechanism.
-      const officeId = office ? office.office_id : 1; // Assuming a default office for now. Adjust as needed.
-      // Ensure the office exists or create it if necessary
-      let officeEntity = await tx.office.findUnique({ where: { office_id: officeId } });
-      if (!officeEntity) {
-        // This is a basic creation. You might need to link it to a directorate if not already.
-        officeEntity = await tx.office.create({ data: { office_id: officeId, name: 'Default Office', directorate_id: directorate ? directorate.directorate_id : null } });
+      const findOrCreateType = async (typeId: string, name: string, itemId: string) => {
+        let type = await tx.type.findUnique({ where: { type_id: typeId } });
+        if (!type) {
+          type = await tx.type.create({ 
+            data: { type_id: typeId, name, item_id: itemId } 
+        });
       }
+        return type;
+      };
 
-      // 3. Process and Insert Financial Data Entries
-      if (sheet_number_processed === 1) {
-        // Hierarchical Data (Revenue/Use types)
-        const { chapters, sections, items, types } = processed_data;
+      // Process Types (these are the actual financial transactions)
+      for (const typeData of types) {
+        if (parseFloat(typeData.value) > 0) {
+          // Extract hierarchy IDs from type ID
+          const typeIdParts = typeData.id.split('_');
+          const chapterId = typeIdParts[0] + '_' + typeIdParts[1];
+          const sectionId = typeIdParts[0] + '_' + typeIdParts[1] + typeIdParts[2];
+          const itemId = typeIdParts.slice(0, -1).join('_');
 
-        // Helper function to find or create hierarchical entities
-        const findOrCreateChapter = async (chapterId: string, name: string) => {
-          let chapter = await tx.chapter.findUnique({ where: { chapter_id: chapterId } });
-          if (!chapter) {
-            chapter = await tx.chapter.create({ data: { chapter_id: chapterId, name } });
-          }
-          return chapter;
-        };
+          // Ensure hierarchy exists
+          await findOrCreateChapter(chapterId, `Chapter ${chapterId}`);
+          await findOrCreateSection(sectionId, `Section ${sectionId}`, chapterId);
+          await findOrCreateItem(itemId, `Item ${itemId}`, sectionId);
+          const type = await findOrCreateType(typeData.id, typeData.name, itemId);
 
-        const findOrCreateSection = async (sectionId: string, name: string, chapterId: string) => {
-          let section = await tx.section.findUnique({ where: { section_id: sectionId } });
-          if (!section) {
-            section = await tx.section.create({ 
-              data: { section_id: sectionId, name, chapter_id: chapterId } 
-            });
-          }
-          return section;
-        };
+          // Create transaction
+          await tx.transaction.create({
+          data: {
+              office_id: officeEntity.office_id,
+              directorate_id: directorate ? directorate.directorate_id : null,
+              account_id: 1, // 1 for revenue, 2 for use (determine based on chapter prefix)
+              type_id: type.type_id,
+              item_id: itemId,
+              section_id: sectionId,
+              chapter_id: chapterId,
+              amount: parseFloat(typeData.value),
+              date: new Date(parseInt(year), parseInt(month) - 1, 1), // First day of the month
+          },
+        });
+        }
+      }
+    } else if (sheet_number_processed === 2) {
+      // Financial Accounts Data (Debit/Credit)
+      const financialAccounts = processed_data;
 
-        const findOrCreateItem = async (itemId: string, name: string, sectionId: string) => {
-          let item = await tx.item.findUnique({ where: { item_id: itemId } });
-          if (!item) {
-            item = await tx.item.create({ 
-              data: { item_id: itemId, name, section_id: sectionId } 
-            });
-          }
-          return item;
-        };
+      for (const mainCategory in financialAccounts) {
+        for (const subCategory in financialAccounts[mainCategory]) {
+          const entry = financialAccounts[mainCategory][subCategory];
+          if (!entry || !entry.id) continue; // تجاهل أي حساب بدون id
 
-        const findOrCreateType = async (typeId: string, name: string, itemId: string) => {
-          let type = await tx.type.findUnique({ where: { type_id: typeId } });
-          if (!type) {
-            type = await tx.type.create({ 
-              data: { type_id: typeId, name, item_id: itemId } 
-          });
-        }
-          return type;
-        };
+          const accna_id = entry.id;
+          const debit = entry.debit || 0;
+          const credit = entry.credit || 0;
+
+          // تجاهل الحسابات التي ليس لها أي قيمة مالية
+          if (debit === 0 && credit === 0) continue;
 
-        // Process Types (these are the actual financial transactions)
-        for (const typeData of types) {
-          if (parseFloat(typeData.value) > 0) {
-            // Extract hierarchy IDs from type ID
-            const typeIdParts = typeData.id.split('_');
-            const chapterId = typeIdParts[0] + '_' + typeIdParts[1];
-            const sectionId = typeIdParts[0] + '_' + typeIdParts[1] + typeIdParts[2];
-            const itemId = typeIdParts.slice(0, -1).join('_');
-
-            // Ensure hierarchy exists
-            await findOrCreateChapter(chapterId, `Chapter ${chapterId}`);
-            await findOrCreateSection(sectionId, `Section ${sectionId}`, chapterId);
-            await findOrCreateItem(itemId, `Item ${itemId}`, sectionId);
-            const type = await findOrCreateType(typeData.id, typeData.name, itemId);
-
-            // Create transaction
-            await tx.transaction.create({
+          await prisma.account.create({
             data: {
-                office_id: officeEntity.office_id,
-                directorate_id: directorate ? directorate.directorate_id : null,
-                account_id: 1, // 1 for revenue, 2 for use (determine based on chapter prefix)
-                type_id: type.type_id,
-                item_id: itemId,
-                section_id: sectionId,
-                chapter_id: chapterId,
-                amount: parseFloat(typeData.value),
-                date: new Date(parseInt(year), parseInt(month) - 1, 1), // First day of the month
+              accna_id,
+              debit,
+              credit,
+              date: new Date(),
+              office_id: office.office_id,
+              directorate_id: directorate.directorate_id,
             },
           });
-          }
-        }
-      } else if (sheet_number_processed === 2) {
-        // Financial Accounts Data (Debit/Credit)
-        const financialAccounts = processed_data;
-
-        for (const mainCategory in financialAccounts) {
-          for (const subCategory in financialAccounts[mainCategory]) {
-            const entry = financialAccounts[mainCategory][subCategory];
-            if (!entry || !entry.id) continue; // تجاهل أي حساب بدون id
-
-            const accna_id = entry.id;
-            const debit = entry.debit || 0;
-            const credit = entry.credit || 0;
-
-            // تجاهل الحسابات التي ليس لها أي قيمة مالية
-            if (debit === 0 && credit === 0) continue;
-
-            await prisma.account.create({
-              data: {
-                accna_id,
-                debit,
-                credit,
-                date: new Date(),
-                office_id: office.office_id,
-                directorate_id: directorate.directorate_id,
-              },
-            });
-          }
         }
       }
-    }); // End of transaction
-
-    return NextResponse.json({ message: 'Data processed and saved successfully' });
-  } catch (error) {
-    console.error('Error processing data:', error instanceof Error ? error.stack : error);
-    return NextResponse.json({ error: 'Failed to process data' }, { status: 500 });
-  } finally {
-    await prisma.$disconnect();
-  }
+    }
+  }); // End of transaction
 }
 
 
@@ -57,6 +57,8 @@ export default function ImportPage() {
      formData.append('file', uploadedFile);
       formData.append('sheet_number', String(pageNumber));
       formData.append('month', String(month));
+      // The analysis preview below is built from the echoed payload (result.data_sent)
+      formData.append('include_payload', 'true');
 
       console.log('Sending to backend:', { 
         month: String(month), 